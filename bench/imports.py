@@ -0,0 +1,52 @@
+"""import time of package exports in fresh interpreters
+run: python -m bench.imports [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+PACKAGE = "src.DLMS_SPODES_communications"
+CASES: dict[str, str] = {
+    "package": F"import {PACKAGE}",
+    "Network": F"from {PACKAGE} import Network",
+    "Serial": F"from {PACKAGE} import Serial",
+    "BLEKPZ": F"from {PACKAGE} import BLEKPZ",
+    "all": F"from {PACKAGE} import *",
+}
+HEAVY = ("bleak", "serial_asyncio", "serial", "winrt")
+PROBE = """
+import sys, time
+before = set(sys.modules)
+t = time.perf_counter()
+{statement}
+t = time.perf_counter() - t
+heavy = sorted(m for m in {heavy} if m in sys.modules)
+print(t, len(set(sys.modules) - before), ",".join(heavy) or "-")
+"""
+
+
+def measure(statement: str, repeat: int) -> tuple[float, int, str]:
+    """median import time, new modules and loaded heavy dependencies"""
+    times: list[float] = []
+    modules, heavy = 0, ""
+    code = PROBE.format(statement=statement, heavy=HEAVY)
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=os.environ).stdout.split()
+        times.append(float(out[0]))
+        modules, heavy = int(out[1]), out[2]
+    return statistics.median(times), modules, heavy
+
+
+def main(args: argparse.Namespace) -> None:
+    for name, statement in CASES.items():
+        t, modules, heavy = measure(statement, args.repeat)
+        print(F"{name:<10} import={t * 1e3:>8.2f}ms modules={modules:>4} heavy={heavy}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10, help="interpreter starts for every case")
+    main(parser.parse_args())
@@ -0,0 +1,104 @@
+"""transports benchmark with local meter emulators
+run: python -m bench.transports [--exchanges N] [--latency S] [--jitter S] [--segment N] [--info N] [--trace]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from StructResult import result
+from src.DLMS_SPODES_communications.base import Media
+from src.DLMS_SPODES_communications.network import Network, BufferedNetwork
+from src.DLMS_SPODES_communications import wrapper
+from src.DLMS_SPODES_communications.trace import Trace
+from test.emulators import TCPMeter, UDPMeter, PtyMeter, BLEMeter, fake_bleak
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+WRAPPER_REQUEST = wrapper.pack(wrapper.CLIENT_PUBLIC, wrapper.SERVER_MANAGEMENT, bytes.fromhex("c001c100080000010000ff0200"))
+EOF = b"\x7e"
+
+
+@dataclass
+class Report:
+    name: str
+    opens: list[float] = field(default_factory=list)
+    rtts: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @staticmethod
+    def _percentile(values: list[float], p: int) -> float:
+        if len(values) < 2:
+            return values[0] if values else float("nan")
+        return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+    def __str__(self) -> str:
+        fps = len(self.rtts) / self.elapsed if self.elapsed else 0.0
+        return (
+            F"{self.name:<16} frames/s={fps:>9.1f} "
+            F"open p50={self._percentile(self.opens, 50) * 1e3:>7.3f}ms "
+            F"rtt p50={self._percentile(self.rtts, 50) * 1e3:>7.3f}ms "
+            F"p99={self._percentile(self.rtts, 99) * 1e3:>7.3f}ms "
+            F"errors={self.errors}"
+        )
+
+
+async def run(name: str, media: Media, exchanges: int, per_session: int, request: bytes = REQUEST) -> Report:
+    """open media, make per_session exchanges, close; repeat up to exchanges"""
+    report = Report(name)
+    start = time.monotonic()
+    while len(report.rtts) + report.errors < exchanges:
+        if isinstance(res_open := await media.open(), result.Error):
+            report.errors += 1
+            continue
+        report.opens.append(res_open.value)
+        for _ in range(per_session):
+            t = time.monotonic()
+            await media.send(request)
+            res = await media.receive(bytearray())
+            await media.end_transaction()
+            if isinstance(res, result.Error):
+                report.errors += 1
+            else:
+                report.rtts.append(time.monotonic() - t)
+        await media.close()
+    report.elapsed = time.monotonic() - start
+    return report
+
+
+async def main(args: argparse.Namespace) -> None:
+    model = dict(latency=args.latency, jitter=args.jitter, info_size=args.info)
+
+    def trace() -> Trace | None:
+        return Trace() if args.trace else None
+
+    async with TCPMeter(segment_size=args.segment, **model) as tcp:
+        for cls in (Network, BufferedNetwork):
+            m = cls(host=tcp.host, port=str(tcp.port), EOF=EOF, trace=trace())
+            print(await run(cls.__name__, m, args.exchanges, args.per_session))
+    from src.DLMS_SPODES_communications.udp import UDP
+    async with UDPMeter(**model) as udp:
+        print(await run("UDP", UDP(host=udp.host, port=udp.port, trace=trace()), args.exchanges, args.per_session, WRAPPER_REQUEST))
+    if os.name == "posix":
+        from src.DLMS_SPODES_communications.serial_port import Serial, RS485, register_RS485
+        with PtyMeter(segment_size=args.segment, **model) as pty:
+            print(await run("Serial", Serial(port=pty.port, EOF=EOF, trace=trace()), args.exchanges, args.per_session))
+            rs = register_RS485(RS485(port=pty.port, EOF=EOF, trace=trace()))
+            print(await run("RS485", rs, args.exchanges, args.per_session))
+    from src.DLMS_SPODES_communications.ble import BLEKPZ
+    with fake_bleak({"00:00:00:00:00:01": BLEMeter(**model)}):
+        print(await run("BLEKPZ", BLEKPZ(addr="00:00:00:00:00:01", EOF=EOF, trace=trace()), args.exchanges, args.per_session))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--exchanges", type=int, default=1000)
+    parser.add_argument("--per-session", type=int, default=10, help="exchanges between open and close")
+    parser.add_argument("--latency", type=float, default=0.0, help="meter answer latency, sec")
+    parser.add_argument("--jitter", type=float, default=0.0, help="meter answer jitter, sec")
+    parser.add_argument("--segment", type=int, default=0xffff, help="meter write segment size")
+    parser.add_argument("--info", type=int, default=0, help="response information field size")
+    parser.add_argument("--trace", action="store_true", help="enable Media.trace")
+    asyncio.run(main(parser.parse_args()))
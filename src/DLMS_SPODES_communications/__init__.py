@@ -1,11 +1,96 @@
-from .network import Network
-from .ble import BLEKPZ
-from .serial_port import Serial, RS485
+"""exports are imported on first use, so transport dependencies (bleak, winrt, serial_asyncio) load only with its transport"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .network import Network, BufferedNetwork
+    from .udp import UDP
+    from .multiplex import Concentrator, MuxNetwork
+    from .ble import BLEKPZ
+    from .ble_scheduler import BLEScheduler
+    from .serial_port import Serial, RS485
+    from .pool import ConnectionPool
+    from .poller import poll, PollResult
+    from .sharding import poll_sharded
+    from .metrics import Metrics, REGISTRY
+    from .rtt import RTTEstimator, ESTIMATORS
+    from .policy import Policy, Backoff, HEALTH
+    from .replay import RecordingMedia, ReplayLog, ReplayMedia
+    from .registry import EndpointTable, Profile
+    from .sync import SyncClient
+    from .trace import Trace
+
+
+_EXPORTS: dict[str, str] = {
+    "Network": ".network",
+    "BufferedNetwork": ".network",
+    "UDP": ".udp",
+    "Concentrator": ".multiplex",
+    "MuxNetwork": ".multiplex",
+    "BLEKPZ": ".ble",
+    "BLEScheduler": ".ble_scheduler",
+    "Serial": ".serial_port",
+    "RS485": ".serial_port",
+    "ConnectionPool": ".pool",
+    "poll": ".poller",
+    "PollResult": ".poller",
+    "poll_sharded": ".sharding",
+    "Metrics": ".metrics",
+    "REGISTRY": ".metrics",
+    "RTTEstimator": ".rtt",
+    "ESTIMATORS": ".rtt",
+    "Policy": ".policy",
+    "Backoff": ".policy",
+    "HEALTH": ".policy",
+    "RecordingMedia": ".replay",
+    "ReplayLog": ".replay",
+    "ReplayMedia": ".replay",
+    "EndpointTable": ".registry",
+    "Profile": ".registry",
+    "SyncClient": ".sync",
+    "Trace": ".trace"
+}
+"""name: module"""
+
+
+def __getattr__(name: str) -> object:
+    if (module := _EXPORTS.get(name)) is None:
+        raise AttributeError(F"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
 
 
 __all__ = [
     "Network",
+    "BufferedNetwork",
+    "UDP",
+    "Concentrator",
+    "MuxNetwork",
     "BLEKPZ",
+    "BLEScheduler",
     "Serial",
-    "RS485"
+    "RS485",
+    "ConnectionPool",
+    "poll",
+    "PollResult",
+    "poll_sharded",
+    "Metrics",
+    "REGISTRY",
+    "RTTEstimator",
+    "ESTIMATORS",
+    "Policy",
+    "Backoff",
+    "HEALTH",
+    "RecordingMedia",
+    "ReplayLog",
+    "ReplayMedia",
+    "EndpointTable",
+    "Profile",
+    "SyncClient",
+    "Trace"
 ]
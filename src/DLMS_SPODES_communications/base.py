@@ -1,9 +1,26 @@
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Protocol, ClassVar, Optional
 from dataclasses import dataclass, field
 from contextlib import suppress
 import asyncio
 import time
 from StructResult import result
+from . import hdlc
+from .metrics import Metrics
+from .rtt import RTTEstimator
+from .policy import Policy
+from .trace import Trace
+
+
+@dataclass(slots=True, frozen=True)
+class Frame:
+    """received message of Media.frames"""
+    data: memoryview
+    """view of own buffer of message"""
+    stamp: float
+    """time.monotonic() of receive"""
 
 
 @dataclass
@@ -14,6 +31,67 @@ class Media(Protocol):
     to_recv: float
     to_close: float
     EOF: Optional[bytes] = None
+    _framer: hdlc.Framer = field(init=False, default_factory=hdlc.Framer, repr=False, compare=False)
+    """keep not complete frame between receive calls, use if EOF is HDLC flag"""
+    metrics: Optional[Metrics] = field(default=None, kw_only=True, repr=False, compare=False)
+    """counters and latencies, disabled with None"""
+    rtt: Optional[RTTEstimator] = field(default=None, kw_only=True, repr=False, compare=False)
+    """adaptive receive timeout from measured round trip time, disabled with None"""
+    policy: Optional[Policy] = field(default=None, kw_only=True, repr=False, compare=False)
+    """open attempts and circuit breaker of endpoint for poller and Policy.open, disabled with None"""
+    trace: Optional[Trace] = field(default=None, kw_only=True, repr=False, compare=False)
+    """ring of last sent and received frames, disabled with None"""
+    _sent_at: float = field(init=False, default=0.0, repr=False, compare=False)
+    """end of last send for RTT sample, 0.0 after sample"""
+    _deadline: Optional[float] = field(init=False, default=None, repr=False, compare=False)
+    """loop time of transaction end, calls inside it skip own timeouts"""
+
+    @property
+    def recv_timeout(self) -> float:
+        """to_recv or RTO of estimator"""
+        return self.to_recv if self.rtt is None else self.rtt.timeout(self.to_recv)
+
+    def _limit(self, timeout: float) -> Optional[float]:
+        """timeout of one call, None inside transaction: its deadline is used"""
+        return timeout if self._deadline is None else None
+
+    @asynccontextmanager
+    async def transaction(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """one deadline with one timer for send, every receive and BLE chunks inside. Raise TimeoutError after deadline, call end_transaction at exit
+        Args:
+            timeout: budget in sec, None is recv_timeout
+        """
+        self._deadline = asyncio.get_running_loop().time() + (self.recv_timeout if timeout is None else timeout)
+        try:
+            async with asyncio.timeout_at(self._deadline):
+                yield
+        except TimeoutError:
+            self._rtt_received(ok=False)
+            if self.metrics is not None:
+                self.metrics.timeout(0)
+            if self.trace is not None:
+                self.trace.timeout()
+            raise
+        finally:
+            self._deadline = None
+            await self.end_transaction()
+
+    def _rtt_sent(self) -> None:
+        if self.rtt is not None:
+            self._sent_at = time.monotonic()
+
+    def _rtt_received(self, *, ok: bool) -> None:
+        """sample only first response after send"""
+        if (
+            self.rtt is None
+            or self._sent_at == 0.0
+        ):
+            return
+        if ok:
+            self.rtt.observe(time.monotonic() - self._sent_at)
+        else:
+            self.rtt.backoff()
+        self._sent_at = 0.0
 
     async def open(self) -> result.SimpleOrError[float]:
         """Establish connection and return connection time or error"""
@@ -32,8 +110,81 @@ class Media(Protocol):
 
     async def end_transaction(self) -> None:
         """End current transaction and release resources"""
+
+    def _at_eof(self) -> bool:
+        """peer will not send more data, end of frames"""
+        return not self.is_open()
+
+    async def frames(self) -> AsyncIterator[Frame]:
+        """yield received messages (HDLC frames with HDLC flag EOF) until peer close, use for push data of meter.
+        Receive errors and timeouts are skipped, not complete message is kept for next receive. RS485 work only inside transaction.
+        Data of frame is view of buffer reused by next frame: valid until next iteration, copy it for keep.
+        Not handled data waits in buffer of media, e.g. StreamReader or notification queue"""
+        buf = bytearray()
+        while True:
+            if isinstance(await self.receive(buf), result.Error):
+                if self._at_eof():
+                    return
+                if self.EOF == hdlc.FLAG_B:  # partial frame is taken from framer with error, return it
+                    self._framer.feed(buf)
+                    buf.clear()
+                continue
+            view = memoryview(buf)
+            yield Frame(view, time.monotonic())
+            view.release()
+            try:
+                buf.clear()
+            except BufferError:  # slices of view are kept by consumer
+                buf = bytearray()
     
 
+class Inbox:
+    """messages routed to media by demultiplexer of shared socket"""
+    __slots__ = ("_queue", "_waiter", "_exc")
+
+    def __init__(self, maxlen: int = 16) -> None:
+        self._queue: deque[bytes] = deque(maxlen=maxlen)
+        """the oldest are dropped above maxlen"""
+        self._waiter: Optional[asyncio.Future[None]] = None
+        self._exc: Optional[Exception] = None
+
+    def put(self, data: bytes) -> None:
+        self._queue.append(data)
+        self._wakeup()
+
+    def fail(self, exc: Exception) -> None:
+        """raise exc in get after received messages, e.g. with lost connection"""
+        self._exc = exc
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self, timeout: Optional[float]) -> bytes:
+        """raise TimeoutError, None is without timeout"""
+        while not self._queue:
+            if self._exc is not None:
+                raise self._exc
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    def clear(self) -> None:
+        """drop late messages"""
+        self._queue.clear()
+
+    def reset(self) -> None:
+        self._queue.clear()
+        self._exc = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
 class StreamMedia(Media, Protocol):
     """Stream-based media implementation using asyncio StreamReader/StreamWriter"""
     _reader: asyncio.StreamReader
@@ -47,11 +198,18 @@ class StreamMedia(Media, Protocol):
             and not self._writer.is_closing()
         )
 
+    def _at_eof(self) -> bool:
+        return (
+            not self.is_open()
+            or self._reader.at_eof()
+        )
+
     async def close(self) -> result.SimpleOrError[float]:
         """Close stream connection with timeout handling"""
         start = time.monotonic()
         if not hasattr(self, "_writer"):
             return result.Error.from_e(ConnectionError("no stream writer available"))
+        self._framer.clear()
         if not self._writer.is_closing():
             self._writer.close()
             try:
@@ -60,17 +218,26 @@ class StreamMedia(Media, Protocol):
             except (asyncio.TimeoutError, ConnectionError) as e:
                 self._writer.transport.abort()
                 return result.Error.from_e(ConnectionError("close timeout"))
-        return result.Simple(time.monotonic() - start)
+        elapsed = time.monotonic() - start
+        if self.metrics is not None:
+            self.metrics.close.observe(elapsed)
+        return result.Simple(elapsed)
 
     async def send(self, data: bytes) -> None:
         """Write data to stream and wait for buffer to drain"""
         if self._writer is None:
             raise RuntimeError("Writer not available")
         self._writer.write(data)
+        start = time.monotonic()
         try:
-            await asyncio.wait_for(self._writer.drain(), timeout=self.to_drain)
+            await asyncio.wait_for(self._writer.drain(), timeout=self._limit(self.to_drain))
         except asyncio.TimeoutError:
             raise RuntimeError(f"Drain timeout ({self.to_drain}s) exceeded")
+        self._rtt_sent()
+        if self.metrics is not None:
+            self.metrics.sent(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.sent(data)
 
     async def receive(self, buf: bytearray) -> result.Ok | result.Error:
         """
@@ -81,19 +248,58 @@ class StreamMedia(Media, Protocol):
             result.OK: if complete message received (ending with EOF), 
             result.Error: TimeoutError
         """
+        if self.EOF == hdlc.FLAG_B:
+            return await self._receive_frame(buf)
+        start = time.monotonic()
+        size = len(buf)
+        try:
+            async with asyncio.timeout(self._limit(self.recv_timeout)):
+                while True:
+                    data = await self._reader.read(self.recv_size)
+                    if not data:
+                        return result.Error("no data received")
+                    buf.extend(data)
+                    if (
+                        self.EOF is None
+                        or data.count(self.EOF) >= 1
+                    ):
+                        self._rtt_received(ok=True)
+                        if self.metrics is not None:
+                            self.metrics.received(len(buf) - size, time.monotonic() - start)
+                        if self.trace is not None:
+                            self.trace.received(memoryview(buf)[size:])
+                        return result.OK
+        except asyncio.TimeoutError as e:
+            self._rtt_received(ok=False)
+            if self.metrics is not None:
+                self.metrics.timeout(len(buf) - size)
+            if self.trace is not None:
+                self.trace.timeout(memoryview(buf)[size:])
+            return result.Error.from_e(e)
+
+    async def _receive_frame(self, buf: bytearray) -> result.Ok | result.Error:
+        """append exactly one HDLC frame to buf, bytes after frame keep for next call. With error append partial data"""
+        start = time.monotonic()
         try:
-            while True:
-                data = await asyncio.wait_for(
-                    self._reader.read(self.recv_size),
-                    timeout=self.to_recv
-                )
-                if not data:
-                    return result.Error("no data received")
-                buf.extend(data)
-                if (
-                    self.EOF is None
-                    or data.count(self.EOF) >= 1
-                ):
-                    return result.OK
+            async with asyncio.timeout(self._limit(self.recv_timeout)):
+                while (frame := self._framer.next_frame()) is None:
+                    data = await self._reader.read(self.recv_size)
+                    if not data:
+                        buf.extend(self._framer.take())
+                        return result.Error("no data received")
+                    self._framer.feed(data)
+            buf.extend(frame)
+            self._rtt_received(ok=True)
+            if self.metrics is not None:
+                self.metrics.received(len(frame), time.monotonic() - start)
+            if self.trace is not None:
+                self.trace.received(frame)
+            return result.OK
         except asyncio.TimeoutError as e:
+            buf.extend(partial := self._framer.take())
+            self._rtt_received(ok=False)
+            if self.metrics is not None:
+                self.metrics.timeout(len(partial))
+            if self.trace is not None:
+                self.trace.timeout(partial)
             return result.Error.from_e(e)
@@ -1,11 +1,14 @@
 import asyncio
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
-from typing import ClassVar
+from typing import Any, ClassVar, Optional
+import logging
 import os
 import bleak
 from StructResult import result
 import time
 from .base import Media
+from . import hdlc
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 from bleak.backends import characteristic
@@ -18,8 +21,64 @@ elif os.name == "posix":
     """skip, not available"""
 
 
+logger = logging.getLogger(__name__)
 DISCOVERY_TIMEOUT_DEFAULT: float = 10.0
 """in sec"""
+RECV_CHUNKS_MAX: int = 4096
+"""notifications not handled by receive, the oldest are dropped above"""
+
+
+@dataclass(slots=True)
+class CachedDevice:
+    device: Optional[BLEDevice] = None
+    adv: Optional[AdvertisementData] = None
+    handles: Optional[tuple[int, int, int]] = None
+    """SEND, RECV, READY characteristics"""
+    stamp: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class DeviceCache:
+    """scan results and characteristic handles by address, with TTL and LRU eviction"""
+    ttl: float = 600.0
+    """in sec"""
+    max_size: int = 256
+    _items: OrderedDict[str, CachedDevice] = field(init=False, default_factory=OrderedDict, repr=False)
+
+    def get(self, addr: str) -> Optional[CachedDevice]:
+        if (item := self._items.get(addr)) is None:
+            return None
+        if time.monotonic() - item.stamp > self.ttl:
+            del self._items[addr]
+            return None
+        self._items.move_to_end(addr)
+        return item
+
+    def put(self, addr: str, device: Optional[BLEDevice] = None, adv: Optional[AdvertisementData] = None) -> CachedDevice:
+        """add or refresh device, keep handles"""
+        if (item := self._items.get(addr)) is None:
+            item = self._items[addr] = CachedDevice()
+        if device is not None:
+            item.device = device
+            item.adv = adv
+        item.stamp = time.monotonic()
+        self._items.move_to_end(addr)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return item
+
+    def evict(self, addr: str) -> None:
+        self._items.pop(addr, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+DEVICE_CACHE = DeviceCache()
+"""common for BLEKPZ by default"""
 
 
 @dataclass
@@ -31,6 +90,12 @@ class BLEKPZ(Media):
     to_recv: float = 1.0
     to_close: float = 10.0
     pair: bool = False
+    send_window: int = 1
+    """chunks written before wait READY, 1 is stop-and-wait with write response for old firmware"""
+    cache: Optional[DeviceCache] = field(default_factory=lambda: DEVICE_CACHE, kw_only=True, repr=False, compare=False)
+    """connect with scanned device and known handles, None for discovery on every open"""
+    adapter: Optional[str] = field(default=None, kw_only=True, compare=False)
+    """local Bluetooth adapter, e.g. hci1 of BlueZ, None is default"""
     DLMS_SERVICE_UUID: ClassVar[str] = "0000ffe5-0000-1000-8000-00805f9b34fb"
     DLMS_RECV_BUF_UUID: ClassVar[str] = "0000fff4-0000-1000-8000-00805f9b34fb"
     DLMS_SEND_BUF_UUID: ClassVar[str] = "0000fff5-0000-1000-8000-00805f9b34fb"
@@ -40,55 +105,67 @@ class BLEKPZ(Media):
     _client: bleak.BleakClient = field(init=False)
     __chunk_is_send: asyncio.Event = field(init=False)
     __c_send: characteristic.BleakGATTCharacteristic = field(init=False)
+    _acked: int = field(init=False, default=0)
+    """amount of READY after open"""
+    _target: Optional[BLEDevice | str] = field(init=False, default=None, repr=False, compare=False)
+    """device or address of connect over cache, set by BLEScheduler for one session"""
 
     async def __connect(self) -> None:
         self.__chunk_is_send = asyncio.Event()
         """send buffer locker"""
+        cached = self.cache.get(self.addr) if self.cache is not None else None
+        kwargs: dict[str, Any] = {}
+        if cached is not None and os.name == "nt":
+            kwargs["winrt"] = {"use_cached_services": True}
+        if self.adapter is not None:
+            kwargs["adapter"] = self.adapter
+        if (target := self._target) is None:
+            target = self.addr if cached is None or cached.device is None else cached.device
         self._client = bleak.BleakClient(
-            address_or_ble_device=self.addr,
+            address_or_ble_device=target,
             services=(self.DLMS_SERVICE_UUID,),
             timeout=self.to_connect,
             pair=self.pair,
-            # winrt=dict(use_cached_services=True)
+            **kwargs
         )
         await self._client.connect()
-        self._recv_buff = bytearray()
-        """ initiate buffer for send to server"""
-        self._buf_locker = asyncio.Lock()
+        self._chunks: deque[bytearray] = deque(maxlen=RECV_CHUNKS_MAX)
+        """notifications from server, callback and receive run in loop thread, so without lock"""
+        self._chunks_dropped = 0
         self._data_detected = asyncio.Event()
+        """chunk with EOF in queue"""
+
+    def _clear_recv(self) -> None:
+        self._chunks.clear()
+        self._framer.clear()
+        self._data_detected.clear()
 
     async def _setup_notifications(self) -> result.Ok | result.Error:
-        async def put_recv_buf(_sender: characteristic.BleakGATTCharacteristic, data: bytearray) -> None:
-            async with self._buf_locker:
-                self._recv_buff.extend(data)
-                if (
-                    self.EOF is None
-                    or data.count(self.EOF) >= 1
-                ):
-                    self._data_detected.set()
+        def put_recv_buf(_sender: characteristic.BleakGATTCharacteristic, data: bytearray) -> None:
+            if len(self._chunks) == RECV_CHUNKS_MAX:
+                self._chunks_dropped += 1
+                logger.warning(F"{self}: receive queue overflow, dropped {self._chunks_dropped} chunks")
+            self._chunks.append(data)
+            if (
+                self.EOF is None
+                or self.EOF in data
+            ):
+                self._data_detected.set()
 
         def ready_handle(_sender: characteristic.BleakGATTCharacteristic, ack: bytearray) -> None:
             if ack == self.READY_OK:
+                self._acked += 1
                 self.__chunk_is_send.set()
             else:
                 raise ConnectionError(F"got {ack=!r}, expected {self.READY_OK!r}")  # todo: make with message, non raise Callback
 
-        service = self._client.services.get_service(self.DLMS_SERVICE_UUID)
-        if not service:
-            return result.Error.from_e(AttributeError("not find <UUID services>"))
-        self.__c_send = service.get_characteristic(self.DLMS_SEND_BUF_UUID)
-        if not self.__c_send:
-            return result.Error.from_e(AttributeError("not find <SEND characteristic>"))
-        c_recv = service.get_characteristic(self.DLMS_RECV_BUF_UUID)
+        if isinstance(res_chars := self._get_characteristics(), result.Error):
+            return res_chars
+        self.__c_send, c_recv, c_ready = res_chars.value
         try:
-            if not c_recv:
-                return result.Error.from_e(AttributeError("not find <RECV characteristic>"))
             await self._client.start_notify(
                 char_specifier=c_recv,
                 callback=put_recv_buf)
-            c_ready = service.get_characteristic(self.DLMS_READY_UUID)
-            if not c_ready:
-                return result.Error.from_e(AttributeError("not find <READY characteristic>"))
             await self._client.start_notify(
                 char_specifier=c_ready,
                 callback=ready_handle)
@@ -96,18 +173,55 @@ class BLEKPZ(Media):
             return result.Error.from_e(e, "setup notification")
         return result.OK
 
+    def _get_characteristics(self) -> result.SimpleOrError[tuple[characteristic.BleakGATTCharacteristic, ...]]:
+        """SEND, RECV, READY by cached handles or by UUID"""
+        if (
+            self.cache is not None
+            and (cached := self.cache.get(self.addr)) is not None
+            and cached.handles is not None
+        ):
+            chars = tuple(self._client.services.get_characteristic(h) for h in cached.handles)
+            if all(chars):
+                return result.Simple(chars)
+        service = self._client.services.get_service(self.DLMS_SERVICE_UUID)
+        if not service:
+            return result.Error.from_e(AttributeError("not find <UUID services>"))
+        if not (c_send := service.get_characteristic(self.DLMS_SEND_BUF_UUID)):
+            return result.Error.from_e(AttributeError("not find <SEND characteristic>"))
+        if not (c_recv := service.get_characteristic(self.DLMS_RECV_BUF_UUID)):
+            return result.Error.from_e(AttributeError("not find <RECV characteristic>"))
+        if not (c_ready := service.get_characteristic(self.DLMS_READY_UUID)):
+            return result.Error.from_e(AttributeError("not find <READY characteristic>"))
+        if self.cache is not None:
+            self.cache.put(self.addr).handles = (c_send.handle, c_recv.handle, c_ready.handle)
+        return result.Simple((c_send, c_recv, c_ready))
+
     async def open(self) -> result.SimpleOrError[float]:
+        res = await self._open()
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
+
+    async def _open(self) -> result.SimpleOrError[float]:
         start = time.monotonic()
         try:
             async with asyncio.timeout(self.to_connect):
                 await self.__connect()
         except (exc.BleakError, TimeoutError) as e:
+            if self.cache is not None:
+                self.cache.evict(self.addr)
             return result.Error.from_e(e, "open BLE")
         if isinstance(res_setup := await self._setup_notifications(), result.Error):
+            if self.cache is not None:
+                self.cache.evict(self.addr)
             await self.close()
             return res_setup
-        self._recv_buff.clear()
-        self._data_detected.clear()
+        if (
+            self.send_window > 1
+            and logger.isEnabledFor(logging.DEBUG)
+        ):
+            logger.debug(F"{self}: MTU {self._client.mtu_size}, send by {self._write_size()} bytes")
+        self._clear_recv()
         return result.Simple(time.monotonic() - start)
 
     def is_open(self) -> bool:
@@ -121,7 +235,10 @@ class BLEKPZ(Media):
         start = time.monotonic()
         await self._client.disconnect()
         await asyncio.sleep(0.01)  # timeout before next connection
-        return result.Simple(time.monotonic() - start)
+        elapsed = time.monotonic() - start
+        if self.metrics is not None:
+            self.metrics.close.observe(elapsed)
+        return result.Simple(elapsed)
 
     def __repr__(self) -> str:
         params: list[str] = [F"addr='{self._client.address}'"]
@@ -133,51 +250,141 @@ class BLEKPZ(Media):
         return F"{self.addr}"
 
     async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        if self.EOF == hdlc.FLAG_B:
+            return await self._receive_frame(buf)
+        start = time.monotonic()
+        size = len(buf)
         try:
-            await asyncio.wait_for(self._data_detected.wait(), timeout=self.to_recv)
-            async with self._buf_locker:
-                if self._recv_buff:
-                    buf.extend(self._recv_buff)
-                    self._recv_buff.clear()
-                    self._data_detected.clear()
-                    return result.OK
+            async with asyncio.timeout(self._limit(self.recv_timeout)):
+                await self._data_detected.wait()
+        except TimeoutError as e:
+            self._drain_chunks(buf)
+            self._report(memoryview(buf)[size:], start, timeout=True)
+            return result.Error.from_e(e)
+        if not self._chunks:
+            self._data_detected.clear()
             return result.Error("no data received")
-        except asyncio.TimeoutError as e:
-            async with self._buf_locker:
-                if self._recv_buff:
-                    buf.extend(self._recv_buff)
-                    self._recv_buff.clear()
+        self._drain_chunks(buf)
+        self._report(memoryview(buf)[size:], start)
+        return result.OK
+
+    def _drain_chunks(self, buf: bytearray) -> int:
+        """move all chunks to buf, return amount of bytes"""
+        size = len(buf)
+        while self._chunks:
+            buf.extend(self._chunks.popleft())
+        self._data_detected.clear()
+        return len(buf) - size
+
+    async def _receive_frame(self, buf: bytearray) -> result.Ok | result.Error:
+        """append exactly one HDLC frame to buf, bytes after frame keep for next call. With error append partial data"""
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self._limit(self.recv_timeout)):
+                while True:
+                    while self._chunks:
+                        self._framer.feed(self._chunks.popleft())
                     self._data_detected.clear()
-                    print(f"Received partial message due to timeout: {buf.hex()}")
+                    if (frame := self._framer.next_frame()) is not None:
+                        break
+                    await self._data_detected.wait()
+        except TimeoutError as e:
+            while self._chunks:
+                self._framer.feed(self._chunks.popleft())
+            self._data_detected.clear()
+            buf.extend(partial := self._framer.take())
+            self._report(partial, start, timeout=True)
             return result.Error.from_e(e)
-        
+        buf.extend(frame)
+        self._report(frame, start)
+        return result.OK
+
+    def _report(self, data: bytes | bytearray | memoryview, start: float, *, timeout: bool = False) -> None:
+        """data: received message or partial data"""
+        self._rtt_received(ok=not timeout)
+        n = len(data)
+        if not timeout:
+            if self.metrics is not None:
+                self.metrics.received(n, time.monotonic() - start)
+            if self.trace is not None:
+                self.trace.received(data)
+        else:
+            if self.metrics is not None:
+                self.metrics.timeout(n)
+            if self.trace is not None:
+                self.trace.timeout(data)
+            if n and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(F"{self}: received partial message {n} bytes due to timeout")
+
     async def end_transaction(self) -> None:
-        async with self._buf_locker: 
-            self._recv_buff.clear()
-            self._data_detected.clear()
+        self._clear_recv()
 
     async def send(self, data: bytes) -> None:
+        if not self._client.is_connected:
+            raise ConnectionError("BLE no connection")
+        start = time.monotonic()
+        if self.send_window > 1:
+            await self._send_windowed(data)
+        else:
+            await self._send_stop_and_wait(data)
+        self._rtt_sent()
+        if self.metrics is not None:
+            self.metrics.sent(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.sent(data)
+
+    async def _send_stop_and_wait(self, data: bytes) -> None:
         async def send_chunk(data: bytes) -> None:
             await self._client.write_gatt_char(self.__c_send, data, response=True)
             await self.__chunk_is_send.wait()
 
-        if not self._client.is_connected:
-            raise ConnectionError("BLE no connection")
         pos: int = 0
         while c_data := data[pos: (next_pos := pos + self.__c_send.max_write_without_response_size)]:
             self.__chunk_is_send.clear()
             await asyncio.wait_for(
                 fut=send_chunk(c_data),
-                timeout=self.to_recv)
+                timeout=self._limit(self.to_recv))
             pos = next_pos
 
+    async def _send_windowed(self, data: bytes) -> None:
+        """write chunks without response, keep not more than send_window chunks without READY"""
+        async def wait_ready(sent: int, outstanding: int) -> None:
+            while sent - (self._acked - acked) > outstanding:
+                self.__chunk_is_send.clear()
+                await asyncio.wait_for(self.__chunk_is_send.wait(), timeout=self._limit(self.to_recv))
+
+        response = "write-without-response" not in self.__c_send.properties
+        size = self._write_size()
+        acked = self._acked
+        chunks = range(0, len(data), size)
+        for sent, pos in enumerate(chunks):
+            await wait_ready(sent, self.send_window - 1)
+            await self._client.write_gatt_char(self.__c_send, data[pos: pos + size], response=response)
+        await wait_ready(len(chunks), 0)
+
+    def _write_size(self) -> int:
+        """data of one windowed write by public BleakClient.mtu_size. WinRT and CoreBluetooth backends report exchanged MTU.
+        BlueZ backend reports default 23 (20 bytes of data) without MTU exchange by its private call, chunks are small there but valid.
+        Window works with any chunk size"""
+        return self._client.mtu_size - 3
+
     @classmethod
-    async def search(cls, timeout: int) -> dict[str, tuple[BLEDevice, AdvertisementData]]:
-        scaner = bleak.BleakScanner()
-        return await scaner.discover(
+    async def search(
+            cls,
+            timeout: int,
+            cache: Optional[DeviceCache] = DEVICE_CACHE,
+            adapter: Optional[str] = None
+    ) -> dict[str, tuple[BLEDevice, AdvertisementData]]:
+        """one-shot discovery, see ble_scheduler.BLEScheduler for background scanning"""
+        scaner = bleak.BleakScanner(**({} if adapter is None else {"adapter": adapter}))
+        found = await scaner.discover(
             timeout=timeout,
             return_adv=True
         )
+        if cache is not None:
+            for addr, (device, adv) in found.items():
+                cache.put(addr, device, adv)
+        return found
 
     async def get_characteristics(self) -> dict[str, bytearray]:
         """todo: need refactoring with translate exception to outside"""
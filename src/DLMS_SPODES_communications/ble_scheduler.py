@@ -0,0 +1,210 @@
+"""BLEKPZ sessions over several local adapters with background scanning"""
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Sequence
+from contextlib import suppress
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Optional
+import bleak
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+from StructResult import result
+from .ble import BLEKPZ
+from .poller import PollResult, exchange
+
+logger = logging.getLogger(__name__)
+RSSI_MIN: int = -127
+"""score of meter without advertisement, dBm"""
+AGE_PENALTY: float = 1.0
+"""score decrease of advertisement age, dB per sec"""
+SEEN_MAX: int = 4096
+"""remembered devices, stale are dropped above"""
+
+
+@dataclass(eq=False)
+class Adapter:
+    """local Bluetooth adapter"""
+    name: Optional[str] = None
+    """e.g. hci1 of BlueZ, None is default adapter"""
+    limit: int = 3
+    """connections at same time"""
+    scan: bool = True
+    """background scanning with this adapter"""
+    active: int = field(init=False, default=0)
+    sessions: int = field(init=False, default=0)
+    _scanner: Optional[bleak.BleakScanner] = field(init=False, default=None, repr=False)
+
+    def __str__(self) -> str:
+        return self.name or "default"
+
+
+@dataclass(slots=True)
+class Sighting:
+    """last advertisement of device by adapter"""
+    device: BLEDevice
+    rssi: int
+    stamp: float
+
+
+@dataclass(slots=True, eq=False)
+class _Job:
+    media: BLEKPZ
+    requests: Sequence[bytes]
+    queued: float
+
+
+class BLEScheduler:
+    """run BLEKPZ sessions on adapters with free connection, meters with stronger and fresher advertisement first.
+    Scanning runs in background between start() and stop(), use as async context manager"""
+
+    def __init__(self, adapters: Sequence[Adapter] = (), fresh: float = 30.0) -> None:
+        """
+        Args:
+            adapters: with unique names, empty is one default adapter
+            fresh: sec of advertisement validity
+        """
+        self.adapters: list[Adapter] = list(adapters) or [Adapter()]
+        if len({a.name for a in self.adapters}) != len(self.adapters):
+            raise ValueError(F"adapter names not unique: {', '.join(map(str, self.adapters))}")
+        self.fresh = fresh
+        self.seen: dict[str, dict[Optional[str], Sighting]] = {}
+        """address: adapter name: sighting"""
+        self._wakeups: set[asyncio.Event] = set()
+        """of running polls, set by advertisement or end of session"""
+        self._busy: set[str] = set()
+        """addresses of meters in session of any poll"""
+
+    async def start(self) -> None:
+        for adapter in self.adapters:
+            if (
+                adapter.scan
+                and adapter._scanner is None
+            ):
+                adapter._scanner = bleak.BleakScanner(
+                    detection_callback=lambda device, adv, name=adapter.name: self._detected(name, device, adv),
+                    **({} if adapter.name is None else {"adapter": adapter.name}))
+                try:
+                    await adapter._scanner.start()
+                except Exception as e:
+                    adapter._scanner = None
+                    logger.warning(F"adapter {adapter}: scanning not started: {e!r}")
+
+    async def stop(self) -> None:
+        for adapter in self.adapters:
+            if (scanner := adapter._scanner) is not None:
+                adapter._scanner = None
+                with suppress(Exception):
+                    await scanner.stop()
+
+    async def __aenter__(self) -> "BLEScheduler":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.stop()
+
+    def _detected(self, adapter: Optional[str], device: BLEDevice, adv: AdvertisementData) -> None:
+        now = time.monotonic()
+        if (sightings := self.seen.get(device.address)) is None:
+            if len(self.seen) >= SEEN_MAX:
+                self.seen = {addr: s for addr, s in self.seen.items() if any(now - x.stamp <= self.fresh for x in s.values())}
+            sightings = self.seen[device.address] = {}
+        if (
+            (last := sightings.get(adapter)) is None
+            or now - last.stamp > self.fresh
+        ):
+            self._wakeup()  # new candidate for dispatch
+        sightings[adapter] = Sighting(device, adv.rssi, now)
+
+    def _wakeup(self) -> None:
+        for event in self._wakeups:
+            event.set()
+
+    def rssi(self, addr: str, adapter: Optional[str] = None) -> Optional[int]:
+        """last fresh RSSI of device, by best adapter with None"""
+        now = time.monotonic()
+        values = [s.rssi for name, s in self.seen.get(addr, {}).items() if now - s.stamp <= self.fresh and (adapter is None or name == adapter)]
+        return max(values) if values else None
+
+    def _score(self, addr: str, adapter: Adapter, now: float) -> Optional[float]:
+        if (
+            (s := self.seen.get(addr, {}).get(adapter.name)) is None
+            or (age := now - s.stamp) > self.fresh
+        ):
+            return None
+        return s.rssi - AGE_PENALTY * age
+
+    def _next(self, pending: list[_Job], now: float, unseen: float) -> Optional[tuple[_Job, Adapter]]:
+        """the best pair of pending meter and free adapter"""
+        best: Optional[tuple[tuple[float, float, float], _Job, Adapter]] = None
+        free = [a for a in self.adapters if a.active < a.limit]
+        for job in pending:
+            if job.media.addr in self._busy:
+                continue
+            for adapter in free:
+                if (score := self._score(job.media.addr, adapter, now)) is None:
+                    if now - job.queued < unseen:
+                        continue
+                    score = RSSI_MIN
+                key = (score, -adapter.active / adapter.limit, -job.queued)
+                if best is None or key > best[0]:
+                    best = key, job, adapter
+        return None if best is None else (best[1], best[2])
+
+    def _wait_unseen(self, pending: list[_Job], now: float, unseen: float) -> Optional[float]:
+        """sec to start of the first waiting meter without advertisement, None is wait of change"""
+        waits = [t for job in pending if (t := job.queued + unseen - now) > 0]
+        return min(waits) if waits else None
+
+    async def _session(self, job: _Job, adapter: Adapter, results: asyncio.Queue[PollResult]) -> None:
+        media = job.media
+        own = media.adapter
+        media.adapter = adapter.name
+        s = self.seen.get(media.addr, {}).get(adapter.name)
+        media._target = media.addr if s is None else s.device  # device object is bound to adapter of scanner, device of cache may be not
+        try:
+            results.put_nowait(await exchange(media, job.requests))
+        except Exception as e:
+            results.put_nowait(PollResult(media, job.requests, status=result.Error.from_e(e)))
+        finally:
+            media.adapter, media._target = own, None
+            adapter.active -= 1
+            adapter.sessions += 1
+
+    async def poll(self, jobs: Iterable[tuple[BLEKPZ, Sequence[bytes]]], unseen: float = 10.0) -> AsyncIterator[PollResult]:
+        """run exchange for every job and yield results as they complete, polls at same time share adapters
+        Args:
+            unseen: sec of waiting advertisement of meter, after it session starts with any free adapter
+        """
+        now = time.monotonic()
+        pending = [_Job(media, requests, now) for media, requests in jobs]
+        results: asyncio.Queue[PollResult] = asyncio.Queue()
+        running: set[asyncio.Task[None]] = set()
+        self._wakeups.add(changed := asyncio.Event())
+        try:
+            while pending or running or not results.empty():
+                changed.clear()
+                now = time.monotonic()
+                while (pair := self._next(pending, now, unseen)) is not None:
+                    job, adapter = pair
+                    pending.remove(job)
+                    self._busy.add(job.media.addr)
+                    adapter.active += 1
+                    t = asyncio.create_task(self._session(job, adapter, results))
+                    running.add(t)
+                    t.add_done_callback(running.discard)
+                    t.add_done_callback(lambda _, addr=job.media.addr: self._busy.discard(addr))  # type: ignore[misc]
+                    t.add_done_callback(lambda _: self._wakeup())
+                while not results.empty():
+                    yield results.get_nowait()
+                if not (pending or running):
+                    break
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(changed.wait(), self._wait_unseen(pending, now, unseen))
+        finally:
+            self._wakeups.discard(changed)
+            for t in running:
+                t.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
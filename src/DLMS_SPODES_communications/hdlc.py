@@ -0,0 +1,95 @@
+"""HDLC frame boundaries detection according IEC 62056-46"""
+from typing import Optional
+
+
+FLAG: int = 0x7e
+FLAG_B: bytes = b"\x7e"
+FORMAT_TYPE: int = 0xa0
+"""frame format type 3, high nibble of first format byte"""
+MIN_LENGTH: int = 7
+"""format(2) + destination(1) + source(1) + control(1) + FCS(2)"""
+
+
+def search(buf: bytes | bytearray, start: int = 0, end: Optional[int] = None) -> tuple[int, int]:
+    """find first complete frame in buf[start:end] by frame format length field
+    :return: (begin, stop) of frame with both flags. If frame not complete stop is -1 and begin is position of possible frame start,
+    data before begin not belong to any frame"""
+    if end is None:
+        end = len(buf)
+    while True:
+        if (begin := buf.find(FLAG, start, end)) == -1:
+            return end, -1
+        if end - begin < 3:
+            return begin, -1
+        f0 = buf[begin + 1]
+        if (
+            f0 == FLAG  # closing flag of previous frame or inter-frame fill
+            or f0 & 0xf0 != FORMAT_TYPE
+        ):
+            start = begin + 1
+            continue
+        if (length := (f0 & 0x07) << 8 | buf[begin + 2]) < MIN_LENGTH:
+            start = begin + 1
+            continue
+        stop = begin + length + 2
+        if stop > end:
+            return begin, -1
+        if buf[stop - 1] != FLAG:  # wrong length, resynchronize from next flag
+            start = begin + 1
+            continue
+        return begin, stop
+
+
+class Framer:
+    """incremental HDLC framer: return one complete frame per call and keep leftover bytes for the next one"""
+    __slots__ = ("_buf", "_pos")
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos: int = 0
+        """start of not handled data"""
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        self._buf.extend(data)
+
+    def next_frame(self) -> Optional[bytes]:
+        """return complete frame with flags or None if need more data"""
+        begin, stop = search(self._buf, self._pos)
+        if stop == -1:
+            del self._buf[:begin]
+            self._pos = 0
+            return None
+        frame = bytes(self._buf[begin:stop])
+        self._pos = stop - 1  # closing flag can be opening flag of next frame
+        return frame
+
+    @property
+    def pending(self) -> int:
+        """amount of not framed bytes"""
+        if (n := len(self._buf) - self._pos) == 1 and self._buf[self._pos] == FLAG:
+            return 0
+        return n
+
+    def take(self) -> bytes:
+        """return not framed bytes and clear, use for partial data on timeout"""
+        data = bytes(self._buf[self._pos:]) if self.pending else b""
+        self.clear()
+        return data
+
+    def clear(self) -> None:
+        self._buf.clear()
+        self._pos = 0
+
+
+def _address_end(frame: bytes | bytearray | memoryview, pos: int) -> int:
+    """address field is 1, 2 or 4 bytes, the last byte has LSB 1"""
+    for i in range(pos, min(pos + 4, len(frame))):
+        if frame[i] & 1:
+            return i + 1
+    raise ValueError(F"wrong HDLC address field in {bytes(frame).hex(' ')}")
+
+
+def addresses(frame: bytes | bytearray | memoryview) -> tuple[bytes, bytes]:
+    """return (destination, source) address fields of frame with flags"""
+    dst_end = _address_end(frame, 3)
+    return bytes(frame[3:dst_end]), bytes(frame[dst_end:_address_end(frame, dst_end)])
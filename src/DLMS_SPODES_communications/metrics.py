@@ -0,0 +1,132 @@
+"""opt-in media instrumentation: counters and latency histograms"""
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar
+from StructResult import result
+
+
+class Histogram:
+    """latency histogram with log2 buckets from 1 us to ~134 s"""
+    __slots__ = ("counts", "count", "total")
+    BOUNDS: ClassVar[tuple[float, ...]] = tuple(1e-6 * 2 ** i for i in range(28))
+    """upper bound of bucket in sec, last bucket is unlimited"""
+
+    def __init__(self) -> None:
+        self.counts: list[int] = [0] * (len(self.BOUNDS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """upper bound of bucket with q part of values"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        acc = 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if acc >= rank:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else float("inf")
+        return float("inf")
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99)
+        }
+
+    def __repr__(self) -> str:
+        return F"{self.__class__.__name__}(count={self.count}, mean={self.mean:.6f})"
+
+
+@dataclass(eq=False)
+class Metrics:
+    """counters of one media, set to Media.metrics for enable"""
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    frames_sent: int = 0
+    frames_received: int = 0
+    timeouts: int = 0
+    partial: int = 0
+    """receive with timeout after part of message"""
+    open_errors: int = 0
+    open: Histogram = field(default_factory=Histogram)
+    close: Histogram = field(default_factory=Histogram)
+    drain: Histogram = field(default_factory=Histogram)
+    receive: Histogram = field(default_factory=Histogram)
+    lock_wait: Histogram = field(default_factory=Histogram)
+    """RS485 waiting of bus"""
+
+    def sent(self, n: int, drain: float) -> None:
+        self.bytes_sent += n
+        self.frames_sent += 1
+        self.drain.observe(drain)
+
+    def received(self, n: int, elapsed: float) -> None:
+        self.bytes_received += n
+        self.frames_received += 1
+        self.receive.observe(elapsed)
+
+    def timeout(self, partial: int) -> None:
+        """partial: amount of received bytes"""
+        self.timeouts += 1
+        if partial:
+            self.bytes_received += partial
+            self.partial += 1
+
+    def opened(self, res: result.SimpleOrError[float]) -> None:
+        """handle result of Media.open"""
+        if isinstance(res, result.Error):
+            self.open_errors += 1
+        else:
+            self.open.observe(res.value)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            f.name: v.snapshot() if isinstance(v := getattr(self, f.name), Histogram) else v
+            for f in fields(self)
+        }
+
+
+class Registry:
+    """named metrics with exporters"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metrics] = {}
+        self._exporters: list[Callable[[str, dict[str, Any]], None]] = []
+
+    def metrics(self, name: str) -> Metrics:
+        """get or create metrics, e.g. Network(..., metrics=REGISTRY.metrics("gw1"))"""
+        if (m := self._metrics.get(name)) is None:
+            m = self._metrics[name] = Metrics()
+        return m
+
+    def add_exporter(self, exporter: Callable[[str, dict[str, Any]], None]) -> None:
+        self._exporters.append(exporter)
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        return {name: m.snapshot() for name, m in self._metrics.items()}
+
+    def export(self) -> None:
+        """push snapshot of every metrics to exporters"""
+        for name, snapshot in self.collect().items():
+            for exporter in self._exporters:
+                exporter(name, snapshot)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._metrics
+
+
+REGISTRY = Registry()
+"""default registry"""
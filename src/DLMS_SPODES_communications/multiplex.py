@@ -0,0 +1,223 @@
+"""many logical meters through one TCP connection of data concentrator"""
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass, field
+import time
+from typing import Optional
+from StructResult import result
+from .base import Inbox, Media
+from . import hdlc, wrapper
+
+WRAPPER, HDLC = "wrapper", "hdlc"
+"""addressing of concentrator"""
+RECV_QUEUE_MAX: int = 16
+
+
+def route(data: bytes | bytearray | memoryview, addressing: str, *, response: bool) -> int | bytes:
+    """meter address of request or response: wPort for WRAPPER, address field for HDLC. Raise ValueError"""
+    if addressing == WRAPPER:
+        src, dst = wrapper.ports(data)
+        return src if response else dst
+    dst_field, src_field = hdlc.addresses(data)
+    return src_field if response else dst_field
+
+
+@dataclass(eq=False)
+class Concentrator:
+    """one shared connection for MuxNetwork of same concentrator, it opens with first media and closes with last"""
+    host: str = "127.0.0.1"
+    port: str = "4059"
+    addressing: str = WRAPPER
+    """WRAPPER by wPorts or HDLC by addresses"""
+    window: int = 8
+    """requests without response at same time"""
+    to_connect: float = 20.0
+    to_drain: float = 2.0
+    dropped: int = field(init=False, default=0)
+    """responses without route"""
+    _reader: asyncio.StreamReader = field(init=False, repr=False)
+    _writer: asyncio.StreamWriter = field(init=False, repr=False)
+    _routes: dict[int | bytes, "MuxNetwork"] = field(init=False, default_factory=dict, repr=False)
+    _users: dict[int, "MuxNetwork"] = field(init=False, default_factory=dict, repr=False)
+    """by id"""
+    _window: asyncio.Semaphore = field(init=False, repr=False)
+    _lock: asyncio.Lock = field(init=False, repr=False)
+    _task: Optional[asyncio.Task[None]] = field(init=False, default=None, repr=False)
+
+    def __str__(self) -> str:
+        return F"{self.host}:{self.port}"
+
+    def is_connected(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and not self._writer.is_closing()
+        )
+
+    async def attach(self, media: "MuxNetwork") -> None:
+        """connect with first media, route responses of media address to it"""
+        if not hasattr(self, "_lock"):
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if (
+                (owner := self._routes.get(media.address)) is not None
+                and owner is not media
+            ):
+                raise RuntimeError(F"address {media.address!r} used by {owner!r}")
+            if not self.is_connected():
+                async with asyncio.timeout(self.to_connect):
+                    self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                self._window = asyncio.Semaphore(self.window)
+                self._task = asyncio.create_task(self._read())
+            self._users[id(media)] = media
+            self._routes[media.address] = media
+
+    async def detach(self, media: "MuxNetwork") -> None:
+        """close connection after last media"""
+        if self._routes.get(media.address) is media:
+            del self._routes[media.address]
+        self._users.pop(id(media), None)
+        if (
+            not self._users
+            and self._task is not None
+        ):
+            self._task.cancel()
+            self._task = None
+            self._writer.close()
+            with suppress(ConnectionError):
+                await self._writer.wait_closed()
+
+    async def write(self, data: bytes) -> None:
+        self._writer.write(data)
+        await asyncio.wait_for(self._writer.drain(), timeout=self.to_drain)
+
+    async def _read(self) -> None:
+        exc: Exception = ConnectionError(F"concentrator {self} closed connection")
+        try:
+            if self.addressing == WRAPPER:
+                while True:
+                    header = await self._reader.readexactly(wrapper.HEADER.size)
+                    self._dispatch(header + await self._reader.readexactly(wrapper.HEADER.unpack(header)[3]))
+            else:
+                framer = hdlc.Framer()
+                while data := await self._reader.read(0xffff):
+                    framer.feed(data)
+                    while (frame := framer.next_frame()) is not None:
+                        self._dispatch(frame)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            exc = ConnectionError(F"concentrator {self}: {e}")
+        finally:
+            for media in self._users.values():
+                media._inbox.fail(exc)
+
+    def _dispatch(self, data: bytes) -> None:
+        try:
+            key = route(data, self.addressing, response=True)
+        except ValueError:
+            self.dropped += 1
+            return
+        if (media := self._routes.get(key)) is None:
+            self.dropped += 1
+            return
+        media._inbox.put(data)
+
+
+@dataclass(eq=False)
+class MuxNetwork(Media):
+    """logical meter behind concentrator, send wrapper PDU or HDLC frame to own address, response is routed by it"""
+    to_connect: float = 20.0
+    to_recv: float = 5.0
+    to_close: float = 3.0
+    concentrator: Concentrator = field(kw_only=True)
+    address: int | bytes = field(kw_only=True)
+    """of meter: wPort for WRAPPER, server address field of frame for HDLC"""
+    _inbox: Inbox = field(init=False, default_factory=lambda: Inbox(RECV_QUEUE_MAX), repr=False)
+    _holds: Optional[asyncio.Semaphore] = field(init=False, default=None, repr=False)
+    """window of concentrator connection with taken slot"""
+    _attached: bool = field(init=False, default=False, repr=False)
+
+    def __str__(self) -> str:
+        return F"{self.concentrator}#{self.address if isinstance(self.address, int) else self.address.hex()}"
+
+    async def open(self) -> result.SimpleOrError[float]:
+        start = time.monotonic()
+        res: result.SimpleOrError[float]
+        try:
+            await self.concentrator.attach(self)
+            self._attached = True
+            self._inbox.reset()
+            res = result.Simple(time.monotonic() - start)
+        except Exception as e:
+            res = result.Error.from_e(e, "Concentrator connection")
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
+
+    def is_open(self) -> bool:
+        return (
+            self._attached
+            and self.concentrator.is_connected()
+        )
+
+    async def close(self) -> result.SimpleOrError[float]:
+        start = time.monotonic()
+        self._release()
+        if self._attached:
+            self._attached = False
+            await self.concentrator.detach(self)
+        elapsed = time.monotonic() - start
+        if self.metrics is not None:
+            self.metrics.close.observe(elapsed)
+        return result.Simple(elapsed)
+
+    def _release(self) -> None:
+        if self._holds is not None:
+            self._holds.release()
+            self._holds = None
+
+    async def send(self, data: bytes) -> None:
+        if not self.is_open():
+            raise RuntimeError("Concentrator connection not available")
+        if (address := route(data, self.concentrator.addressing, response=False)) != self.address:
+            raise ValueError(F"request to {address!r} through media of {self.address!r}")
+        if self._holds is None:
+            window = self.concentrator._window
+            await asyncio.wait_for(window.acquire(), timeout=self._limit(self.to_recv))
+            self._holds = window
+        self._inbox.clear()  # late responses of previous request
+        start = time.monotonic()
+        try:
+            await self.concentrator.write(data)
+        except asyncio.TimeoutError:
+            self._release()
+            raise RuntimeError(f"Drain timeout ({self.concentrator.to_drain}s) exceeded")
+        self._rtt_sent()
+        if self.metrics is not None:
+            self.metrics.sent(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.sent(data)
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        start = time.monotonic()
+        try:
+            data = await self._inbox.get(self._limit(self.recv_timeout))
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            self._release()
+            self._rtt_received(ok=False)
+            if self.metrics is not None:
+                self.metrics.timeout(0)
+            if self.trace is not None:
+                self.trace.timeout()
+            return result.Error.from_e(e)
+        self._release()
+        buf.extend(data)
+        self._rtt_received(ok=True)
+        if self.metrics is not None:
+            self.metrics.received(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.received(data)
+        return result.OK
+
+    async def end_transaction(self) -> None:
+        self._release()
+        self._inbox.clear()
@@ -1,13 +1,20 @@
 import asyncio
+from collections.abc import AsyncIterator
 import platform
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 import time
 from StructResult import result
-from .base import StreamMedia
+from .base import Frame, StreamMedia
+from .pool import ConnectionPool, Connection
+from .policy import Backoff
+from . import hdlc
 
 
 _platform = platform.system()
 CONN_ERROR: str = "Network connection"
+RETRY_BACKOFF = Backoff(base=0.1, max=2.0)
+"""pause between connection attempts limited by OS"""
 
 
 @dataclass
@@ -18,27 +25,63 @@ class Network(StreamMedia):
     to_recv: float = 5.0
     to_close: float = 3.0
     to_drain: float = 2.0
+    pool: Optional[ConnectionPool] = field(default=None, kw_only=True, repr=False, compare=False)
+    """keep connection after close for next open with same host:port"""
 
     def __repr__(self) -> str:
         params: list[str] = [F"host='{self.host}', port={self.port}"]
         return F"{self.__class__.__name__}({', '.join(params)})"
+
+    async def open(self) -> result.SimpleOrError[float]:
+        res: result.SimpleOrError[float] | None = None
+        if self.pool is not None:
+            start = time.monotonic()
+            if (conn := self.pool.acquire((self.host, self.port))) is not None:
+                self._attach(conn)
+                res = result.Simple(time.monotonic() - start)
+        if res is None:
+            res = await self._open()
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
+
+    async def close(self) -> result.SimpleOrError[float]:
+        if (
+            self.pool is not None
+            and self.is_open()
+            and self._is_idle()
+        ):
+            start = time.monotonic()
+            self.pool.release((self.host, self.port), self._detach())
+            elapsed = time.monotonic() - start
+            if self.metrics is not None:
+                self.metrics.close.observe(elapsed)
+            return result.Simple(elapsed)
+        return await self._close()
+
+    def _is_idle(self) -> bool:
+        """no received data left, connection may be reused"""
+        return self._framer.pending == 0
+
+    async def _close(self) -> result.SimpleOrError[float]:
+        return await super().close()
+
     if _platform == "Windows":
-        async def open(self) -> result.SimpleOrError[float]:
+        async def _open(self) -> result.SimpleOrError[float]:
             start = time.monotonic()
             attempt = 1
             acc = result.ErrorAccumulator()
             while True:
                 try:
                     async with asyncio.timeout(self.to_connect):
-                        self._reader, self._writer = await asyncio.open_connection(
-                            host=self.host,
-                            port=self.port)
+                        await self._connect()
                     break
                 except OSError as e:
                     if getattr(e, "winerror", None) == 121:    # limit by OS(21-23 second)
-                        if (time.monotonic() - start) < self.to_connect:
-                            attempt += 1
+                        if (left := self.to_connect - (time.monotonic() - start)) > 0:
                             acc.append_e(e)
+                            await asyncio.sleep(min(left, RETRY_BACKOFF.delay(attempt)))
+                            attempt += 1
                             continue
                         e = TimeoutError(f"with {attempt=}")
                     return result.Error.from_e(e, CONN_ERROR)
@@ -46,19 +89,308 @@ class Network(StreamMedia):
                     return result.Error.from_e(e, CONN_ERROR)
             return acc.merge_err(result.Simple(time.monotonic() - start))
     else:
-        async def open(self) -> result.SimpleOrError[float]:
+        async def _open(self) -> result.SimpleOrError[float]:
             start = time.monotonic()
             try:
                 async with asyncio.timeout(self.to_connect):
-                    self._reader, self._writer = await asyncio.open_connection(
-                        host=self.host,
-                        port=self.port)
+                    await self._connect()
                 return result.Simple(time.monotonic() - start)
             except Exception as e:
                 return result.Error.from_e(e, CONN_ERROR)
 
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            host=self.host,
+            port=self.port)
+
+    def _attach(self, conn: Connection) -> None:
+        assert isinstance(conn, _StreamConnection)
+        self._reader, self._writer = conn.reader, conn.writer
+
+    def _detach(self) -> Connection:
+        conn = _StreamConnection(self._reader, self._writer)
+        del self._reader, self._writer
+        return conn
+
     async def end_transaction(self) -> None:
         ...
 
     def __str__(self) -> str:
         return F"{self.host}:{self.port}"
+
+
+@dataclass(slots=True)
+class _StreamConnection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def is_alive(self) -> bool:
+        return (
+            not self.writer.is_closing()
+            and not self.reader.at_eof()
+            and self.reader.exception() is None
+            and not self.reader._buffer  # late response of previous session, StreamReader has no public size of it
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _RecvProtocol(asyncio.BufferedProtocol):
+    """receive straight into preallocated buffer, it is never resized, so memoryview slices stay valid"""
+
+    def __init__(self, size: int, eof: Optional[bytes]) -> None:
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.eof = eof
+        self.start: int = 0
+        """begin of not consumed data"""
+        self.end: int = 0
+        """end of received data"""
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.exc: Optional[Exception] = None
+        self.at_eof: bool = False
+        self._recv_waiter: Optional[asyncio.Future[None]] = None
+        self._drain_waiter: Optional[asyncio.Future[None]] = None
+        self._reading_paused: bool = False
+        self._writing_paused: bool = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+
+    def get_buffer(self, _sizehint: int) -> memoryview:
+        """append only: data before end may be held by consumer view, space is reused by _reclaim"""
+        return self.view[self.end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.end += nbytes
+        if (
+            self.end == len(self.buf)
+            and self.transport is not None
+        ):  # buffer is full, wait consumer
+            self.transport.pause_reading()
+            self._reading_paused = True
+        self._wakeup()
+
+    def _reclaim(self) -> None:
+        """consumer asks next data, so the last view is released: reuse space of consumed data"""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif (
+            self.end == len(self.buf)
+            and self.start > 0
+        ):  # move tail to begin, allocate only for not consumed part
+            n = self.end - self.start
+            self.buf[:n] = bytes(self.view[self.start:self.end])
+            self.start, self.end = 0, n
+        if self.end < len(self.buf):
+            self._resume_reading()
+
+    def eof_received(self) -> bool:
+        self.at_eof = True
+        self._wakeup()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.at_eof = True
+        self.exc = exc
+        self._wakeup()
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def pause_writing(self) -> None:
+        self._writing_paused = True
+
+    def resume_writing(self) -> None:
+        self._writing_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    def _wakeup(self) -> None:
+        if self._recv_waiter is not None and not self._recv_waiter.done():
+            self._recv_waiter.set_result(None)
+
+    def wait_data(self) -> asyncio.Future[None]:
+        """future is done with new data or connection lost, create before await for not miss data"""
+        self._recv_waiter = asyncio.get_running_loop().create_future()
+        return self._recv_waiter
+
+    async def drain(self) -> None:
+        if self.exc is not None:
+            raise self.exc
+        if not self._writing_paused:
+            return
+        self._drain_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._drain_waiter
+        finally:
+            self._drain_waiter = None
+
+    def next_frame(self) -> Optional[memoryview]:
+        """return view to complete message or None. View is valid until next call of next_frame or take"""
+        self._reclaim()
+        if self.start == self.end:
+            return None
+        if self.eof is None:
+            begin, stop = self.start, self.end
+            self.start = stop
+        elif self.eof == hdlc.FLAG_B:
+            begin, stop = hdlc.search(self.buf, self.start, self.end)
+            if stop == -1:
+                self.start = begin
+                return None
+            self.start = stop - 1  # closing flag can be opening flag of next frame
+        else:
+            if (pos := self.buf.find(self.eof, self.start, self.end)) == -1:
+                return None
+            begin, stop = self.start, pos + len(self.eof)
+            self.start = stop
+        return self.view[begin:stop]
+
+    def take(self) -> memoryview:
+        """return all not consumed data"""
+        self._reclaim()
+        begin = self.end if self.pending == 0 else self.start
+        self.start = self.end
+        return self.view[begin:self.end]
+
+    @property
+    def pending(self) -> int:
+        """amount of not consumed bytes, single closing flag of HDLC is not counted"""
+        if (
+            (n := self.end - self.start) == 1
+            and self.eof == hdlc.FLAG_B
+            and self.buf[self.start] == hdlc.FLAG
+        ):
+            return 0
+        return n
+
+    def is_alive(self) -> bool:
+        return (
+            self.transport is not None
+            and not self.transport.is_closing()
+            and not self.at_eof
+            and self.pending == 0
+        )
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    def _resume_reading(self) -> None:
+        if self._reading_paused and self.transport is not None:
+            self._reading_paused = False
+            self.transport.resume_reading()
+
+
+@dataclass
+class BufferedNetwork(Network):
+    """Network with asyncio.BufferedProtocol: receive into reusable buffer without bytes allocation for every read"""
+    _protocol: _RecvProtocol = field(init=False, repr=False, compare=False)
+
+    async def _connect(self) -> None:
+        _, self._protocol = await asyncio.get_running_loop().create_connection(
+            protocol_factory=lambda: _RecvProtocol(self.recv_size, self.EOF),
+            host=self.host,
+            port=self.port)
+
+    def _attach(self, conn: Connection) -> None:
+        assert isinstance(conn, _RecvProtocol)
+        self._protocol = conn
+
+    def _detach(self) -> Connection:
+        conn = self._protocol
+        del self._protocol
+        return conn
+
+    def is_open(self) -> bool:
+        return (
+            hasattr(self, "_protocol")
+            and self._protocol.transport is not None
+            and not self._protocol.transport.is_closing()
+        )
+
+    def _at_eof(self) -> bool:
+        return (
+            not self.is_open()
+            or self._protocol.at_eof
+        )
+
+    def _is_idle(self) -> bool:
+        return self._protocol.pending == 0
+
+    async def _close(self) -> result.SimpleOrError[float]:
+        start = time.monotonic()
+        if not hasattr(self, "_protocol") or self._protocol.transport is None:
+            return result.Error.from_e(ConnectionError("no transport available"))
+        transport = self._protocol.transport
+        if not transport.is_closing():
+            transport.close()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._protocol.closed), timeout=self.to_close)
+        except asyncio.TimeoutError:
+            transport.abort()
+            return result.Error.from_e(ConnectionError("close timeout"))
+        elapsed = time.monotonic() - start
+        if self.metrics is not None:
+            self.metrics.close.observe(elapsed)
+        return result.Simple(elapsed)
+
+    async def send(self, data: bytes) -> None:
+        if not self.is_open():
+            raise RuntimeError("Transport not available")
+        self._protocol.transport.write(data)  # type: ignore[union-attr]
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._protocol.drain(), timeout=self._limit(self.to_drain))
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Drain timeout ({self.to_drain}s) exceeded")
+        self._rtt_sent()
+        if self.metrics is not None:
+            self.metrics.sent(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.sent(data)
+
+    async def receive_view(self) -> result.SimpleOrError[memoryview]:
+        """zero-copy receive: return view to complete message in internal buffer. View is valid until next receive"""
+        p = self._protocol
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self._limit(self.recv_timeout)):
+                while (view := p.next_frame()) is None:
+                    if p.at_eof:
+                        return result.Error.from_e(ConnectionError("no data received"))
+                    await p.wait_data()
+            self._rtt_received(ok=True)
+            if self.metrics is not None:
+                self.metrics.received(len(view), time.monotonic() - start)
+            if self.trace is not None:
+                self.trace.received(view)
+            return result.Simple(view)
+        except asyncio.TimeoutError as e:
+            self._rtt_received(ok=False)
+            if self.metrics is not None:
+                self.metrics.timeout(p.end - p.start)
+            if self.trace is not None:
+                self.trace.timeout(p.view[p.start:p.end])
+            return result.Error.from_e(e)
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        if isinstance(res := await self.receive_view(), result.Error):
+            buf.extend(self._protocol.take())
+            return res
+        buf.extend(res.value)
+        return result.OK
+
+    async def frames(self) -> AsyncIterator[Frame]:
+        """zero-copy Media.frames: data is view to receive buffer, valid until next iteration"""
+        while True:
+            if isinstance(res := await self.receive_view(), result.Error):
+                if self._at_eof():
+                    break
+                continue
+            yield Frame(res.value, time.monotonic())
@@ -0,0 +1,186 @@
+"""reconnect policy: open attempts with backoff and circuit breaker per endpoint"""
+import asyncio
+from dataclasses import dataclass, field
+from enum import Enum
+import random
+import time
+from typing import TYPE_CHECKING, Any
+from StructResult import result
+if TYPE_CHECKING:
+    from .base import Media
+
+
+@dataclass(slots=True)
+class Backoff:
+    """exponential delay with jitter"""
+    base: float = 0.5
+    """first delay in sec"""
+    factor: float = 2.0
+    max: float = 30.0
+    """in sec"""
+    jitter: float = 1.0
+    """random part of delay: 0 is exact, 1 is full jitter"""
+
+    def delay(self, attempt: int) -> float:
+        """attempt from 1"""
+        d = min(self.max, self.base * self.factor ** (attempt - 1))
+        return d * (1.0 - self.jitter * random.random())
+
+
+class CircuitOpenError(ConnectionError):
+    """endpoint is not available by circuit breaker"""
+
+
+class State(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+@dataclass(slots=True)
+class CircuitBreaker:
+    """fail fast to unreachable endpoint: open after failures in a row, half-open for probe after pause"""
+    failures_to_open: int = 3
+    pause: Backoff = field(default_factory=lambda: Backoff(base=10.0, max=600.0, jitter=0.2))
+    """open period, grows with trips in a row"""
+    probes: int = 1
+    """sessions at same time in half-open"""
+    state: State = field(init=False, default=State.CLOSED)
+    failures: int = field(init=False, default=0)
+    trips: int = field(init=False, default=0)
+    """opens without success"""
+    retry_at: float = field(init=False, default=0.0)
+    """time.monotonic() of half-open"""
+    _probing: int = field(init=False, default=0)
+
+    def allow(self) -> bool:
+        """session may start, call success or failure after it"""
+        if self.state == State.OPEN:
+            if time.monotonic() < self.retry_at:
+                return False
+            self.state = State.HALF_OPEN
+            self._probing = 0
+        if self.state == State.HALF_OPEN:
+            if self._probing >= self.probes:
+                return False
+            self._probing += 1
+        return True
+
+    def available(self) -> bool:
+        """like allow without probe taking, for schedulers"""
+        if self.state == State.OPEN:
+            return time.monotonic() >= self.retry_at
+        if self.state == State.HALF_OPEN:
+            return self._probing < self.probes
+        return True
+
+    def success(self) -> None:
+        self.state = State.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._probing = 0
+
+    def failure(self) -> None:
+        self.failures += 1
+        if (
+            self.state == State.HALF_OPEN
+            or self.failures >= self.failures_to_open
+        ):
+            self.trips += 1
+            self.state = State.OPEN
+            self.retry_at = time.monotonic() + self.pause.delay(self.trips)
+            self._probing = 0
+
+    def release(self) -> None:
+        """session ended without result, e.g. cancelled: free probe"""
+        if (
+            self.state == State.HALF_OPEN
+            and self._probing > 0
+        ):
+            self._probing -= 1
+
+    def retry_in(self) -> float:
+        """sec to half-open"""
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == State.OPEN else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": self.retry_in()
+        }
+
+
+class EndpointHealth:
+    """circuit breakers by endpoint, shared by medias and schedulers"""
+
+    def __init__(self) -> None:
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker | None:
+        return self._breakers.get(endpoint)
+
+    def breaker(self, endpoint: str, policy: "Policy") -> CircuitBreaker:
+        """get or create with parameters of policy"""
+        if (b := self._breakers.get(endpoint)) is None:
+            b = self._breakers[endpoint] = CircuitBreaker(policy.failures_to_open, policy.pause, policy.probes)
+        return b
+
+    def available(self, endpoint: str) -> bool:
+        return (b := self._breakers.get(endpoint)) is None or b.available()
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        return {endpoint: b.snapshot() for endpoint, b in self._breakers.items()}
+
+    def __contains__(self, endpoint: str) -> bool:
+        return endpoint in self._breakers
+
+
+HEALTH = EndpointHealth()
+"""default health registry"""
+
+
+@dataclass(eq=False)
+class Policy:
+    """set to Media.policy, used by poller and Policy.open(media). Endpoint is str(media)"""
+    attempts: int = 1
+    """open attempts in one session"""
+    backoff: Backoff = field(default_factory=Backoff)
+    """delay between open attempts"""
+    failures_to_open: int = 3
+    """failed sessions in a row for open circuit"""
+    pause: Backoff = field(default_factory=lambda: Backoff(base=10.0, max=600.0, jitter=0.2))
+    probes: int = 1
+    health: EndpointHealth = field(default_factory=lambda: HEALTH)
+
+    def breaker(self, media: "Media") -> CircuitBreaker:
+        return self.health.breaker(str(media), self)
+
+    def available(self, media: "Media") -> bool:
+        return self.health.available(str(media))
+
+    async def open(self, media: "Media") -> result.SimpleOrError[float]:
+        """open with circuit breaker and attempts, report session result with done()"""
+        breaker = self.breaker(media)
+        if not breaker.allow():
+            return result.Error.from_e(CircuitOpenError(F"{media}: circuit {breaker.state.value}, retry in {breaker.retry_in():.1f}s"))
+        attempt = 1
+        while isinstance(res := await media.open(), result.Error):
+            if attempt >= self.attempts:
+                breaker.failure()
+                break
+            await asyncio.sleep(self.backoff.delay(attempt))
+            attempt += 1
+        return res
+
+    def done(self, media: "Media", *, ok: bool) -> None:
+        """result of opened session"""
+        if ok:
+            self.breaker(media).success()
+        else:
+            self.breaker(media).failure()
+
+    def release(self, media: "Media") -> None:
+        """end of session without result, e.g. cancelled"""
+        self.breaker(media).release()
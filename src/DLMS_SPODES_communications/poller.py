@@ -0,0 +1,224 @@
+"""mass polling of media with concurrency limits"""
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Hashable, Iterable, Sequence
+from contextlib import suppress
+from dataclasses import dataclass, field
+import time
+from typing import Optional
+from StructResult import result
+from .base import Media
+from .policy import CircuitOpenError
+
+
+@dataclass(slots=True)
+class PollResult:
+    media: Media
+    requests: Sequence[bytes]
+    responses: list[bytearray] = field(default_factory=list)
+    """one response for every handled request"""
+    status: result.Ok | result.Error = result.OK
+    elapsed: float = 0.0
+    """session time from open to close"""
+
+
+async def open_media(media: Media) -> result.SimpleOrError[float]:
+    """open with media.policy if it set, report result of opened session with report()"""
+    if (policy := media.policy) is None:
+        return await media.open()
+    try:
+        return await policy.open(media)
+    except BaseException:  # cancelled
+        policy.release(media)
+        raise
+
+
+def report(media: Media, status: Optional[result.Ok | result.Error]) -> None:
+    """session result to media.policy, None is session without result, e.g. cancelled"""
+    if (policy := media.policy) is None:
+        return
+    if status is None:
+        policy.release(media)
+    else:
+        policy.done(media, ok=isinstance(status, result.Ok))
+
+
+async def transact(media: Media, request: bytes, buf: bytearray, budget: Optional[float]) -> result.Ok | result.Error:
+    """send request and receive response to buf in one transaction
+    Args:
+        budget: deadline in sec from send to complete response, None is timeouts of every call
+    """
+    if budget is None:
+        try:
+            await media.send(request)
+            return await media.receive(buf)
+        finally:
+            await media.end_transaction()
+    async with media.transaction(budget):
+        await media.send(request)
+        return await media.receive(buf)
+
+
+async def exchange(media: Media, requests: Sequence[bytes], budget: Optional[float] = None) -> PollResult:
+    """one session: open, send every request and receive response, close. With media.policy report result to circuit breaker
+    Args:
+        budget: deadline of every request in sec from send to complete response, None is timeouts of every call
+    """
+    res = PollResult(media, requests)
+    start = time.monotonic()
+    if isinstance(res_open := await open_media(media), result.Error):
+        res.status = res_open
+        res.elapsed = time.monotonic() - start
+        return res
+    completed = False
+    """session has result, cancelled is not"""
+    try:
+        for request in requests:
+            res_recv = await transact(media, request, buf := bytearray(), budget)
+            res.responses.append(buf)
+            if isinstance(res_recv, result.Error):
+                res.status = res_recv
+                break
+        completed = True
+    except Exception as e:
+        res.status = result.Error.from_e(e)
+        completed = True
+    finally:
+        report(media, res.status if completed else None)
+        await media.close()
+        res.elapsed = time.monotonic() - start
+    return res
+
+
+@dataclass(slots=True)
+class _Endpoint:
+    active: int = 0
+    """tasks of endpoint, with starting"""
+    waiting: deque[tuple[Media, Sequence[bytes]]] = field(default_factory=deque)
+    """jobs for busy endpoint, handled by its tasks one by one"""
+
+
+class _Sessions:
+    """tasks of poll: not more than per_endpoint for endpoint, jobs of busy endpoint wait in its queue without task"""
+
+    def __init__(self, limit: int, per_endpoint: int, key: Callable[[Media], Hashable], budget: Optional[float], queue: Optional[int]) -> None:
+        self.per_endpoint = per_endpoint
+        self.key = key
+        self.budget = budget
+        self.queue = queue
+        self.slots = asyncio.Semaphore(limit)
+        self.backlog = asyncio.Semaphore(2 * limit)
+        """limit of created tasks"""
+        self.endpoints: dict[Hashable, _Endpoint] = {}
+        self.waiting = 0
+        """jobs in queues of endpoints"""
+        self.dequeued = asyncio.Event()
+        """set with job taken from queue or free endpoint"""
+        self.results: asyncio.Queue[Optional[PollResult]] = asyncio.Queue(limit)
+        """bounded by slots, sessions wait for slow consumer; None is end"""
+
+    async def available(self, media: Media, requests: Sequence[bytes]) -> bool:
+        """with open circuit of policy put error result"""
+        if (
+            media.policy is not None
+            and not media.policy.available(media)
+        ):
+            await self.results.put(PollResult(media, requests, status=result.Error.from_e(CircuitOpenError(F"{media}: circuit open"))))
+            return False
+        return True
+
+    async def produce(self, jobs: Iterable[tuple[Media, Sequence[bytes]]] | AsyncIterable[tuple[Media, Sequence[bytes]]]) -> None:
+        """admit all jobs, put None to results after the last result"""
+        try:
+            async with asyncio.TaskGroup() as tg:
+                if isinstance(jobs, AsyncIterable):
+                    async for media, requests in jobs:
+                        await self._admit(tg, media, requests)
+                else:
+                    for media, requests in jobs:
+                        await self._admit(tg, media, requests)
+        except Exception:
+            await self.results.put(None)
+            raise
+        await self.results.put(None)
+
+    async def _admit(self, tg: asyncio.TaskGroup, media: Media, requests: Sequence[bytes]) -> None:
+        """start task for free endpoint or queue job, wait with full queues"""
+        if not await self.available(media, requests):
+            return
+        k = self.key(media)
+        while True:
+            if (ep := self.endpoints.get(k)) is None:
+                ep = self.endpoints[k] = _Endpoint()
+            if ep.active < self.per_endpoint:
+                ep.active += 1
+                await self.backlog.acquire()
+                tg.create_task(self._run(k, ep, media, requests))
+                return
+            if (
+                self.queue is None
+                or self.waiting < self.queue
+            ):
+                ep.waiting.append((media, requests))
+                self.waiting += 1
+                return
+            self.dequeued.clear()
+            await self.dequeued.wait()
+
+    async def _run(self, k: Hashable, ep: _Endpoint, media: Media, requests: Sequence[bytes]) -> None:
+        """handle job and next waiting jobs of endpoint"""
+        job: Optional[tuple[Media, Sequence[bytes]]] = (media, requests)
+        try:
+            while job is not None:
+                async with self.slots:
+                    res = await exchange(*job, self.budget)
+                await self.results.put(res)
+                job = await self._next(ep)
+        finally:
+            ep.active -= 1
+            if ep.active == 0 and not ep.waiting:
+                del self.endpoints[k]
+            self.dequeued.set()
+            self.backlog.release()
+
+    async def _next(self, ep: _Endpoint) -> Optional[tuple[Media, Sequence[bytes]]]:
+        """available job from queue of endpoint"""
+        while ep.waiting:
+            media, requests = ep.waiting.popleft()
+            self.waiting -= 1
+            self.dequeued.set()
+            if await self.available(media, requests):
+                return media, requests
+        return None
+
+
+async def poll(
+        jobs: Iterable[tuple[Media, Sequence[bytes]]] | AsyncIterable[tuple[Media, Sequence[bytes]]],
+        limit: int = 100,
+        per_endpoint: int = 1,
+        key: Callable[[Media], Hashable] = str,
+        budget: Optional[float] = None,
+        queue: Optional[int] = None
+) -> AsyncIterator[PollResult]:
+    """run exchange for every job and yield results as they complete
+    Args:
+        jobs: media with request frames, async source is read as far as backlog allowed
+        limit: sessions at same time, and completed results not taken by consumer
+        per_endpoint: sessions at same time with one endpoint, e.g. gateway
+        key: endpoint of media, by default <host:port> for Network and <port,baudrate> for Serial
+        budget: deadline of every request, see exchange
+        queue: jobs waiting for busy endpoints, reading of jobs is paused above it. None is without limit, source may be read to end
+    Media with open circuit of policy is returned with error at once, without waiting of slots.
+    Jobs of busy endpoint wait in queue of endpoint without task, so they don't hold backlog of other endpoints
+    """
+    sessions = _Sessions(limit, per_endpoint, key, budget, queue)
+    producer = asyncio.create_task(sessions.produce(jobs))
+    try:
+        while (res := await sessions.results.get()) is not None:
+            yield res
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
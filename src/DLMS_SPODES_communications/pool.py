@@ -0,0 +1,119 @@
+"""keep-alive connections pool for Network media"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from collections.abc import Hashable
+from typing import Optional, Protocol
+import time
+
+
+class Connection(Protocol):
+    """detached connection of media"""
+
+    def is_alive(self) -> bool:
+        """connection may be used by next session"""
+
+    def close(self) -> None:
+        """start close without wait"""
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    """closed by idle timeout"""
+    dead: int = 0
+    """closed by liveness check"""
+    evicted: int = 0
+    """closed by max_per_endpoint limit"""
+
+
+@dataclass(slots=True)
+class _Idle:
+    conn: Connection
+    since: float
+
+
+@dataclass
+class ConnectionPool:
+    """idle connections keyed by endpoint, the warmest connection is given first"""
+    max_per_endpoint: int = 4
+    """idle connections limit for one endpoint"""
+    idle_timeout: float = 60.0
+    """in sec"""
+    stats: PoolStats = field(init=False, default_factory=PoolStats)
+    _idle: dict[Hashable, deque[_Idle]] = field(init=False, default_factory=dict, repr=False)
+
+    def acquire(self, key: Hashable) -> Connection | None:
+        """return alive connection or None"""
+        if queue := self._idle.get(key):
+            self._expire(queue, time.monotonic())
+            while queue:
+                item = queue.pop()
+                if item.conn.is_alive():
+                    self.stats.hits += 1
+                    return item.conn
+                item.conn.close()
+                self.stats.dead += 1
+            del self._idle[key]
+        self.stats.misses += 1
+        return None
+
+    def release(self, key: Hashable, conn: Connection) -> None:
+        """keep connection for next acquire, close expired ones and the oldest one with overflow"""
+        if (queue := self._idle.get(key)) is None:
+            queue = self._idle[key] = deque()
+        now = time.monotonic()
+        self._expire(queue, now)
+        queue.append(_Idle(conn, now))
+        while len(queue) > self.max_per_endpoint:
+            queue.popleft().conn.close()
+            self.stats.evicted += 1
+
+    def _expire(self, queue: deque[_Idle], now: float) -> None:
+        """close idle longer than timeout, they are the oldest ones"""
+        while (
+            queue
+            and now - queue[0].since > self.idle_timeout
+        ):
+            queue.popleft().conn.close()
+            self.stats.expired += 1
+
+    def purge(self) -> int:
+        """close expired and dead connections, return amount of closed"""
+        now = time.monotonic()
+        n = 0
+        for key, queue in tuple(self._idle.items()):
+            for item in tuple(queue):
+                if now - item.since > self.idle_timeout:
+                    self.stats.expired += 1
+                elif not item.conn.is_alive():
+                    self.stats.dead += 1
+                else:
+                    continue
+                queue.remove(item)
+                item.conn.close()
+                n += 1
+            if not queue:
+                del self._idle[key]
+        return n
+
+    async def reap(self, interval: Optional[float] = None) -> None:
+        """purge forever, run as task and cancel it with pool clear
+        Args:
+            interval: in sec, None is half of idle_timeout
+        """
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2 if interval is None else interval)
+            self.purge()
+
+    def clear(self) -> None:
+        """close all idle connections"""
+        for queue in self._idle.values():
+            for item in queue:
+                item.conn.close()
+        self._idle.clear()
+
+    def __len__(self) -> int:
+        return sum(map(len, self._idle.values()))
@@ -0,0 +1,152 @@
+"""compact table of fleet endpoints, Media is created only for session"""
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, fields
+import ipaddress
+import socket
+from typing import Any, Optional
+from weakref import WeakValueDictionary
+from .base import Media
+
+
+@dataclass(frozen=True, slots=True)
+class Profile:
+    """timeouts shared by endpoints, None is default of media class"""
+    to_connect: Optional[float] = None
+    to_recv: Optional[float] = None
+    to_close: Optional[float] = None
+    to_drain: Optional[float] = None
+    EOF: Optional[bytes] = None
+
+    def kwargs(self) -> dict[str, Any]:
+        return {f: v for f in self.__slots__ if (v := getattr(self, f)) is not None}
+
+
+DEFAULT_PROFILE = Profile()
+
+
+def _network(host: str, port: int, kwargs: dict[str, Any]) -> Media:
+    from .network import Network
+    return _create(Network, {"host": host, "port": str(port), **kwargs})
+
+
+def _buffered(host: str, port: int, kwargs: dict[str, Any]) -> Media:
+    from .network import BufferedNetwork
+    return _create(BufferedNetwork, {"host": host, "port": str(port), **kwargs})
+
+
+def _udp(host: str, port: int, kwargs: dict[str, Any]) -> Media:
+    from .udp import UDP
+    return _create(UDP, {"host": host, "port": port, **kwargs})
+
+
+def _serial(host: str, port: int, kwargs: dict[str, Any]) -> Media:
+    from .serial_port import Serial
+    return _create(Serial, {"port": host, "baudrate": str(port), **kwargs})
+
+
+def _rs485(host: str, port: int, kwargs: dict[str, Any]) -> Media:
+    from .serial_port import RS485, register_RS485
+    return register_RS485(_create(RS485, {"port": host, "baudrate": str(port), **kwargs}))  # type: ignore[arg-type]
+
+
+_init_fields: dict[type, frozenset[str]] = {}
+
+
+def _create(cls: type[Media], kwargs: dict[str, Any]) -> Media:
+    """skip profile fields not used by cls, e.g. to_drain of UDP"""
+    if (names := _init_fields.get(cls)) is None:
+        names = _init_fields[cls] = frozenset(f.name for f in fields(cls) if f.init)
+    return cls(**{k: v for k, v in kwargs.items() if k in names})
+
+
+KINDS: dict[str, Callable[[str, int, dict[str, Any]], Media]] = {
+    "tcp": _network,
+    "tcp-buffered": _buffered,
+    "udp": _udp,
+    "serial": _serial,
+    "rs485": _rs485
+}
+"""media factories by kind: (host or serial port, TCP/UDP port or baudrate, profile kwargs)"""
+
+
+class EndpointTable:
+    """endpoints in columns: IPv4 hosts as int, other hosts and ports interned, shared profiles.
+    Media of endpoint is created on access and live while it referenced, e.g. by poller session"""
+
+    def __init__(self) -> None:
+        self._kinds = array("B")
+        self._hosts = array("q")
+        """IPv4 address or -(index of string + 1)"""
+        self._ports = array("I")
+        self._profiles = array("H")
+        self._kind_names: list[str] = []
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._profile_list: list[Profile] = []
+        self._profile_ids: dict[Profile, int] = {}
+        self.active: WeakValueDictionary[int, Media] = WeakValueDictionary()
+        """created media by index"""
+
+    def add(self, kind: str, host: str, port: int, profile: Profile = DEFAULT_PROFILE) -> int:
+        """return index of endpoint
+        Args:
+            kind: key of KINDS
+            host: IP, host name or serial port
+            port: TCP/UDP port or baudrate
+        """
+        if kind not in KINDS:
+            raise ValueError(F"unknown endpoint kind {kind}, expected {', '.join(KINDS)}")
+        if kind not in self._kind_names:
+            self._kind_names.append(kind)
+        self._kinds.append(self._kind_names.index(kind))
+        try:
+            self._hosts.append(int(ipaddress.IPv4Address(host)))
+        except ValueError:
+            if (i := self._string_ids.get(host)) is None:
+                i = self._string_ids[host] = len(self._strings)
+                self._strings.append(host)
+            self._hosts.append(-(i + 1))
+        self._ports.append(port)
+        if (p := self._profile_ids.get(profile)) is None:
+            p = self._profile_ids[profile] = len(self._profile_list)
+            self._profile_list.append(profile)
+        self._profiles.append(p)
+        return len(self._kinds) - 1
+
+    def extend(self, endpoints: Iterable[tuple[str, str, int]], profile: Profile = DEFAULT_PROFILE) -> range:
+        """add (kind, host, port), return indexes"""
+        start = len(self)
+        for kind, host, port in endpoints:
+            self.add(kind, host, port, profile)
+        return range(start, len(self))
+
+    def host(self, i: int) -> str:
+        if (h := self._hosts[i]) >= 0:
+            return socket.inet_ntoa(h.to_bytes(4, "big"))
+        return self._strings[-h - 1]
+
+    def describe(self, i: int) -> tuple[str, str, int, Profile]:
+        return self._kind_names[self._kinds[i]], self.host(i), self._ports[i], self._profile_list[self._profiles[i]]
+
+    def media(self, i: int) -> Media:
+        """active media of endpoint or new"""
+        if (m := self.active.get(i)) is None:
+            kind, host, port, profile = self.describe(i)
+            m = self.active[i] = KINDS[kind](host, port, profile.kwargs())
+        return m
+
+    def __getitem__(self, i: int) -> Media:
+        return self.media(i)
+
+    def jobs(self, indexes: Iterable[int], requests: Sequence[bytes]) -> Iterator[tuple[Media, Sequence[bytes]]]:
+        """lazy jobs for poll, media is created when poller take it"""
+        for i in indexes:
+            yield self.media(i), requests
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def nbytes(self) -> int:
+        """size of columns"""
+        return sum(a.itemsize * len(a) for a in (self._kinds, self._hosts, self._ports, self._profiles))
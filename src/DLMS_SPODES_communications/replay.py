@@ -0,0 +1,206 @@
+"""record traffic of any media to binary log and replay it without meters
+log format: MAGIC, records of RECORD header and data. Record time is time.monotonic() of recording host
+"""
+import asyncio
+from array import array
+from dataclasses import dataclass, field
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+from StructResult import result
+from .base import Media
+
+MAGIC: bytes = b"DLMSREC1"
+RECORD = struct.Struct("<BdI")
+"""kind, time, data length"""
+OPEN, OPEN_ERROR, SEND, RECV, RECV_ERROR, CLOSE = range(6)
+"""record kinds. OPEN data is open time as double, RECV_ERROR data is partial data"""
+ELAPSED = struct.Struct("<d")
+
+
+@dataclass(eq=False)
+class RecordingMedia:
+    """wrapper of media with append log of open, send, receive and close. Other attributes of media are available"""
+    media: Media
+    path: str
+    _fd: Optional[int] = field(init=False, default=None, repr=False)
+    """log descriptor in append mode, record is written by one call, so it is in file without flush"""
+
+    def __getattr__(self, name: str) -> object:
+        if name == "media":
+            raise AttributeError(name)
+        return getattr(self.media, name)
+
+    def __str__(self) -> str:
+        return str(self.media)
+
+    def _write(self, kind: int, data: bytes | bytearray | memoryview = b"") -> None:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            if os.fstat(self._fd).st_size == 0:
+                os.write(self._fd, MAGIC)
+        os.write(self._fd, RECORD.pack(kind, time.monotonic(), len(data)) + data)
+
+    async def open(self) -> result.SimpleOrError[float]:
+        if isinstance(res := await self.media.open(), result.Error):
+            self._write(OPEN_ERROR)
+        else:
+            self._write(OPEN, ELAPSED.pack(res.value))
+        return res
+
+    def is_open(self) -> bool:
+        return self.media.is_open()
+
+    async def close(self) -> result.SimpleOrError[float]:
+        res = await self.media.close()
+        self._write(CLOSE)
+        return res
+
+    async def send(self, data: bytes) -> None:
+        await self.media.send(data)
+        self._write(SEND, data)
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        size = len(buf)
+        res = await self.media.receive(buf)
+        self._write(RECV_ERROR if isinstance(res, result.Error) else RECV, memoryview(buf)[size:])
+        return res
+
+    async def end_transaction(self) -> None:
+        await self.media.end_transaction()
+
+    def stop(self) -> None:
+        """close log file"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ReplayLog:
+    """memory mapped log with index of records and sessions, share it by many ReplayMedia"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC):
+                raise ValueError(F"empty replay log {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(F"{path} is not replay log")
+        self.kinds = bytearray()
+        self.times = array("d")
+        self.offsets = array("Q")
+        """of data"""
+        self.lengths = array("I")
+        self.sessions: list[int] = []
+        """index of OPEN records"""
+        pos = len(MAGIC)
+        end = len(self._mm)
+        while pos + RECORD.size <= end:
+            kind, t, length = RECORD.unpack_from(self._mm, pos)
+            pos += RECORD.size
+            if pos + length > end:
+                break  # not complete last record
+            if kind == OPEN:
+                self.sessions.append(len(self.kinds))
+            self.kinds.append(kind)
+            self.times.append(t)
+            self.offsets.append(pos)
+            self.lengths.append(length)
+            pos += length
+
+    def data(self, i: int) -> memoryview:
+        return memoryview(self._mm)[self.offsets[i]: self.offsets[i] + self.lengths[i]]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+@dataclass
+class ReplayMedia(Media):
+    """replay one recorded session of log with recorded latencies divided by speed, speed=float("inf") is without delays"""
+    session: int = 0
+    """index of session in log"""
+    speed: float = 1.0
+    to_connect: float = 10.0
+    to_recv: float = 5.0
+    to_close: float = 1.0
+    log: ReplayLog = field(kw_only=True)
+    _pos: int = field(init=False, default=-1, repr=False)
+    """next record, -1 is closed"""
+    _anchor: tuple[float, float] = field(init=False, default=(0.0, 0.0), repr=False)
+    """(record time, loop time) of last open or send"""
+
+    def __str__(self) -> str:
+        return F"{self.log.path}#{self.session}"
+
+    async def _wait(self, i: int) -> None:
+        """sleep up to time of record"""
+        if (delay := self._anchor[1] + (self.log.times[i] - self._anchor[0]) / self.speed - asyncio.get_running_loop().time()) > 0:
+            await asyncio.sleep(delay)
+
+    async def open(self) -> result.SimpleOrError[float]:
+        start = time.monotonic()
+        res: result.SimpleOrError[float]
+        if not 0 <= self.session < len(self.log.sessions):
+            res = result.Error.from_e(IndexError(F"{self}: log has {len(self.log.sessions)} sessions"))
+        else:
+            pos = self.log.sessions[self.session]
+            elapsed = ELAPSED.unpack(self.log.data(pos))[0]
+            if (delay := elapsed / self.speed) > 0:
+                await asyncio.sleep(delay)
+            self._anchor = (self.log.times[pos], asyncio.get_running_loop().time())
+            self._pos = pos + 1
+            res = result.Simple(time.monotonic() - start)
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
+
+    def is_open(self) -> bool:
+        return self._pos != -1
+
+    async def close(self) -> result.SimpleOrError[float]:
+        self._pos = -1
+        self._framer.clear()
+        return result.Simple(0.0)
+
+    async def send(self, data: bytes) -> None:
+        if not self.is_open():
+            raise RuntimeError("Replay not open")
+        if (
+            self._pos >= len(self.log)
+            or self.log.kinds[self._pos] != SEND
+        ):
+            raise RuntimeError(F"replay {self}: no recorded send at record {self._pos}")
+        self._anchor = (self.log.times[self._pos], asyncio.get_running_loop().time())
+        self._pos += 1
+        if self.metrics is not None:
+            self.metrics.sent(len(data), 0.0)
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        start = time.monotonic()
+        if (
+            self._pos == -1
+            or self._pos >= len(self.log)
+            or (kind := self.log.kinds[self._pos]) not in (RECV, RECV_ERROR)
+        ):
+            return result.Error(F"replay {self}: no recorded receive at record {self._pos}")
+        i = self._pos
+        self._pos += 1
+        await self._wait(i)
+        buf.extend(data := self.log.data(i))
+        if kind == RECV_ERROR:
+            if self.metrics is not None:
+                self.metrics.timeout(len(data))
+            return result.Error.from_e(TimeoutError("recorded receive error"))
+        if self.metrics is not None:
+            self.metrics.received(len(data), time.monotonic() - start)
+        return result.OK
+
+    async def end_transaction(self) -> None:
+        ...
@@ -0,0 +1,83 @@
+"""adaptive receive timeout from measured round trip time, RFC 6298"""
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass(slots=True)
+class RTTEstimator:
+    """smoothed RTT and variance of one endpoint, set to Media.rtt for enable. Share one estimator by medias of same endpoint"""
+    min_rto: float = 0.5
+    """lower limit of receive timeout, in sec"""
+    max_rto: float = 60.0
+    """upper limit of receive timeout, in sec"""
+    alpha: float = 0.125
+    beta: float = 0.25
+    k: float = 4.0
+    granularity: float = 0.01
+    """in sec"""
+    srtt: Optional[float] = field(init=False, default=None)
+    """None before first sample"""
+    rttvar: float = field(init=False, default=0.0)
+    rto: float = field(init=False, default=0.0)
+    samples: int = field(init=False, default=0)
+    backoffs: int = field(init=False, default=0)
+    """timeouts in a row"""
+
+    def observe(self, rtt: float) -> None:
+        """handle send->receive time of successful exchange"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.rto = self._clamp(self.srtt + max(self.granularity, self.k * self.rttvar))
+        self.samples += 1
+        self.backoffs = 0
+
+    def backoff(self) -> None:
+        """handle receive timeout: double RTO up to max_rto"""
+        if self.srtt is not None:
+            self.rto = self._clamp(2 * self.rto)
+        self.backoffs += 1
+
+    def timeout(self, default: float) -> float:
+        """receive timeout, default before first sample"""
+        return default if self.srtt is None else self.rto
+
+    def _clamp(self, value: float) -> float:
+        return min(self.max_rto, max(self.min_rto, value))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "rto": self.rto,
+            "samples": self.samples,
+            "backoffs": self.backoffs
+        }
+
+
+class Estimators:
+    """RTT estimators by endpoint"""
+
+    def __init__(self, min_rto: float = 0.5, max_rto: float = 60.0) -> None:
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self._estimators: dict[str, RTTEstimator] = {}
+
+    def get(self, endpoint: str) -> RTTEstimator:
+        """get or create estimator, e.g. Network(..., rtt=ESTIMATORS.get("10.0.0.1:8888"))"""
+        if (e := self._estimators.get(endpoint)) is None:
+            e = self._estimators[endpoint] = RTTEstimator(self.min_rto, self.max_rto)
+        return e
+
+    def collect(self) -> dict[str, dict[str, Any]]:
+        return {endpoint: e.snapshot() for endpoint, e in self._estimators.items()}
+
+    def __contains__(self, endpoint: str) -> bool:
+        return endpoint in self._estimators
+
+
+ESTIMATORS = Estimators()
+"""default estimators"""
@@ -1,11 +1,18 @@
 import asyncio
 import time
+from collections.abc import Hashable
 from dataclasses import dataclass, field
+from typing import Optional
 from serial_asyncio import open_serial_connection
 from .base import StreamMedia
+from . import hdlc
 from StructResult import result
 
 BAUD_RATE: str = "9600"
+CHAR_BITS: int = 10
+"""start + 8 data + stop"""
+GAP_MIN: float = 0.02
+"""default lower limit of inter-character gap in sec: USB adapters deliver data by latency timer, 16 ms for FTDI by default"""
 
 
 @dataclass
@@ -16,6 +23,10 @@ class Serial(StreamMedia):
     to_recv: float = 5.0
     to_close: float = 3.0
     to_drain: float = 2.0
+    gap_chars: Optional[float] = field(default=None, kw_only=True)
+    """end of message after silence of gap_chars character times, e.g. 3.5. None is detection by EOF only"""
+    gap_min: float = field(default=GAP_MIN, kw_only=True)
+    """lower limit of gap in sec, must exceed latency of adapter and OS scheduling. Less is for native UART only"""
 
     def __repr__(self) -> str:
         params: list[str] = [F"port='{self.port}'"]
@@ -26,18 +37,107 @@ class Serial(StreamMedia):
     async def open(self) -> result.SimpleOrError[float]:
         """ coroutine start """
         start = time.monotonic()
+        res: result.SimpleOrError[float]
         try:
             self._reader, self._writer = await open_serial_connection(
                 url=self.port,
                 baudrate=self.baudrate)
-            return result.Simple(time.monotonic() - start)
+            res = result.Simple(time.monotonic() - start)
         except Exception as e:  # todo: make with concrete Exceptions
-            return result.Error.from_e(e)
+            res = result.Error.from_e(e)
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
 
     async def close(self) -> result.SimpleOrError[float]:
         await asyncio.sleep(.01)  # need delay before close writer
         return await super(Serial, self).close()
 
+    @property
+    def char_gap(self) -> float:
+        """silence of end of message in sec"""
+        return max(self.gap_min, (self.gap_chars or 0.0) * CHAR_BITS / int(self.baudrate))
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        if self.gap_chars is None:
+            return await super().receive(buf)
+        return await self._receive_gap(buf)
+
+    async def _receive_gap(self, buf: bytearray) -> result.Ok | result.Error:
+        """wait first data up to recv_timeout, next up to char_gap. Complete HDLC frame or EOF return without waiting of gap.
+        HDLC frame not complete before gap is error with partial data"""
+        start = time.monotonic()
+        is_hdlc = self.EOF == hdlc.FLAG_B
+        data = bytearray()
+        timeout = self._limit(self.recv_timeout)
+        received = False
+        while True:
+            if (
+                is_hdlc
+                and (frame := self._framer.next_frame()) is not None
+            ):
+                data = bytearray(frame)
+                break
+            try:
+                chunk = await asyncio.wait_for(self._reader.read(self.recv_size), timeout=timeout)
+            except asyncio.TimeoutError as e:
+                if (
+                    received
+                    and not is_hdlc
+                ):
+                    break
+                return self._gap_timeout(buf, e, received=received)
+            if not chunk:
+                buf.extend(self._framer.take() if is_hdlc else data)
+                return result.Error("no data received")
+            received = True
+            timeout = self.char_gap
+            if is_hdlc:
+                self._framer.feed(chunk)
+                continue
+            data.extend(chunk)
+            if (
+                self.EOF is not None
+                and self.EOF in chunk
+            ):
+                break
+        buf.extend(data)
+        self._rtt_received(ok=True)
+        if self.metrics is not None:
+            self.metrics.received(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.received(data)
+        return result.OK
+
+    def _gap_timeout(self, buf: bytearray, e: asyncio.TimeoutError, *, received: bool) -> result.Error:
+        """error of _receive_gap without message, not complete HDLC frame goes to buf
+        Args:
+            received: device answered, only frame is broken
+        """
+        partial = self._framer.take() if self.EOF == hdlc.FLAG_B else b""
+        buf.extend(partial)
+        self._rtt_received(ok=received)
+        if self.metrics is not None:
+            self.metrics.timeout(len(partial))
+        if self.trace is not None:
+            self.trace.timeout(partial)
+        if received:
+            return result.Error.from_e(TimeoutError(F"not complete HDLC frame after gap {self.char_gap:.4f}s"))
+        return result.Error.from_e(e)
+
+    async def _discard_input(self) -> int:
+        """drop received and not read data: not complete frame and stream buffer, return amount of bytes"""
+        n = len(self._framer.take())
+        try:
+            while True:
+                async with asyncio.timeout(0):  # read of buffered data only, without waiting
+                    if not (chunk := await self._reader.read(self.recv_size)):
+                        break
+                    n += len(chunk)
+        except TimeoutError:
+            pass
+        return n
+
     async def end_transaction(self) -> None:
         ...
 
@@ -49,13 +149,16 @@ class Serial(StreamMedia):
 class RS485(Serial):
     to_line: float = 5.0
     """line timeout"""
-    _lock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
+    priority: int = 0
+    """transaction priority in bus scheduler, less is served first"""
     _in_transaction: bool = field(init=False, default=False)
+    _tx_device: Hashable = field(init=False, default=None)
+    _tx_ok: bool = field(init=False, default=True)
 
     async def open(self) -> result.SimpleOrError[float]:
-        async with self._lock:
-            if (media := medias.get(self.port)) is None:
-                return result.Error.from_e(ConnectionError(f"no find media with {self.port}"))
+        if (media := medias.get(self.port)) is None:
+            return result.Error.from_e(ConnectionError(f"no find media with {self.port}"))
+        async with media.lock:
             media.n_connected += 1
             if medias[self.port].n_connected == 1:  # first connected
                 return await super().open()
@@ -63,32 +166,75 @@ class RS485(Serial):
 
     async def close(self) -> result.SimpleOrError[float]:
         self._cleanup_transaction()
-        async with self._lock:
-            if (media := medias.get(self.port)) is None:
-                return result.Error.from_e(ConnectionError(f"no find media with {self.port}"))
+        if (media := medias.get(self.port)) is None:
+            return result.Error.from_e(ConnectionError(f"no find media with {self.port}"))
+        async with media.lock:
             media.n_connected -= 1
             if media.n_connected <= 0:  # last connected
                 return await super().close()
             else:
                 return result.Simple(0.0).append_e(ValueError("has more connection"))
 
-    async def send(self, data: bytes) -> None:
-        try:
-            await asyncio.wait_for(self._lock.acquire(), 
-                                 timeout=self.to_line)
-        except asyncio.TimeoutError:
-            raise RuntimeError("Cannot acquire transaction lock - timeout")
+    async def send(self, data: bytes, priority: Optional[int] = None) -> None:
+        """start transaction with bus scheduler of port
+        Args:
+            priority: override of instance priority for this transaction
+        """
+        if (media := medias.get(self.port)) is None:
+            raise RuntimeError(F"no find media with {self.port}")
+        device = self._device(data)
+        start = time.monotonic()
+        await media.scheduler.acquire(
+            device=device,
+            priority=self.priority if priority is None else priority,
+            timeout=self.to_line)
+        if self.metrics is not None:
+            self.metrics.lock_wait.observe(time.monotonic() - start)
         self._in_transaction = True
+        self._tx_device = device
+        self._tx_ok = True
         try:
+            media.discarded += await self._discard_input()  # not read tail of previous transaction, e.g. late response to retried request
             await super().send(data)
-        except Exception as e:
+        except BaseException:  # with cancel by transaction deadline too
+            self._tx_ok = False
             self._cleanup_transaction()
-            raise e
+            raise
 
     async def receive(self, buf: bytearray) -> result.Ok | result.Error:
         if not self._in_transaction:
             raise RuntimeError("Receive outside transaction")
-        return await super().receive(buf)
+        try:
+            if (
+                self.EOF != hdlc.FLAG_B
+                or self._tx_device is None
+            ):
+                res = await super().receive(buf)
+            else:
+                res = await self._receive_own(buf)
+        except BaseException:  # cancel by transaction deadline is failure of device
+            self._tx_ok = False
+            raise
+        if isinstance(res, result.Error):
+            self._tx_ok = False
+        return res
+
+    async def _receive_own(self, buf: bytearray) -> result.Ok | result.Error:
+        """receive frame with source address of transaction device, drop frames of others devices: late responses of previous transactions"""
+        media = medias[self.port]
+        while True:
+            frame = bytearray()
+            if isinstance(res := await super().receive(frame), result.Error):
+                buf.extend(frame)
+                return res
+            try:
+                src = hdlc.addresses(frame)[1]
+            except ValueError:
+                src = None
+            if src == self._tx_device:
+                buf.extend(frame)
+                return result.OK
+            media.dropped += 1
 
     async def end_transaction(self) -> None:
         self._cleanup_transaction()
@@ -96,13 +242,136 @@ class RS485(Serial):
     def _cleanup_transaction(self) -> None:
         if self._in_transaction:
             self._in_transaction = False
-            self._lock.release()
+            if (media := medias.get(self.port)) is not None:
+                media.scheduler.release(self._tx_device, ok=self._tx_ok)
+
+    @staticmethod
+    def _device(data: bytes) -> Hashable:
+        """logical device of request: HDLC destination address"""
+        if data[:1] == hdlc.FLAG_B:
+            try:
+                return hdlc.addresses(data)[0]
+            except ValueError:
+                pass
+        return None
+
+
+@dataclass(slots=True)
+class DeviceState:
+    last_served: int = 0
+    """grant number of last transaction, less is served earlier"""
+    failures: int = 0
+    """consecutive failed transactions"""
+    suspended_until: float = 0.0
+
+
+@dataclass(slots=True)
+class _Waiter:
+    device: Hashable
+    priority: int
+    deadline: float
+    seq: int
+    fut: asyncio.Future[None]
+
+
+@dataclass
+class BusScheduler:
+    """serve transactions on one port in priority order (less is first), with round robin between devices of same priority.
+    Device with consecutive failures is served later and suspended after suspend_after"""
+    penalty_after: int = 2
+    """consecutive failures before priority is lowered by amount of failures"""
+    suspend_after: int = 5
+    """consecutive failures before reject transactions"""
+    suspend_time: float = 60.0
+    """in sec"""
+    devices: dict[Hashable, DeviceState] = field(init=False, default_factory=dict)
+    _waiters: list[_Waiter] = field(init=False, default_factory=list, repr=False)
+    _busy: bool = field(init=False, default=False)
+    _seq: int = field(init=False, default=0)
+
+    async def acquire(self, device: Hashable, priority: int = 0, timeout: float = 5.0) -> None:
+        """wait bus for transaction of device not longer than timeout"""
+        if (state := self.devices.get(device)) is None:
+            state = self.devices[device] = DeviceState()
+        now = time.monotonic()
+        if state.suspended_until > now:
+            raise RuntimeError(F"device {device!r} suspended for {state.suspended_until - now:.1f}s after {state.failures} failures")
+        self._seq += 1
+        if not self._busy and not self._waiters:
+            self._grant(state)
+            return
+        w = _Waiter(device, priority, now + timeout, self._seq, asyncio.get_running_loop().create_future())
+        self._waiters.append(w)
+        try:
+            async with asyncio.timeout(timeout):
+                await w.fut
+        except BaseException as e:
+            if w.fut.done() and not w.fut.cancelled() and w.fut.exception() is None:  # granted at the same time
+                self.release(device, ok=True)
+            elif w in self._waiters:
+                self._waiters.remove(w)
+            if isinstance(e, TimeoutError):
+                raise RuntimeError("Cannot acquire transaction lock - timeout") from e
+            raise
+
+    def release(self, device: Hashable, *, ok: bool) -> None:
+        """end transaction of device with result and give bus to next"""
+        state = self.devices[device]
+        if ok:
+            state.failures = 0
+        else:
+            state.failures += 1
+            if state.failures >= self.suspend_after:
+                state.suspended_until = time.monotonic() + self.suspend_time
+                self._reject(device)
+        self._busy = False
+        self._next()
+
+    def _penalty(self, state: DeviceState) -> int:
+        return state.failures if state.failures >= self.penalty_after else 0
+
+    def _next(self) -> None:
+        best: Optional[_Waiter] = None
+        best_key: tuple[int, int, float, int] = (0, 0, 0.0, 0)
+        for w in self._waiters:
+            state = self.devices[w.device]
+            key = (w.priority + self._penalty(state), state.last_served, w.deadline, w.seq)
+            if best is None or key < best_key:
+                best, best_key = w, key
+        if best is not None:
+            self._waiters.remove(best)
+            self._grant(self.devices[best.device])
+            best.fut.set_result(None)
+
+    def _grant(self, state: DeviceState) -> None:
+        self._busy = True
+        self._seq += 1
+        state.last_served = self._seq
+
+    def _reject(self, device: Hashable) -> None:
+        for w in tuple(self._waiters):
+            if w.device == device:
+                self._waiters.remove(w)
+                w.fut.set_exception(RuntimeError(F"device {device!r} suspended"))
 
 
 @dataclass
 class SerialConnector:
     instance: RS485
     n_connected: int
+    scheduler: BusScheduler = field(default_factory=BusScheduler)
+    dropped: int = 0
+    """amount of frames of other devices received in transaction, late responses"""
+    discarded: int = 0
+    """amount of not read bytes dropped at start of transaction"""
+    _lock: Optional[asyncio.Lock] = field(default=None, repr=False)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """guard of n_connected, one for port, created with first open"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
 
 
 medias: dict[str, SerialConnector] = {}
@@ -111,7 +380,6 @@ medias: dict[str, SerialConnector] = {}
 def register_RS485(media: RS485) -> "RS485":
     if media.port not in medias:
         medias[media.port] = SerialConnector(media, 0)
-        # medias[port][0].alien_frames = []
     else:
         pass
     return medias[media.port].instance
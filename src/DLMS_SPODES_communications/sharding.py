@@ -0,0 +1,333 @@
+"""mass polling in worker processes, every worker run own event loop with poller.poll"""
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Hashable, Iterable, Iterator, Sequence
+from contextlib import suppress
+from dataclasses import dataclass, field, fields
+import multiprocessing
+from multiprocessing.connection import Connection
+import os
+import pickle
+import threading
+from typing import Any, Optional
+from StructResult import result
+from .base import Media
+from .poller import PollResult, poll
+
+_JOBS, _END, _CANCEL, _RESULTS, _DONE = range(5)
+"""message tags"""
+JOIN_TIMEOUT: float = 5.0
+"""wait of worker exit after cancel, in sec"""
+
+
+LOCAL_FIELDS: frozenset[str] = frozenset(("pool", "metrics", "rtt", "trace", "cache"))
+"""media fields bound to process, not sent to workers"""
+
+
+def describe(media: Media) -> tuple[type[Media], dict[str, Any]]:
+    """init fields of media without LOCAL_FIELDS"""
+    return type(media), {f.name: getattr(media, f.name) for f in fields(media) if f.init and f.name not in LOCAL_FIELDS}
+
+
+def _send(conn: Connection, tag: int, payload: object = None) -> None:
+    conn.send_bytes(pickle.dumps((tag, payload), pickle.HIGHEST_PROTOCOL))
+
+
+def _read(conn: Connection, loop: asyncio.AbstractEventLoop, on_message: Callable[[Optional[tuple[int, Any]]], None]) -> None:
+    """blocking reader thread, None is closed connection"""
+    while True:
+        try:
+            msg = pickle.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            msg = None
+        with suppress(RuntimeError):  # loop closed
+            loop.call_soon_threadsafe(on_message, msg)
+        if msg is None or msg[0] in (_DONE, _CANCEL):
+            return
+
+
+def _dumps_results(results: list[tuple[int, list[bytearray], result.Ok | result.Error, float]]) -> list[tuple[int, list[bytearray], Any, float]]:
+    """status with not picklable exception replace by RuntimeError"""
+    out: list[tuple[int, list[bytearray], Any, float]] = []
+    for i, responses, status, elapsed in results:
+        try:
+            pickle.dumps(status)
+        except Exception:
+            status = result.Error.from_e(RuntimeError(str(status)))
+        out.append((i, responses, status, elapsed))
+    return out
+
+
+def _worker(conn: Connection, limit: int, per_endpoint: int, key: Callable[[Media], Hashable], batch: int, budget: Optional[float]) -> None:
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_serve(conn, limit, per_endpoint, key, batch, budget))
+    conn.close()
+
+
+@dataclass
+class _Outbox:
+    """results of worker to parent by batches"""
+    conn: Connection
+    batch: int
+    out: list[tuple[int, list[bytearray], result.Ok | result.Error, float]] = field(default_factory=list)
+    _flusher: Optional[asyncio.Handle] = None
+
+    def put(self, i: int, res: PollResult) -> None:
+        """send with full batch, else with results of the same loop iteration"""
+        self.out.append((i, res.responses, res.status, res.elapsed))
+        if len(self.out) >= self.batch:
+            self.flush()
+        elif self._flusher is None:
+            self._flusher = asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self.out:
+            _send(self.conn, _RESULTS, _dumps_results(self.out))
+            self.out.clear()
+
+
+async def _serve(conn: Connection, limit: int, per_endpoint: int, key: Callable[[Media], Hashable], batch: int, budget: Optional[float]) -> None:
+    inbox: asyncio.Queue[Optional[tuple[int, Any]]] = asyncio.Queue()
+    task = asyncio.current_task()
+    index: dict[int, int] = {}
+    """id of media: job index of parent"""
+    outbox = _Outbox(conn, batch)
+
+    def on_message(msg: Optional[tuple[int, Any]]) -> None:
+        if (
+            msg is None
+            or msg[0] == _CANCEL
+        ):
+            task.cancel()  # type: ignore[union-attr]
+        else:
+            inbox.put_nowait(msg)
+
+    async def source() -> AsyncIterator[tuple[Media, Sequence[bytes]]]:
+        while (msg := await inbox.get()) is not None and msg[0] == _JOBS:
+            for i, cls, kwargs, requests in msg[1]:
+                media = cls(**kwargs)
+                index[id(media)] = i
+                yield media, requests
+
+    threading.Thread(target=_read, args=(conn, asyncio.get_running_loop(), on_message), daemon=True).start()
+    with suppress(asyncio.CancelledError):
+        async for res in poll(source(), limit, per_endpoint, key, budget):
+            outbox.put(index.pop(id(res.media)), res)
+    with suppress(OSError):
+        outbox.flush()
+        _send(conn, _DONE)
+
+
+@dataclass(slots=True)
+class _Worker:
+    process: multiprocessing.process.BaseProcess
+    conn: Connection
+    pending: deque[tuple[int, type[Media], dict[str, Any], Sequence[bytes]]] = field(default_factory=deque)
+    """jobs waiting for credit"""
+    in_flight: set[int] = field(default_factory=set)
+    alive: bool = True
+    ended: bool = False
+    """END is sent"""
+
+
+class _Shards:
+    """worker processes of poll_sharded and distribution of jobs to them by endpoint"""
+
+    def __init__(
+            self,
+            jobs: Iterable[tuple[Media, Sequence[bytes]]] | AsyncIterable[tuple[Media, Sequence[bytes]]],
+            n: int,
+            window: int,
+            batch: int,
+            key: Callable[[Media], Hashable]
+    ) -> None:
+        self.n = n
+        self.window = window
+        self.batch = batch
+        self.key = key
+        self.workers: list[_Worker] = []
+        self.inbox: asyncio.Queue[tuple[Optional[_Worker], Optional[tuple[int, Any]]]] = asyncio.Queue()
+        """worker None is failed async source"""
+        self.originals: dict[int, tuple[Media, Sequence[bytes]]] = {}
+        self.counter = 0
+        self.buffered = 0
+        """amount of pending jobs"""
+        self.exhausted = False
+        self.space = asyncio.Event()
+        """pending jobs below limit, for async source"""
+        self.feeder: Optional[asyncio.Task[None]] = None
+        self._it: Optional[Iterator[tuple[Media, Sequence[bytes]]]] = None
+        if isinstance(jobs, AsyncIterable):
+            self.feeder = asyncio.create_task(self._feed(jobs))
+        else:
+            self._it = iter(jobs)
+
+    def start(self, ctx: multiprocessing.context.BaseContext, args: tuple[object, ...]) -> None:
+        """n processes of _worker with args after connection"""
+        loop = asyncio.get_running_loop()
+        for _ in range(self.n):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(child_conn, *args), daemon=True)  # type: ignore[attr-defined]
+            process.start()
+            child_conn.close()
+            w = _Worker(process, parent_conn)
+            self.workers.append(w)
+            threading.Thread(
+                target=_read,
+                args=(parent_conn, loop, lambda msg, w=w: self.inbox.put_nowait((w, msg))),
+                daemon=True
+            ).start()
+
+    def _add(self, media: Media, requests: Sequence[bytes]) -> None:
+        self.originals[self.counter] = (media, requests)
+        cls, kwargs = describe(media)
+        self.workers[hash(self.key(media)) % self.n].pending.append((self.counter, cls, kwargs, requests))
+        self.counter += 1
+        self.buffered += 1
+
+    async def _feed(self, source: AsyncIterable[tuple[Media, Sequence[bytes]]]) -> None:
+        try:
+            async for media, requests in source:
+                while self.buffered >= self.n * self.window:
+                    self.space.clear()
+                    await self.space.wait()
+                self._add(media, requests)
+                self.dispatch()
+        except Exception:
+            self.inbox.put_nowait((None, None))
+            raise
+        finally:
+            self.exhausted = True
+        self.dispatch()
+
+    def fill(self) -> None:
+        """read jobs up to windows of workers and send them"""
+        if self._it is None:
+            self.space.set()
+        else:
+            while not self.exhausted and self.buffered < self.n * self.window:
+                try:
+                    media, requests = next(self._it)
+                except StopIteration:
+                    self.exhausted = True
+                    break
+                self._add(media, requests)
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        for w in self.workers:
+            if w.alive:
+                self._dispatch(w)
+
+    def _dispatch(self, w: _Worker) -> None:
+        while w.pending and len(w.in_flight) < self.window:
+            jobs_batch = []
+            while w.pending and len(jobs_batch) < self.batch and len(w.in_flight) < self.window:
+                job = w.pending.popleft()
+                w.in_flight.add(job[0])
+                jobs_batch.append(job)
+            self.buffered -= len(jobs_batch)
+            _send(w.conn, _JOBS, jobs_batch)
+        if (
+            self.exhausted
+            and not w.pending
+            and not w.ended
+        ):
+            _send(w.conn, _END)
+            w.ended = True
+
+    def received(self, w: _Worker, results: list[tuple[int, list[bytearray], result.Ok | result.Error, float]]) -> list[PollResult]:
+        """results of worker with original medias"""
+        out = []
+        for i, responses, status, elapsed in results:
+            w.in_flight.discard(i)
+            media, requests = self.originals.pop(i)
+            out.append(PollResult(media, requests, responses, status, elapsed))
+        return out
+
+    def lost(self, w: _Worker) -> list[PollResult]:
+        """errors for not handled jobs of exited worker"""
+        w.alive = False
+        lost = list(w.in_flight) + [job[0] for job in w.pending]
+        self.buffered -= len(w.pending)
+        w.in_flight.clear()
+        w.pending.clear()
+        out = []
+        for i in lost:
+            media, requests = self.originals.pop(i)
+            out.append(PollResult(media, requests, status=result.Error.from_e(ConnectionError(F"worker {w.process.pid} exited"))))
+        return out
+
+    async def stop(self, *, cancel: bool) -> None:
+        """wait exit of workers, with cancel of their sessions"""
+        if (
+            self.feeder is not None
+            and not self.feeder.done()
+        ):
+            self.feeder.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.feeder
+        if cancel:
+            for w in self.workers:
+                if w.process.is_alive():
+                    with suppress(OSError):
+                        _send(w.conn, _CANCEL)
+        for w in self.workers:
+            await asyncio.to_thread(w.process.join, JOIN_TIMEOUT)
+            if w.process.is_alive():
+                w.process.terminate()
+                await asyncio.to_thread(w.process.join)
+            w.conn.close()
+
+
+async def poll_sharded(
+        jobs: Iterable[tuple[Media, Sequence[bytes]]] | AsyncIterable[tuple[Media, Sequence[bytes]]],
+        limit: int = 100,
+        per_endpoint: int = 1,
+        key: Callable[[Media], Hashable] = str,
+        workers: Optional[int] = None,
+        window: Optional[int] = None,
+        batch: int = 32,
+        context: str = "spawn",
+        budget: Optional[float] = None
+) -> AsyncIterator[PollResult]:
+    """poll with sessions distributed by endpoint to worker processes, yield results as they complete. Result has original media.
+    Media is recreated in worker from init fields, so LOCAL_FIELDS of media (pool, metrics, rtt, trace, cache) not used. key must be picklable
+    Args:
+        jobs: media with request frames, async source is read as far as windows of workers allowed
+        limit: sessions at same time for all workers
+        per_endpoint: sessions at same time with one endpoint, endpoint always handle by one worker
+        key: endpoint of media
+        workers: amount of processes, by default cpu count
+        window: sent and not returned jobs of one worker, by default 2 * worker limit. New jobs are sent after yield of results
+        batch: jobs or results in one message
+        context: multiprocessing start method
+        budget: deadline of every request, see poller.exchange
+    """
+    n = workers or os.cpu_count() or 1
+    worker_limit = max(1, -(-limit // n))
+    shards = _Shards(jobs, n, window or 2 * worker_limit, batch, key)
+    finished = False
+    try:
+        shards.start(multiprocessing.get_context(context), (worker_limit, per_endpoint, key, batch, budget))
+        shards.fill()
+        active = n
+        while active:
+            w, msg = await shards.inbox.get()
+            if w is None:
+                await shards.feeder  # type: ignore[misc]  # raise error of source
+                continue
+            if msg is None or msg[0] == _DONE:
+                active -= 1
+                for res in shards.lost(w):
+                    yield res
+                continue
+            for res in shards.received(w, msg[1]):
+                yield res
+            shards.fill()
+        finished = True
+    finally:
+        await shards.stop(cancel=not finished)
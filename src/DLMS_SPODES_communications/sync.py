@@ -0,0 +1,208 @@
+"""blocking facade for threaded code: one background event loop for all calls of all threads"""
+import asyncio
+from collections.abc import AsyncIterator, Callable, Coroutine, Hashable, Iterable, Sequence
+import concurrent.futures
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+import threading
+from typing import Any, Optional, TypeVar
+from StructResult import result
+from .base import Media
+from .poller import PollResult, exchange, open_media, poll, report, transact
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class _Lock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+    """holding and waiting calls"""
+
+
+class SyncClient:
+    """thread-safe. Media opened by request stays open for next calls until close(media) or shutdown().
+    Calls to one media are serialized, calls to different medias run concurrently in loop"""
+
+    def __init__(self, name: str = "DLMS-loop") -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._locks: dict[int, _Lock] = {}
+        """by id of media, used in loop only, dropped with the last call of not opened media"""
+        self._opened: dict[int, Media] = {}
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """run coroutine in loop from any thread"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("blocking call from loop of SyncClient")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """blocking submit, cancel coroutine with timeout"""
+        fut = self.submit(coro)
+        try:
+            return fut.result(timeout)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            raise
+
+    def submit_batch(self, coros: Iterable[Coroutine[Any, Any, T]]) -> list[concurrent.futures.Future[T]]:
+        """start all coroutines with one wakeup of loop"""
+        items: list[tuple[Coroutine[Any, Any, T], concurrent.futures.Future[T]]] = [(coro, concurrent.futures.Future()) for coro in coros]
+
+        def start() -> None:
+            for coro, fut in items:
+                if fut.cancelled():
+                    coro.close()
+                    continue
+                task = self._loop.create_task(coro)
+                task.add_done_callback(lambda t, fut=fut: _copy(t, fut))  # type: ignore[misc]
+                fut.add_done_callback(lambda f, task=task: self._cancel(f, task))  # type: ignore[misc]
+
+        self._loop.call_soon_threadsafe(start)
+        return [fut for _, fut in items]
+
+    def _cancel(self, fut: concurrent.futures.Future[Any], task: asyncio.Task[Any]) -> None:
+        if (
+            fut.cancelled()
+            and not self._loop.is_closed()
+        ):
+            self._loop.call_soon_threadsafe(task.cancel)
+
+    @asynccontextmanager
+    async def _lock(self, media: Media) -> AsyncIterator[None]:
+        """serialize calls to media"""
+        key = id(media)
+        if (entry := self._locks.get(key)) is None:
+            entry = self._locks[key] = _Lock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if (
+                entry.users == 0
+                and key not in self._opened
+            ):
+                del self._locks[key]
+
+    async def _request(self, media: Media, data: bytes, budget: Optional[float]) -> result.SimpleOrError[bytearray]:
+        """result of every request is reported to media.policy, media is closed after failure for reopen through it"""
+        async with self._lock(media):
+            if not media.is_open():
+                if isinstance(res_open := await open_media(media), result.Error):
+                    return res_open
+                self._opened[id(media)] = media
+            buf = bytearray()
+            res: Optional[result.Ok | result.Error] = None
+            try:
+                res = await transact(media, data, buf, budget)
+            except Exception as e:
+                res = result.Error.from_e(e)
+            finally:
+                report(media, res)
+            if isinstance(res, result.Error):
+                self._opened.pop(id(media), None)
+                await media.close()
+                return res
+            return result.Simple(buf)
+
+    def submit_request(self, media: Media, data: bytes, budget: Optional[float] = None) -> concurrent.futures.Future[result.SimpleOrError[bytearray]]:
+        """send and receive one message, open media if need
+        Args:
+            budget: transaction deadline in sec, None is timeouts of media calls
+        """
+        return self.submit(self._request(media, data, budget))
+
+    def request(self, media: Media, data: bytes, budget: Optional[float] = None) -> result.SimpleOrError[bytearray]:
+        """blocking submit_request"""
+        return self.submit_request(media, data, budget).result()
+
+    def submit_requests(
+            self,
+            items: Iterable[tuple[Media, bytes]],
+            budget: Optional[float] = None
+    ) -> list[concurrent.futures.Future[result.SimpleOrError[bytearray]]]:
+        """batch of submit_request"""
+        return self.submit_batch(self._request(media, data, budget) for media, data in items)
+
+    def exchange(self, media: Media, requests: Sequence[bytes], budget: Optional[float] = None) -> PollResult:
+        """blocking session of poller: open, requests, close"""
+        async def main() -> PollResult:
+            async with self._lock(media):
+                return await exchange(media, requests, budget)
+
+        return self.run(main())
+
+    def poll(
+            self,
+            jobs: Iterable[tuple[Media, Sequence[bytes]]],
+            limit: int = 100,
+            per_endpoint: int = 1,
+            key: Callable[[Media], Hashable] = str,
+            budget: Optional[float] = None,
+            queue: Optional[int] = None
+    ) -> list[PollResult]:
+        """blocking poller.poll, same arguments"""
+        async def main() -> list[PollResult]:
+            return [res async for res in poll(jobs, limit, per_endpoint, key, budget, queue)]
+
+        return self.run(main())
+
+    def close(self, media: Media) -> result.SimpleOrError[float]:
+        """close media opened by request"""
+        async def main() -> result.SimpleOrError[float]:
+            async with self._lock(media):
+                self._opened.pop(id(media), None)
+                return await media.close()
+
+        return self.run(main())
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """close opened medias, stop loop and thread"""
+        if self._loop.is_closed():
+            return
+
+        async def main() -> None:
+            for media in list(self._opened.values()):
+                if media.is_open():
+                    await media.close()
+            self._opened.clear()
+            self._locks.clear()
+
+        if self._thread.is_alive():
+            try:
+                self.run(main(), timeout)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout)
+        self._loop.close()
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+
+
+def _copy(task: asyncio.Task[T], fut: concurrent.futures.Future[T]) -> None:
+    """result of task to future of caller thread, future may be cancelled by caller at same time"""
+    if task.cancelled():
+        fut.cancel()
+        return
+    with suppress(concurrent.futures.InvalidStateError):
+        if (e := task.exception()) is not None:
+            fut.set_exception(e)
+        else:
+            fut.set_result(task.result())
@@ -0,0 +1,126 @@
+"""opt-in media trace: preallocated ring of last frames, cheap enough for production
+dump formats:
+    binary: MAGIC, HEADER, records of RECORD header and captured data
+    pcap: LINKTYPE_USER0, every packet is kind byte and captured data
+"""
+from array import array
+from collections.abc import Iterator
+import struct
+import time
+from typing import NamedTuple
+
+SEND, RECV, TIMEOUT = range(3)
+"""record kinds. TIMEOUT data is partial data of failed receive"""
+MAGIC: bytes = b"DLMSTRC1"
+HEADER = struct.Struct("<dI")
+"""epoch, snap"""
+RECORD = struct.Struct("<BdII")
+"""kind, time, length, captured length"""
+PCAP_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD = struct.Struct("<IIII")
+LINKTYPE_USER0: int = 147
+
+
+class Record(NamedTuple):
+    kind: int
+    stamp: float
+    """time.monotonic()"""
+    length: int
+    """of frame"""
+    data: bytes
+    """first snap bytes"""
+
+
+class Trace:
+    """fixed ring of last records: kind, time, length and first bytes of frame. Set to Media.trace for enable"""
+    __slots__ = ("size", "snap", "kinds", "stamps", "lengths", "data", "_view", "count", "epoch")
+
+    def __init__(self, size: int = 4096, snap: int = 64) -> None:
+        """
+        Args:
+            size: records in ring, the oldest are overwritten
+            snap: captured bytes of frame, 0 is without data
+        """
+        self.size = size
+        self.snap = snap
+        self.kinds = bytearray(size)
+        self.stamps = array("d", bytes(8 * size))
+        self.lengths = array("I", bytes(4 * size))
+        self.data = bytearray(size * snap)
+        self._view = memoryview(self.data)
+        """fixed size, copy without resize checks"""
+        self.count: int = 0
+        """records from start or clear"""
+        self.epoch: float = time.time() - time.monotonic()
+        """wall time of monotonic zero"""
+
+    def _record(self, kind: int, data: bytes | bytearray | memoryview) -> None:
+        i = self.count % self.size
+        self.count += 1
+        self.kinds[i] = kind
+        self.stamps[i] = time.monotonic()
+        self.lengths[i] = n = len(data)
+        if snap := self.snap:
+            if n > snap:
+                n = snap
+            pos = i * snap
+            self._view[pos: pos + n] = data[:n]
+
+    def sent(self, data: bytes | bytearray | memoryview) -> None:
+        self._record(SEND, data)
+
+    def received(self, data: bytes | bytearray | memoryview) -> None:
+        self._record(RECV, data)
+
+    def timeout(self, partial: bytes | bytearray | memoryview = b"") -> None:
+        self._record(TIMEOUT, partial)
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def __iter__(self) -> Iterator[Record]:
+        """the oldest first"""
+        for j in range(self.count - len(self), self.count):
+            i = j % self.size
+            pos = i * self.snap
+            yield Record(self.kinds[i], self.stamps[i], length := self.lengths[i], bytes(self.data[pos: pos + min(length, self.snap)]))
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def dump(self, path: str, *, pcap: bool = False) -> int:
+        """write records to file, return amount"""
+        n = 0
+        with open(path, "wb") as f:
+            if pcap:
+                f.write(PCAP_HEADER.pack(0xa1b2c3d4, 2, 4, 0, 0, self.snap + 1, LINKTYPE_USER0))
+                for n, r in enumerate(self, 1):
+                    usec = round((self.epoch + r.stamp) * 1e6)
+                    f.write(PCAP_RECORD.pack(usec // 1_000_000, usec % 1_000_000, len(r.data) + 1, r.length + 1))
+                    f.write(bytes((r.kind,)))
+                    f.write(r.data)
+            else:
+                f.write(MAGIC)
+                f.write(HEADER.pack(self.epoch, self.snap))
+                for n, r in enumerate(self, 1):
+                    f.write(RECORD.pack(r.kind, r.stamp, r.length, len(r.data)))
+                    f.write(r.data)
+        return n
+
+
+def load(path: str) -> tuple[float, list[Record]]:
+    """epoch and records of binary dump"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(F"not trace dump: {path}")
+    pos = len(MAGIC)
+    epoch, _ = HEADER.unpack_from(data, pos)
+    pos += HEADER.size
+    records: list[Record] = []
+    while pos < len(data):
+        kind, stamp, length, captured = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        records.append(Record(kind, stamp, length, data[pos: pos + captured]))
+        pos += captured
+    return epoch, records
@@ -0,0 +1,197 @@
+"""DLMS/COSEM UDP profile: many meters through one datagram socket"""
+import asyncio
+from dataclasses import dataclass, field
+import socket
+import time
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+from StructResult import result
+from .base import Inbox, Media
+from . import wrapper
+
+RECV_QUEUE_MAX: int = 16
+"""not received datagrams of one media, the oldest are dropped above"""
+Route = tuple[tuple[str, int], int, int]
+"""(remote address, remote wPort, local wPort) of received datagram"""
+
+
+class UDPEndpoint(asyncio.DatagramProtocol):
+    """shared socket, route received datagrams to media by remote address and wPorts"""
+
+    def __init__(self, local_addr: tuple[str, int] = ("0.0.0.0", 0)) -> None:
+        self.local_addr = local_addr
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.routes: dict[Route, "UDP"] = {}
+        self.dropped: int = 0
+        """datagrams without route or with wrong header"""
+        self.errors: int = 0
+        """ICMP errors, e.g. port unreachable"""
+        self._starting: Optional[asyncio.Future[None]] = None
+
+    async def start(self) -> None:
+        """bind socket once, concurrent calls wait for first"""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(asyncio.get_running_loop().create_datagram_endpoint(lambda: self, local_addr=self.local_addr))  # type: ignore[arg-type]
+        await asyncio.shield(self._starting)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def connection_lost(self, _exc: Optional[Exception]) -> None:
+        self.transport = None
+        self._starting = None
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        try:
+            src, dst = wrapper.ports(data)
+        except ValueError:
+            self.dropped += 1
+            return
+        if (media := self.routes.get(((addr[0], addr[1]), src, dst))) is None:
+            self.dropped += 1
+            return
+        media._inbox.put(data)
+
+    def error_received(self, _exc: Exception) -> None:
+        self.errors += 1
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+
+_endpoints: WeakKeyDictionary[asyncio.AbstractEventLoop, UDPEndpoint] = WeakKeyDictionary()
+
+
+def default_endpoint() -> UDPEndpoint:
+    """common endpoint of running loop"""
+    loop = asyncio.get_running_loop()
+    if (endpoint := _endpoints.get(loop)) is None:
+        endpoint = _endpoints[loop] = UDPEndpoint()
+    return endpoint
+
+
+@dataclass(eq=False)
+class UDP(Media):
+    """logical meter of UDP profile. Send and receive wrapper PDU, response is routed by wPorts of last sent PDU"""
+    host: str = "127.0.0.1"
+    port: int = wrapper.UDP_PORT
+    to_connect: float = 5.0
+    to_recv: float = 2.0
+    """for every attempt"""
+    to_close: float = 1.0
+    retries: int = 2
+    """resend of request after receive timeout"""
+    endpoint: Optional[UDPEndpoint] = field(default=None, kw_only=True, repr=False, compare=False)
+    """None is default_endpoint()"""
+    _ep: Optional[UDPEndpoint] = field(init=False, default=None, repr=False)
+    _addr: tuple[str, int] = field(init=False, default=("", 0), repr=False)
+    _route: Optional[Route] = field(init=False, default=None, repr=False)
+    _last: bytes = field(init=False, default=b"", repr=False)
+    """sent PDU for retransmission"""
+    _inbox: Inbox = field(init=False, default_factory=lambda: Inbox(RECV_QUEUE_MAX), repr=False)
+    retransmissions: int = field(init=False, default=0)
+
+    def __str__(self) -> str:
+        return F"{self.host}:{self.port}/udp"
+
+    async def open(self) -> result.SimpleOrError[float]:
+        start = time.monotonic()
+        res: result.SimpleOrError[float]
+        try:
+            async with asyncio.timeout(self.to_connect):
+                ep = self.endpoint or default_endpoint()
+                await ep.start()
+                info = await asyncio.get_running_loop().getaddrinfo(
+                    self.host,
+                    self.port,
+                    family=ep.transport.get_extra_info("socket").family,  # type: ignore[union-attr]
+                    type=socket.SOCK_DGRAM)
+            self._ep = ep
+            self._addr = info[0][4][0], info[0][4][1]
+            res = result.Simple(time.monotonic() - start)
+        except Exception as e:
+            res = result.Error.from_e(e, "UDP endpoint")
+        if self.metrics is not None:
+            self.metrics.opened(res)
+        return res
+
+    def is_open(self) -> bool:
+        return (
+            self._ep is not None
+            and self._ep.transport is not None
+        )
+
+    async def close(self) -> result.SimpleOrError[float]:
+        self._unroute()
+        self._ep = None
+        self._inbox.clear()
+        return result.Simple(0.0)
+
+    def _unroute(self) -> None:
+        if (
+            self._route is not None
+            and self._ep is not None
+            and self._ep.routes.get(self._route) is self
+        ):
+            del self._ep.routes[self._route]
+        self._route = None
+
+    async def send(self, data: bytes) -> None:
+        if not self.is_open():
+            raise RuntimeError("UDP endpoint not available")
+        src, dst = wrapper.ports(data)
+        if (route := (self._addr, dst, src)) != self._route:
+            if (owner := self._ep.routes.get(route)) is not None and owner is not self:  # type: ignore[union-attr]
+                raise RuntimeError(F"route {route} used by {owner!r}")
+            self._unroute()
+            self._ep.routes[route] = self  # type: ignore[union-attr]
+            self._route = route
+        self._inbox.clear()  # late responses of previous request
+        self._last = data
+        self._ep.transport.sendto(data, self._addr)  # type: ignore[union-attr]
+        self._rtt_sent()
+        if self.metrics is not None:
+            self.metrics.sent(len(data), 0.0)
+        if self.trace is not None:
+            self.trace.sent(data)
+
+    async def receive(self, buf: bytearray) -> result.Ok | result.Error:
+        """append one wrapper PDU, resend request after every timeout up to retries"""
+        start = time.monotonic()
+        timeout = self.recv_timeout
+        attempt = 0
+        while True:
+            try:
+                data = await self._inbox.get(timeout)
+                break
+            except asyncio.TimeoutError as e:
+                if (
+                    attempt == self.retries
+                    or not self._last
+                    or not self.is_open()
+                ):
+                    self._rtt_received(ok=False)
+                    if self.metrics is not None:
+                        self.metrics.timeout(0)
+                    if self.trace is not None:
+                        self.trace.timeout()
+                    return result.Error.from_e(e)
+                attempt += 1
+                self.retransmissions += 1
+                self._ep.transport.sendto(self._last, self._addr)  # type: ignore[union-attr]
+                if self.trace is not None:
+                    self.trace.sent(self._last)
+        buf.extend(data)
+        if attempt == 0:
+            self._rtt_received(ok=True)  # Karn: skip sample of retransmitted request
+        else:
+            self._sent_at = 0.0
+        if self.metrics is not None:
+            self.metrics.received(len(data), time.monotonic() - start)
+        if self.trace is not None:
+            self.trace.received(data)
+        return result.OK
+
+    async def end_transaction(self) -> None:
+        self._inbox.clear()
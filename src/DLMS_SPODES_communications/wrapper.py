@@ -0,0 +1,28 @@
+"""wrapper sublayer of IEC 62056-47 for UDP and TCP profiles"""
+import struct
+
+
+HEADER = struct.Struct(">HHHH")
+"""version, source wPort, destination wPort, APDU length"""
+VERSION: int = 1
+UDP_PORT: int = 4059
+"""DLMS/COSEM port of IANA"""
+CLIENT_PUBLIC: int = 0x10
+SERVER_MANAGEMENT: int = 0x01
+
+
+def pack(src: int, dst: int, apdu: bytes) -> bytes:
+    """wrapper PDU of APDU"""
+    return HEADER.pack(VERSION, src, dst, len(apdu)) + apdu
+
+
+def ports(pdu: bytes | bytearray | memoryview) -> tuple[int, int]:
+    """return (source, destination) wPorts of wrapper PDU"""
+    if len(pdu) < HEADER.size:
+        raise ValueError(F"wrapper PDU shorter than header: {bytes(pdu).hex(' ')}")
+    version, src, dst, length = HEADER.unpack_from(pdu)
+    if version != VERSION:
+        raise ValueError(F"wrong wrapper version {version}")
+    if length != len(pdu) - HEADER.size:
+        raise ValueError(F"wrapper length {length} not equal APDU length {len(pdu) - HEADER.size}")
+    return src, dst
@@ -0,0 +1,445 @@
+"""local stand-ins of meters for tests and benchmarks: TCP, UDP, pty serial and BLE"""
+import asyncio
+import inspect
+import os
+import random
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from src.DLMS_SPODES_communications import hdlc, wrapper
+
+
+def fcs16(data: bytes) -> int:
+    """CRC-16/X-25 of HDLC"""
+    fcs = 0xffff
+    for b in data:
+        fcs ^= b
+        for _ in range(8):
+            fcs = (fcs >> 1) ^ 0x8408 if fcs & 1 else fcs >> 1
+    return fcs ^ 0xffff
+
+
+def make_frame(dst: bytes, src: bytes, control: int, info: bytes = b"", segmented: bool = False) -> bytes:
+    """HDLC frame with flags"""
+    length = 2 + len(dst) + len(src) + 1 + 2 + ((len(info) + 2) if info else 0)
+    header = bytes(((0xa8 if segmented else 0xa0) | length >> 8, length & 0xff)) + dst + src + bytes((control,))
+    if info:
+        header += fcs16(header).to_bytes(2, "little") + info
+    return hdlc.FLAG_B + header + fcs16(header).to_bytes(2, "little") + hdlc.FLAG_B
+
+
+@dataclass
+class MeterModel:
+    """answer to every request frame with response frame after latency"""
+    latency: float = 0.0
+    """in sec"""
+    jitter: float = 0.0
+    """random addition to latency, in sec"""
+    segment_size: int = 0xffff
+    """write response by parts"""
+    info_size: int = 0
+    """information field of response"""
+    answer: Optional[Callable[[bytes], Optional[bytes]]] = None
+    """custom response maker"""
+    requests: int = field(init=False, default=0)
+
+    def response(self, request: bytes) -> Optional[bytes]:
+        self.requests += 1
+        if self.answer is not None:
+            return self.answer(request)
+        if request[:1] != hdlc.FLAG_B:
+            src_port, dst_port = wrapper.ports(request)
+            return wrapper.pack(dst_port, src_port, bytes(self.info_size) or b"\x0e\x01")
+        dst, src = hdlc.addresses(request)
+        return make_frame(src, dst, 0x73, bytes(self.info_size))
+
+    async def delay(self) -> None:
+        if (t := self.latency + random.random() * self.jitter) > 0:
+            await asyncio.sleep(t)
+
+    def segments(self, data: bytes) -> Iterator[bytes]:
+        for pos in range(0, len(data), self.segment_size):
+            yield data[pos: pos + self.segment_size]
+
+
+@dataclass
+class TCPMeter(MeterModel):
+    """asyncio TCP DLMS meter with HDLC or wrapper framing by first byte of request"""
+    host: str = "127.0.0.1"
+    port: int = 0
+    """0 is any free"""
+    pipelined: bool = False
+    """answer requests of one connection concurrently, as concentrator, responses order may change with jitter"""
+    connections: int = field(init=False, default=0)
+    _server: asyncio.Server = field(init=False, repr=False)
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "TCPMeter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        framer = hdlc.Framer()
+        pdu = bytearray()
+        """not complete wrapper PDU"""
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            while data := await reader.read(0xffff):
+                requests: list[bytes] = []
+                if pdu or (not framer.pending and data[:1] != hdlc.FLAG_B):
+                    pdu += data
+                    while (
+                        len(pdu) >= wrapper.HEADER.size
+                        and len(pdu) >= (size := wrapper.HEADER.size + wrapper.HEADER.unpack_from(pdu)[3])
+                    ):
+                        requests.append(bytes(pdu[:size]))
+                        del pdu[:size]
+                else:
+                    framer.feed(data)
+                    while (request := framer.next_frame()) is not None:
+                        requests.append(request)
+                for request in requests:
+                    if (response := self.response(request)) is None:
+                        continue
+                    if self.pipelined:
+                        t = asyncio.create_task(self._answer(writer, response))
+                        tasks.add(t)
+                        t.add_done_callback(tasks.discard)
+                    else:
+                        await self._answer(writer, response)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for t in tasks:
+                t.cancel()
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, response: bytes) -> None:
+        await self.delay()
+        for seg in self.segments(response):
+            writer.write(seg)
+            await writer.drain()
+
+
+@dataclass
+class UDPMeter(MeterModel, asyncio.DatagramProtocol):
+    """meters of UDP wrapper profile on one socket, answer with swapped wPorts"""
+    host: str = "127.0.0.1"
+    port: int = 0
+    lose: int = 0
+    """ignore every lose-th request, 0 is without losses"""
+    _transport: asyncio.DatagramTransport = field(init=False, repr=False)
+    _tasks: set[asyncio.Task[None]] = field(init=False, default_factory=set, repr=False)
+
+    async def __aenter__(self) -> "UDPMeter":
+        self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+        self.port = self._transport.get_extra_info("sockname")[1]
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        for t in self._tasks:
+            t.cancel()
+        self._transport.close()
+
+    def response(self, request: bytes) -> Optional[bytes]:
+        if self.lose and (self.requests + 1) % self.lose == 0:
+            self.requests += 1
+            return None
+        return super().response(request)
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        if (response := self.response(data)) is None:
+            return
+        if self.latency or self.jitter:
+            t = asyncio.get_running_loop().create_task(self._answer(response, addr))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+        else:
+            self._transport.sendto(response, addr)
+
+    async def _answer(self, response: bytes, addr: tuple[str, int]) -> None:
+        await self.delay()
+        self._transport.sendto(response, addr)
+
+
+@dataclass
+class PtyMeter(MeterModel):
+    """serial meter on master side of pseudo terminal, open Serial with port=PtyMeter.port. Only posix"""
+    port: str = field(init=False)
+    _master: int = field(init=False, repr=False)
+    _slave: int = field(init=False, repr=False)
+    _framer: hdlc.Framer = field(init=False, default_factory=hdlc.Framer, repr=False)
+    _tasks: set[asyncio.Task[None]] = field(init=False, default_factory=set, repr=False)
+
+    def start(self) -> None:
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        os.set_blocking(self._master, False)
+        asyncio.get_running_loop().add_reader(self._master, self._read)
+
+    def stop(self) -> None:
+        asyncio.get_running_loop().remove_reader(self._master)
+        for t in self._tasks:
+            t.cancel()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self) -> "PtyMeter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _read(self) -> None:
+        try:
+            data = os.read(self._master, 0xffff)
+        except BlockingIOError:
+            return
+        self._framer.feed(data)
+        while (request := self._framer.next_frame()) is not None:
+            if (response := self.response(request)) is not None:
+                t = asyncio.get_running_loop().create_task(self._write(response))
+                self._tasks.add(t)
+                t.add_done_callback(self._tasks.discard)
+
+    async def _write(self, response: bytes) -> None:
+        await self.delay()
+        for seg in self.segments(response):
+            os.write(self._master, seg)
+            await asyncio.sleep(0)
+
+
+class FakeCharacteristic:
+    def __init__(self, uuid: str, handle: int, max_write_without_response_size: int) -> None:
+        self.uuid = uuid
+        self.handle = handle
+        self.max_write_without_response_size = max_write_without_response_size
+        self.description = uuid
+        self.properties = ["write", "write-without-response", "notify"]
+
+
+class FakeService:
+    def __init__(self, uuid: str, characteristics: list[FakeCharacteristic]) -> None:
+        self.uuid = uuid
+        self.characteristics = characteristics
+
+    def get_characteristic(self, specifier: str | int) -> Optional[FakeCharacteristic]:
+        for c in self.characteristics:
+            if specifier in (c.uuid, c.handle):
+                return c
+        return None
+
+
+class FakeServices:
+    def __init__(self, services: list[FakeService]) -> None:
+        self.services = services
+
+    def get_service(self, uuid: str) -> Optional[FakeService]:
+        for s in self.services:
+            if s.uuid == uuid:
+                return s
+        return None
+
+    def get_characteristic(self, specifier: int) -> Optional[FakeCharacteristic]:
+        for s in self.services:
+            if (c := s.get_characteristic(specifier)) is not None:
+                return c
+        return None
+
+    def __iter__(self) -> Iterator[FakeService]:
+        return iter(self.services)
+
+
+@dataclass
+class BLEMeter(MeterModel):
+    """KPZ adapter behaviour for FakeBleakClient: READY after every written chunk, response by notifications"""
+    connect_time: float = 0.0
+    mtu: int = 23
+    segment_size: int = 20
+    chunk_time: float = 0.0
+    """delay of READY after written chunk with write response"""
+    write_time: float = 0.0
+    """connection interval for every write"""
+    rssi: int = -60
+    """of advertisement for FakeBleakScanner"""
+    adapters: Optional[tuple[Optional[str], ...]] = None
+    """visible by adapters, None is all"""
+    write_without_response: bool = True
+    """property of SEND characteristic, old firmware is without"""
+
+
+class FakeBleakClient:
+    """replace of bleak.BleakClient with meters keyed by address"""
+    meters: dict[str, BLEMeter] = {}
+    default: BLEMeter = BLEMeter()
+    connected: dict[Optional[str], int] = {}
+    """by adapter"""
+    peak: dict[Optional[str], int] = {}
+    """max of connected by adapter"""
+    last: Optional["FakeBleakClient"] = None
+    """the latest created"""
+    connects: list[tuple[Any, Optional[str]]] = []
+    """address or device and adapter of every connect"""
+
+    def __init__(self, address_or_ble_device: Any, services: Any = None, timeout: float = 10.0, **kwargs: Any) -> None:
+        self.target = address_or_ble_device
+        self.address: str = getattr(address_or_ble_device, "address", address_or_ble_device)
+        self.meter = self.meters.get(self.address, self.default)
+        self.kwargs = kwargs
+        self.adapter: Optional[str] = kwargs.get("adapter")
+        self.is_connected = False
+        self._callbacks: dict[int, Callable[..., Any]] = {}
+        self._framer = hdlc.Framer()
+        self._tasks: set[asyncio.Task[None]] = set()
+        from src.DLMS_SPODES_communications.ble import BLEKPZ
+        chunk = self.meter.mtu - 3
+        self._send = FakeCharacteristic(BLEKPZ.DLMS_SEND_BUF_UUID, 1, chunk)
+        if not self.meter.write_without_response:
+            self._send.properties.remove("write-without-response")
+        self._recv = FakeCharacteristic(BLEKPZ.DLMS_RECV_BUF_UUID, 2, chunk)
+        self._ready = FakeCharacteristic(BLEKPZ.DLMS_READY_UUID, 3, chunk)
+        self.services = FakeServices([FakeService(BLEKPZ.DLMS_SERVICE_UUID, [self._send, self._recv, self._ready])])
+        self.mtu_size = self.meter.mtu
+        self.writes: list[bool] = []
+        """response flag of every write"""
+        self.unacked = 0
+        """written chunks without READY"""
+        self.unacked_peak = 0
+        FakeBleakClient.last = self
+
+    async def connect(self, **kwargs: Any) -> bool:
+        if self.meter.connect_time:
+            await asyncio.sleep(self.meter.connect_time)
+        self.connects.append((self.target, self.adapter))
+        if not self.is_connected:
+            n = self.connected[self.adapter] = self.connected.get(self.adapter, 0) + 1
+            self.peak[self.adapter] = max(n, self.peak.get(self.adapter, 0))
+        self.is_connected = True
+        return True
+
+    async def disconnect(self) -> bool:
+        if self.is_connected:
+            self.connected[self.adapter] -= 1
+        self.is_connected = False
+        for t in self._tasks:
+            t.cancel()
+        return True
+
+    async def start_notify(self, char_specifier: FakeCharacteristic | int, callback: Callable[..., Any], **kwargs: Any) -> None:
+        handle = char_specifier if isinstance(char_specifier, int) else char_specifier.handle
+        self._callbacks[handle] = callback
+
+    async def write_gatt_char(self, char_specifier: FakeCharacteristic | int, data: bytes, response: bool = False) -> None:
+        if self.meter.write_time:
+            await asyncio.sleep(self.meter.write_time * (2 if response else 1))
+        self.writes.append(response)
+        self.unacked += 1
+        self.unacked_peak = max(self.unacked, self.unacked_peak)
+        if self.meter.chunk_time:
+            asyncio.get_running_loop().call_later(self.meter.chunk_time, self._ack)
+        else:
+            self._ack()
+        self._framer.feed(data)
+        while (request := self._framer.next_frame()) is not None:
+            if (resp := self.meter.response(request)) is not None:
+                t = asyncio.get_running_loop().create_task(self._answer(resp))
+                self._tasks.add(t)
+                t.add_done_callback(self._tasks.discard)
+
+    def _ack(self) -> None:
+        self.unacked -= 1
+        self._notify(self._ready, b"\x01")
+
+    async def read_gatt_char(self, char_specifier: Any) -> bytearray:
+        return bytearray()
+
+    async def _answer(self, response: bytes) -> None:
+        await self.meter.delay()
+        for seg in self.meter.segments(response):
+            self._notify(self._recv, bytearray(seg))
+            await asyncio.sleep(0)
+
+    def _notify(self, c: FakeCharacteristic, data: bytes | bytearray) -> None:
+        if (cb := self._callbacks.get(c.handle)) is None:
+            return
+        res = cb(c, bytearray(data))
+        if inspect.isawaitable(res):
+            asyncio.ensure_future(res)
+
+
+@dataclass
+class FakeDevice:
+    address: str
+    name: str = "KPZ"
+    details: Any = None
+
+
+@dataclass
+class FakeAdvertisement:
+    rssi: int
+    local_name: str = "KPZ"
+
+
+class FakeBleakScanner:
+    """replace of bleak.BleakScanner, advertise FakeBleakClient.meters visible by adapter every interval"""
+    interval: float = 0.01
+
+    def __init__(self, detection_callback: Optional[Callable[[Any, Any], None]] = None, adapter: Optional[str] = None, **kwargs: Any) -> None:
+        self.callback = detection_callback
+        self.adapter = adapter
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._advertise())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _advertise(self) -> None:
+        while True:
+            for addr, meter in FakeBleakClient.meters.items():
+                if (
+                    self.callback is not None
+                    and (meter.adapters is None or self.adapter in meter.adapters)
+                ):
+                    self.callback(FakeDevice(addr), FakeAdvertisement(meter.rssi))
+            await asyncio.sleep(self.interval)
+
+    async def discover(self, timeout: float = 5.0, return_adv: bool = False, **kwargs: Any) -> Any:
+        found = {addr: (FakeDevice(addr), FakeAdvertisement(m.rssi)) for addr, m in FakeBleakClient.meters.items()}
+        return found if return_adv else [d for d, _ in found.values()]
+
+
+@contextmanager
+def fake_bleak(meters: Optional[dict[str, BLEMeter]] = None) -> Iterator[type[FakeBleakClient]]:
+    """replace bleak.BleakClient and bleak.BleakScanner, meters keyed by address"""
+    from src.DLMS_SPODES_communications import ble
+    original = ble.bleak.BleakClient, ble.bleak.BleakScanner
+    FakeBleakClient.meters = meters or {}
+    FakeBleakClient.connected = {}
+    FakeBleakClient.peak = {}
+    FakeBleakClient.connects = []
+    ble.bleak.BleakClient = FakeBleakClient  # type: ignore[misc, assignment]
+    ble.bleak.BleakScanner = FakeBleakScanner  # type: ignore[misc, assignment]
+    try:
+        yield FakeBleakClient
+    finally:
+        ble.bleak.BleakClient, ble.bleak.BleakScanner = original  # type: ignore[misc]
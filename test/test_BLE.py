@@ -1,11 +1,13 @@
 import asyncio
 import unittest
-from src.DLMS_SPODES_communications.ble import BLEKPZ
+from src.DLMS_SPODES_communications.ble import BLEKPZ, DeviceCache
+from .emulators import BLEMeter, fake_bleak, make_frame
 from .functools2 import open_close
 import logging
 import sys
 from StructResult import result
 import os
+import time
 
 
 logger = logging.getLogger(__name__)
@@ -70,3 +72,86 @@ class TestType(unittest.TestCase):
                 print(k, v)
 
         asyncio.run(main())
+
+
+class TestDeviceCache(unittest.TestCase):
+    def test_ttl_and_size(self) -> None:
+        cache = DeviceCache(ttl=0.01, max_size=1)
+        cache.put("00:00:00:00:00:01")
+        cache.put("00:00:00:00:00:02")
+        self.assertIsNone(cache.get("00:00:00:00:00:01"))
+        self.assertIsNotNone(cache.get("00:00:00:00:00:02"))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("00:00:00:00:00:02"))
+
+    def test_handles(self) -> None:
+        async def main() -> None:
+            cache = DeviceCache()
+            m = BLEKPZ(addr="00:00:00:00:00:01", cache=cache)
+            with fake_bleak():
+                await m.open()
+                await m.close()
+            self.assertEqual(cache.get(m.addr).handles, (1, 2, 3))  # type: ignore[union-attr]
+
+        asyncio.run(main())
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+class TestReceive(unittest.TestCase):
+    def test_frames_in_chunks(self) -> None:
+        """two frames in 5 byte notifications, one frame per receive"""
+        async def main() -> None:
+            frame = make_frame(b"\x21", b"\x03", 0x73, bytes(30))
+            meter = BLEMeter(segment_size=5, answer=lambda _: frame + frame[1:])
+            m = BLEKPZ(addr="00:00:00:00:00:01", EOF=b"\x7e", cache=None)
+            with fake_bleak({m.addr: meter}):
+                await m.open()
+                await m.send(REQUEST)
+                for _ in range(2):
+                    buf = bytearray()
+                    self.assertIsInstance(await m.receive(buf), result.Ok)
+                    self.assertEqual(buf, frame)
+                m.to_recv = 0.05
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Error)
+                self.assertEqual(buf, b"")
+                await m.close()
+
+        asyncio.run(main())
+
+
+class TestSend(unittest.TestCase):
+    def test_window(self) -> None:
+        """not more than send_window chunks without READY, writes without response"""
+        async def main() -> None:
+            request = make_frame(b"\x03", b"\x21", 0x10, bytes(200))
+            meter = BLEMeter(chunk_time=0.005, mtu=64)
+            m = BLEKPZ(addr="00:00:00:00:00:01", EOF=b"\x7e", cache=None, send_window=3)
+            with fake_bleak({m.addr: meter}) as client:
+                await m.open()
+                await m.send(request)
+                self.assertIsInstance(await m.receive(bytearray()), result.Ok)
+                await m.close()
+                c = client.last
+            self.assertEqual(len(c.writes), -(-len(request) // (meter.mtu - 3)))  # type: ignore[union-attr]
+            self.assertFalse(any(c.writes))  # type: ignore[union-attr]
+            self.assertEqual((c.unacked_peak, c.unacked), (3, 0))  # type: ignore[union-attr]
+
+        asyncio.run(main())
+
+    def test_fallback(self) -> None:
+        """write with response for characteristic without write-without-response"""
+        async def main() -> None:
+            meter = BLEMeter(write_without_response=False)
+            m = BLEKPZ(addr="00:00:00:00:00:01", EOF=b"\x7e", cache=None, send_window=2)
+            with fake_bleak({m.addr: meter}) as client:
+                await m.open()
+                await m.send(make_frame(b"\x03", b"\x21", 0x10, bytes(50)))
+                self.assertIsInstance(await m.receive(bytearray()), result.Ok)
+                await m.close()
+                c = client.last
+            self.assertTrue(all(c.writes))  # type: ignore[union-attr]
+            self.assertLessEqual(c.unacked_peak, 2)  # type: ignore[union-attr]
+
+        asyncio.run(main())
@@ -0,0 +1,97 @@
+import asyncio
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.ble import BLEKPZ, DeviceCache
+from src.DLMS_SPODES_communications.ble_scheduler import Adapter, BLEScheduler
+from .emulators import BLEMeter, FakeDevice, fake_bleak
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+def addr(i: int) -> str:
+    return F"00:00:00:00:01:{i:02x}"
+
+
+class TestType(unittest.TestCase):
+    def test_rssi_order(self) -> None:
+        """one connection: the strongest advertisement first"""
+        async def main() -> None:
+            rssi = [-90, -40, -70, -55]
+            meters = {addr(i): BLEMeter(rssi=r) for i, r in enumerate(rssi)}
+            medias = [BLEKPZ(addr=a, EOF=b"\x7e", cache=DeviceCache()) for a in meters]
+            with fake_bleak(meters):
+                async with BLEScheduler([Adapter(limit=1)]) as scheduler:
+                    await asyncio.sleep(0.05)
+                    self.assertEqual(scheduler.rssi(addr(1)), -40)
+                    order = [res.media.addr async for res in scheduler.poll((m, [REQUEST]) for m in medias)]
+            self.assertEqual(order, [addr(1), addr(3), addr(2), addr(0)])
+
+        asyncio.run(main())
+
+    def test_adapters(self) -> None:
+        """sessions by adapters within limits, throughput grows with adapters"""
+        async def run(adapters: list[Adapter]) -> float:
+            meters = {addr(i): BLEMeter(latency=0.03, connect_time=0.01) for i in range(12)}
+            with fake_bleak(meters) as client:
+                async with BLEScheduler(adapters) as scheduler:
+                    await asyncio.sleep(0.03)
+                    start = time.monotonic()
+                    async for res in scheduler.poll((BLEKPZ(addr=a, EOF=b"\x7e", cache=DeviceCache()), [REQUEST]) for a in meters):
+                        self.assertIsInstance(res.status, result.Ok)
+                    elapsed = time.monotonic() - start
+                for a in adapters:
+                    self.assertLessEqual(client.peak[a.name], a.limit)
+                self.assertEqual(sum(a.sessions for a in adapters), 12)
+            return elapsed
+
+        one = asyncio.run(run([Adapter("hci0", limit=2)]))
+        three = asyncio.run(run([Adapter(F"hci{i}", limit=2) for i in range(3)]))
+        self.assertLess(three, one * 0.6)
+
+    def test_visibility(self) -> None:
+        """meter is connected by adapter which sees it, unseen meter starts after wait"""
+        async def main() -> None:
+            meters = {
+                addr(0): BLEMeter(adapters=("hci1",)),
+                "00:00:00:00:02:00": BLEMeter(adapters=())
+            }
+            cache = DeviceCache()
+            cache.put(addr(0), FakeDevice(addr(0)))  # scanned by other adapter
+            with fake_bleak(meters) as client:
+                async with BLEScheduler([Adapter("hci0"), Adapter("hci1")]) as scheduler:
+                    medias = [BLEKPZ(addr=a, EOF=b"\x7e", cache=cache) for a in meters]
+                    start = time.monotonic()
+                    results = {
+                        res.media.addr: (res, time.monotonic() - start)
+                        async for res in scheduler.poll(((m, [REQUEST]) for m in medias), unseen=0.2)
+                    }
+            target, adapter = next((t, a) for t, a in client.connects if getattr(t, "address", t) == addr(0))
+            self.assertEqual(adapter, "hci1")
+            self.assertIsNot(target, cache.get(addr(0)).device, "device of scanner with hci1")  # type: ignore[union-attr]
+            self.assertIsNotNone(cache.get(addr(0)).device, "shared cache unchanged")  # type: ignore[union-attr]
+            self.assertEqual([(m.adapter, m._target) for m in medias], [(None, None)] * 2)
+            self.assertIn(("00:00:00:00:02:00", "hci0"), client.connects, "unseen meter by address")
+            self.assertLess(results[addr(0)][1], 0.2)
+            self.assertGreaterEqual(results["00:00:00:00:02:00"][1], 0.2)
+            self.assertTrue(all(isinstance(res.status, result.Ok) for res, _ in results.values()))
+
+        asyncio.run(main())
+
+    def test_concurrent_polls(self) -> None:
+        """polls at same time don't connect one meter twice"""
+        async def main() -> None:
+            meters = {addr(0): BLEMeter(latency=0.02)}
+            with fake_bleak(meters) as client:
+                async with BLEScheduler([Adapter(limit=2)]) as scheduler:
+                    await asyncio.sleep(0.03)
+
+                    async def run() -> list[result.Ok | result.Error]:
+                        return [res.status async for res in scheduler.poll([(BLEKPZ(addr=addr(0), EOF=b"\x7e", cache=DeviceCache()), [REQUEST])])]
+
+                    statuses = sum(await asyncio.gather(run(), run()), [])
+            self.assertTrue(all(isinstance(s, result.Ok) for s in statuses))
+            self.assertEqual((len(client.connects), client.peak[None]), (2, 1))
+
+        asyncio.run(main())
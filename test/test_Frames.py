@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from contextlib import aclosing
+from src.DLMS_SPODES_communications.base import Media
+from src.DLMS_SPODES_communications.ble import BLEKPZ
+from src.DLMS_SPODES_communications.network import Network, BufferedNetwork
+from .emulators import BLEMeter, fake_bleak, make_frame
+
+
+FRAMES = [make_frame(b"\x21", b"\x03", 0x13, bytes((i,)) * 10) for i in range(3)]
+
+
+class TestType(unittest.TestCase):
+    def test_until_close(self) -> None:
+        """push frames by parts, peer close ends iteration"""
+        async def handle(_reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            data = b"".join(FRAMES)
+            for pos in range(0, len(data), 7):
+                writer.write(data[pos: pos + 7])
+                await writer.drain()
+                await asyncio.sleep(0.001)
+            writer.close()
+
+        async def main() -> None:
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            for cls in (Network, BufferedNetwork):
+                m = cls(host="127.0.0.1", port=str(port), EOF=b"\x7e", to_recv=1.0)
+                await m.open()
+                frames, data = [], []
+                async for f in m.frames():
+                    frames.append(f)
+                    data.append(bytes(f.data))  # view of BufferedNetwork is valid until next frame
+                    if isinstance(m, BufferedNetwork):
+                        self.assertIs(f.data.obj, m._protocol.buf)
+                self.assertEqual(data, FRAMES)
+                self.assertTrue(frames[0].stamp <= frames[1].stamp <= frames[2].stamp)
+                await m.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+    def test_partial_after_timeout(self) -> None:
+        """frame split by pause longer than to_recv is yielded whole"""
+        async def handle(_reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            for part in (FRAMES[0][:5], FRAMES[0][5:] + FRAMES[1]):
+                writer.write(part)
+                await writer.drain()
+                await asyncio.sleep(0.1)
+            writer.close()
+
+        async def main() -> None:
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            for cls in (Network, BufferedNetwork):
+                m = cls(host="127.0.0.1", port=str(port), EOF=b"\x7e", to_recv=0.03)
+                await m.open()
+                self.assertEqual([bytes(f.data) async for f in m.frames()], FRAMES[:2])
+                await m.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+    def test_ble(self) -> None:
+        async def main() -> None:
+            m = BLEKPZ(addr="00:00:00:00:00:01", EOF=b"\x7e", cache=None)
+            with fake_bleak({m.addr: BLEMeter(answer=lambda _: b"".join(FRAMES))}):
+                await m.open()
+                await m.send(bytes.fromhex("7E A0 07 03 21 93 0F 01 7E"))
+                self.assertEqual(await self.take(m, 3), FRAMES)
+                await m.close()
+
+        asyncio.run(main())
+
+    @staticmethod
+    async def take(m: Media, n: int) -> list[bytes]:
+        res = []
+        async with aclosing(m.frames()) as frames:
+            async for f in frames:
+                res.append(bytes(f.data))
+                if len(res) == n:
+                    break
+        return res
@@ -0,0 +1,55 @@
+import unittest
+from src.DLMS_SPODES_communications.hdlc import Framer, search, addresses
+
+
+SNRM = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+UA = bytes.fromhex("7E A8 07 21 03 73 0F 01 7E")
+
+
+class TestType(unittest.TestCase):
+    def test_search(self) -> None:
+        self.assertEqual(search(SNRM), (0, len(SNRM)))
+        self.assertEqual(search(b"\x00\x01" + SNRM), (2, len(SNRM) + 2))
+        self.assertEqual(search(SNRM[:5]), (0, -1))
+        self.assertEqual(search(b"\x7e\x7e"), (0, -1))
+
+    def test_opening_flag_only(self) -> None:
+        f = Framer()
+        f.feed(SNRM[:1])
+        self.assertIsNone(f.next_frame())
+        f.feed(SNRM[1:])
+        self.assertEqual(f.next_frame(), SNRM)
+        self.assertEqual(f.pending, 0)
+
+    def test_back_to_back(self) -> None:
+        f = Framer()
+        f.feed(SNRM + UA + SNRM[:4])
+        self.assertEqual(f.next_frame(), SNRM)
+        self.assertEqual(f.next_frame(), UA)
+        self.assertIsNone(f.next_frame())
+        self.assertEqual(f.pending, 4)
+        f.feed(SNRM[4:])
+        self.assertEqual(f.next_frame(), SNRM)
+
+    def test_shared_flag(self) -> None:
+        f = Framer()
+        f.feed(SNRM + UA[1:])
+        self.assertEqual(f.next_frame(), SNRM)
+        self.assertEqual(f.next_frame(), UA)
+
+    def test_resync(self) -> None:
+        f = Framer()
+        f.feed(bytes.fromhex("7E A0 08 01 02 03 04 05 06 07") + SNRM)
+        self.assertEqual(f.next_frame(), SNRM)
+
+    def test_take(self) -> None:
+        f = Framer()
+        f.feed(SNRM[:6])
+        self.assertEqual(f.take(), SNRM[:6])
+        self.assertEqual(f.pending, 0)
+
+    def test_addresses(self) -> None:
+        self.assertEqual(addresses(SNRM), (b"\x03", b"\x21"))
+        self.assertEqual(addresses(UA), (b"\x21", b"\x03"))
+        with self.assertRaises(ValueError):
+            addresses(b"\x7e\xa0\x07\x02\x02\x02\x02\x02")
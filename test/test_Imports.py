@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestType(unittest.TestCase):
+    def test_lazy(self) -> None:
+        """transport dependencies load with its transport only"""
+        code = (
+            "import sys\n"
+            "from src.DLMS_SPODES_communications import Network\n"
+            "assert 'bleak' not in sys.modules and 'serial_asyncio' not in sys.modules\n"
+            "from src.DLMS_SPODES_communications import Serial\n"
+            "assert 'serial_asyncio' in sys.modules and 'bleak' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, env=os.environ)
+
+    def test_unknown(self) -> None:
+        import src.DLMS_SPODES_communications as package
+        with self.assertRaises(AttributeError):
+            package.Unknown  # type: ignore[attr-defined]
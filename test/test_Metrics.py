@@ -0,0 +1,27 @@
+import unittest
+from src.DLMS_SPODES_communications.metrics import Histogram, Metrics, Registry
+
+
+class TestType(unittest.TestCase):
+    def test_histogram(self) -> None:
+        h = Histogram()
+        for v in (0.001,) * 98 + (1.0, 1.0):
+            h.observe(v)
+        self.assertEqual(h.count, 100)
+        self.assertTrue(0.001 <= h.quantile(0.5) < 0.002)
+        self.assertTrue(1.0 <= h.quantile(1.0) < 2.0)
+
+    def test_metrics(self) -> None:
+        m = Metrics()
+        m.sent(9, 0.001)
+        m.received(9, 0.01)
+        m.timeout(3)
+        self.assertEqual((m.bytes_sent, m.bytes_received, m.frames_received, m.timeouts, m.partial), (9, 12, 1, 1, 1))
+
+    def test_registry(self) -> None:
+        reg = Registry()
+        reg.metrics("gw").sent(9, 0.001)
+        exported: dict[str, int] = {}
+        reg.add_exporter(lambda name, s: exported.update({name: s["bytes_sent"]}))
+        reg.export()
+        self.assertEqual(exported, {"gw": 9})
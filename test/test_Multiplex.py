@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications import wrapper
+from src.DLMS_SPODES_communications.multiplex import Concentrator, MuxNetwork, HDLC
+from src.DLMS_SPODES_communications.poller import poll
+from src.DLMS_SPODES_communications.policy import EndpointHealth, Policy
+from .emulators import TCPMeter, make_frame
+
+
+class TestType(unittest.TestCase):
+    def test_wrapper(self) -> None:
+        """one connection for all meters, responses out of order"""
+        async def main() -> None:
+            async with TCPMeter(latency=0.001, jitter=0.01, pipelined=True) as meter:
+                c = Concentrator(host=meter.host, port=str(meter.port), window=8)
+                jobs = [(MuxNetwork(concentrator=c, address=i), [wrapper.pack(0x10, i, bytes((i,)))] * 3) for i in range(1, 51)]
+                async for res in poll(jobs, limit=50):
+                    self.assertIsInstance(res.status, result.Ok)
+                    for request, response in zip(res.requests, res.responses):
+                        self.assertEqual(wrapper.ports(response), wrapper.ports(request)[::-1])
+                self.assertEqual(meter.connections, 1)
+                self.assertEqual(meter.requests, 150)
+                self.assertFalse(c.is_connected())
+
+        asyncio.run(main())
+
+    def test_hdlc(self) -> None:
+        async def main() -> None:
+            async with TCPMeter(jitter=0.01, pipelined=True) as meter:
+                c = Concentrator(host=meter.host, port=str(meter.port), addressing=HDLC, window=2)
+                medias = [MuxNetwork(concentrator=c, address=bytes((i * 2 + 3,))) for i in range(5)]
+                for m in medias:
+                    await m.open()
+                sends = [asyncio.create_task(m.send(make_frame(m.address, b"\x21", 0x93))) for m in medias]  # type: ignore[arg-type]
+                await asyncio.sleep(0.05)
+                self.assertEqual(meter.requests, 2)
+                for m, t in zip(medias, sends):
+                    await t
+                    self.assertIsInstance(await m.receive(buf := bytearray()), result.Ok)
+                    self.assertEqual(buf[4:5], m.address)
+                for m in medias:
+                    await m.close()
+                self.assertFalse(c.is_connected())
+
+        asyncio.run(main())
+
+    def test_address(self) -> None:
+        """endpoint of media is fixed by address, not by sent frames"""
+        async def main() -> None:
+            async with TCPMeter() as meter:
+                c = Concentrator(host=meter.host, port=str(meter.port))
+                policy = Policy(health=EndpointHealth())
+                m = MuxNetwork(concentrator=c, address=5, policy=policy)
+                self.assertEqual(str(m), F"{c}#5")
+                self.assertIsInstance(await policy.open(m), result.Simple)
+                with self.assertRaises(ValueError):
+                    await m.send(wrapper.pack(0x10, 6, b"\x01"))
+                self.assertIsInstance(await MuxNetwork(concentrator=c, address=5).open(), result.Error)
+                await m.send(wrapper.pack(0x10, 5, b"\x01"))
+                self.assertIsInstance(await m.receive(bytearray()), result.Ok)
+                policy.done(m, ok=True)
+                await m.close()
+                self.assertEqual(str(m), F"{c}#5")
+                self.assertEqual(list(policy.health.collect()), [F"{c}#5"])
+
+        asyncio.run(main())
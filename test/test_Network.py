@@ -1,8 +1,10 @@
 import asyncio
 import unittest
-from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications import hdlc
+from src.DLMS_SPODES_communications.network import BufferedNetwork, Network, _RecvProtocol
 from StructResult import result
 from test.functools2 import open_close
+from .emulators import make_frame
 
 
 class TestType(unittest.TestCase):
@@ -83,3 +85,148 @@ class TestType(unittest.TestCase):
             await m.close()
 
         asyncio.run(main(self.m))
+
+
+class _Transport(asyncio.Transport):
+    def __init__(self) -> None:
+        super().__init__()
+        self.paused = 0
+        self.resumed = 0
+
+    def pause_reading(self) -> None:
+        self.paused += 1
+
+    def resume_reading(self) -> None:
+        self.resumed += 1
+
+    def is_closing(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+def _feed(p: _RecvProtocol, data: bytes) -> None:
+    """as loop: write to buffer of protocol by parts"""
+    while data:
+        if not (view := p.get_buffer(len(data))):
+            raise BufferError("receive buffer is full")
+        n = min(len(view), len(data))
+        view[:n] = data[:n]
+        p.buffer_updated(n)
+        data = data[n:]
+
+
+class TestBuffered(unittest.TestCase):
+    def test_compaction(self) -> None:
+        """not consumed tail move to begin of full buffer, frames stay whole"""
+        frames = [make_frame(b"\x21", b"\x03", 0x13, bytes((i,)) * 3) for i in range(4)]
+
+        async def main() -> None:
+            p = _RecvProtocol(24, hdlc.FLAG_B)
+            p.connection_made(_Transport())
+            got = []
+            data = b"".join(frames)
+            pos = 0
+            while pos < len(data):  # as loop: read by 5 bytes while buffer has space
+                if room := p.get_buffer(5):
+                    n = min(len(room), 5, len(data) - pos)
+                    room[:n] = data[pos: pos + n]
+                    p.buffer_updated(n)
+                    pos += n
+                while (view := p.next_frame()) is not None:
+                    got.append(bytes(view))
+                    self.assertIs(view.obj, p.buf)
+            self.assertEqual(got, frames)
+            self.assertEqual(p.pending, 0)
+            self.assertEqual(len(p.buf), 24)
+
+        asyncio.run(main())
+
+    def test_view_lifetime(self) -> None:
+        """new data don't overwrite view of last frame until next frame is asked"""
+        f0, f1 = (make_frame(b"\x21", b"\x03", 0x13, bytes((i,)) * 5) for i in range(2))
+
+        async def main() -> None:
+            p = _RecvProtocol(2 * len(f0), None)
+            p.connection_made(_Transport())
+            _feed(p, f0)
+            view = p.next_frame()
+            _feed(p, f1)
+            self.assertEqual(bytes(view), f0)  # type: ignore[arg-type]
+            self.assertEqual(bytes(p.next_frame()), f1)  # type: ignore[arg-type]
+
+            p = _RecvProtocol(len(f0) + 4, hdlc.FLAG_B)
+            p.connection_made(t := _Transport())
+            _feed(p, f0)
+            view = p.next_frame()
+            _feed(p, f1[:4])
+            self.assertEqual((t.paused, t.resumed), (1, 0))
+            self.assertEqual(len(p.get_buffer(1)), 0)
+            self.assertEqual(bytes(view), f0)  # type: ignore[arg-type]
+            self.assertIsNone(p.next_frame())
+            self.assertEqual(t.resumed, 1)
+            _feed(p, f1[4:])
+            self.assertEqual(bytes(p.next_frame()), f1)  # type: ignore[arg-type]
+
+        asyncio.run(main())
+
+    def test_pause_resume(self) -> None:
+        """full buffer pause reading until consumer take data"""
+        async def main() -> None:
+            p = _RecvProtocol(16, None)
+            p.connection_made(t := _Transport())
+            _feed(p, bytes(range(16)))
+            self.assertEqual((t.paused, t.resumed), (1, 0))
+            self.assertEqual(bytes(p.next_frame()), bytes(range(16)))  # type: ignore[arg-type]
+            self.assertEqual((t.paused, t.resumed), (1, 0), "view of frame holds buffer")
+            self.assertIsNone(p.next_frame())
+            self.assertEqual((t.paused, t.resumed), (1, 1))
+            _feed(p, b"\x01\x02")
+            self.assertEqual((p.start, p.end), (0, 2))
+            self.assertEqual(bytes(p.take()), b"\x01\x02")
+            self.assertEqual(t.resumed, 1)
+
+        asyncio.run(main())
+
+    def test_eof(self) -> None:
+        async def main() -> None:
+            p = _RecvProtocol(16, hdlc.FLAG_B)
+            p.connection_made(_Transport())
+            self.assertTrue(p.is_alive())
+            waiter = p.wait_data()
+            self.assertFalse(p.eof_received())
+            self.assertTrue(waiter.done())
+            self.assertFalse(p.is_alive())
+            p.connection_lost(None)
+            self.assertTrue(p.closed.done())
+
+        asyncio.run(main())
+
+    def test_receive_view(self) -> None:
+        """views of frames in small buffer, peer close is error"""
+        frames = [make_frame(b"\x21", b"\x03", 0x13, bytes((i,)) * 10) for i in range(10)]
+
+        async def handle(_reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            data = b"".join(frames)
+            for pos in range(0, len(data), 13):
+                writer.write(data[pos: pos + 13])
+                await writer.drain()
+                await asyncio.sleep(0.001)
+            writer.close()
+
+        async def main() -> None:
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            m = BufferedNetwork(host="127.0.0.1", port=str(server.sockets[0].getsockname()[1]), EOF=b"\x7e", to_recv=1.0)
+            m.recv_size = 48
+            await m.open()
+            for f in frames:
+                res = await m.receive_view()
+                self.assertIsInstance(res, result.Simple)
+                self.assertEqual(bytes(res.value), f)  # type: ignore[union-attr]
+            self.assertIsInstance(await m.receive_view(), result.Error)
+            await m.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
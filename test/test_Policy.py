@@ -0,0 +1,75 @@
+import asyncio
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.policy import Backoff, CircuitBreaker, EndpointHealth, Policy, State
+from src.DLMS_SPODES_communications.poller import exchange, poll
+from .emulators import TCPMeter
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+class TestType(unittest.TestCase):
+    def test_backoff(self) -> None:
+        b = Backoff(base=1.0, max=5.0, jitter=0.5)
+        for attempt, limit in ((1, 1.0), (3, 4.0), (10, 5.0)):
+            self.assertTrue(limit / 2 <= b.delay(attempt) <= limit)
+
+    def test_breaker(self) -> None:
+        b = CircuitBreaker(failures_to_open=2, pause=Backoff(base=0.01, jitter=0.0))
+        b.failure()
+        self.assertTrue(b.allow())
+        b.failure()
+        self.assertEqual(b.state, State.OPEN)
+        self.assertFalse(b.allow())
+        time.sleep(0.02)
+        self.assertTrue(b.allow())
+        self.assertFalse(b.allow())  # one probe
+        b.failure()
+        self.assertEqual((b.state, b.trips), (State.OPEN, 2))
+        time.sleep(0.03)
+        self.assertTrue(b.allow())
+        b.success()
+        self.assertEqual(b.state, State.CLOSED)
+
+    def test_poll(self) -> None:
+        """dead endpoint fail fast after open circuit, healthy is polled"""
+        async def main() -> None:
+            policy = Policy(failures_to_open=2, pause=Backoff(base=60.0), health=EndpointHealth())
+            async with TCPMeter(answer=lambda _: None) as dead, TCPMeter() as alive:
+                jobs = [
+                    (Network(host=m.host, port=str(m.port), EOF=b"\x7e", to_recv=0.05, policy=policy), [REQUEST])
+                    for _ in range(20) for m in (dead, alive)
+                ]
+                ok = 0
+                async for res in poll(jobs, limit=4):
+                    ok += isinstance(res.status, result.Ok)
+                self.assertEqual(ok, 20)
+                self.assertEqual(dead.connections, 2)
+                self.assertEqual(policy.health.collect()[F"{dead.host}:{dead.port}"]["state"], "open")
+
+        asyncio.run(main())
+
+    def test_cancel(self) -> None:
+        """cancelled session is not success of endpoint and frees probe of half-open circuit"""
+        async def main() -> None:
+            policy = Policy(failures_to_open=1, pause=Backoff(base=0.01, jitter=0.0), health=EndpointHealth())
+            async with TCPMeter(latency=1.0) as meter:
+                media = Network(host=meter.host, port=str(meter.port), EOF=b"\x7e", policy=policy)
+                breaker = policy.breaker(media)
+                breaker.failure()
+                await asyncio.sleep(0.02)
+                task = asyncio.create_task(exchange(media, [REQUEST]))
+                await asyncio.sleep(0.1)
+                self.assertEqual(breaker.state, State.HALF_OPEN)
+                self.assertFalse(breaker.available())
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                self.assertEqual((breaker.state, breaker.trips), (State.HALF_OPEN, 1))
+                self.assertTrue(breaker.available())
+                self.assertFalse(media.is_open())
+
+        asyncio.run(main())
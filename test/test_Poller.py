@@ -0,0 +1,100 @@
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.poller import poll
+from .emulators import TCPMeter, make_frame
+
+
+REQUEST = make_frame(b"\x03", b"\x21", 0x93)
+
+
+@dataclass
+class Gauge:
+    """sessions at same time"""
+    now: int = 0
+    peak: int = 0
+
+
+@dataclass
+class GaugedNetwork(Network):
+    gauges: tuple[Gauge, ...] = field(default=(), kw_only=True, repr=False, compare=False)
+
+    async def open(self) -> result.SimpleOrError[float]:
+        for g in self.gauges:
+            g.now += 1
+            g.peak = max(g.peak, g.now)
+        return await super().open()
+
+    async def close(self) -> result.SimpleOrError[float]:
+        for g in self.gauges:
+            g.now -= 1
+        return await super().close()
+
+
+class TestType(unittest.TestCase):
+    def test_bounds(self) -> None:
+        """sessions within limit and per_endpoint"""
+        async def main() -> None:
+            total = Gauge()
+            async with TCPMeter(latency=0.005) as m1, TCPMeter(latency=0.005) as m2:
+                gauges = {m1.port: Gauge(), m2.port: Gauge()}
+                jobs = [
+                    (GaugedNetwork(host=m.host, port=str(m.port), EOF=b"\x7e", gauges=(total, gauges[m.port])), [REQUEST])
+                    for _ in range(20) for m in (m1, m2)
+                ]
+                async for res in poll(jobs, limit=3, per_endpoint=2):
+                    self.assertIsInstance(res.status, result.Ok)
+                self.assertEqual(m1.requests + m2.requests, 40)
+            self.assertEqual(total.peak, 3)
+            self.assertEqual([g.peak for g in gauges.values()], [2, 2])
+
+        asyncio.run(main())
+
+    def test_busy_endpoint(self) -> None:
+        """jobs of busy gateway don't hold backlog of others"""
+        async def main() -> None:
+            async with TCPMeter(latency=0.01) as busy, TCPMeter(latency=0.01) as other:
+                jobs = [(Network(host=busy.host, port=str(busy.port), EOF=b"\x7e"), [REQUEST]) for _ in range(30)]
+                jobs += [(Network(host=other.host, port=str(other.port), EOF=b"\x7e"), [REQUEST]) for _ in range(3)]
+                order = [res.media.port async for res in poll(jobs, limit=2, per_endpoint=1)]
+            self.assertEqual(len(order), 33)
+            self.assertLess(max(i for i, port in enumerate(order) if port == str(other.port)), 10)
+
+        asyncio.run(main())
+
+    def test_stream(self) -> None:
+        """async source is read within backlog, results are yielded as they complete"""
+        async def main() -> None:
+            read = 0
+            async with TCPMeter(latency=0.1) as slow, TCPMeter() as fast:
+                async def jobs() -> AsyncIterator[tuple[Network, list[bytes]]]:
+                    nonlocal read
+                    for m in [slow] + [fast] * 19:
+                        read += 1
+                        yield Network(host=m.host, port=str(m.port), EOF=b"\x7e"), [REQUEST]
+
+                results = poll(jobs(), limit=2, key=id)
+                first = await anext(results)
+                self.assertEqual(first.media.port, str(fast.port))
+                self.assertLessEqual(read, 2 * 2 + 1)
+                ports = [first.media.port] + [res.media.port async for res in results]
+            self.assertEqual(len(ports), 20)
+            self.assertEqual(ports.count(str(slow.port)), 1)
+
+        asyncio.run(main())
+
+    def test_slow_consumer(self) -> None:
+        """completed results are bounded by limit, sessions wait for consumer"""
+        async def main() -> None:
+            async with TCPMeter() as meter:
+                results = poll(((Network(host=meter.host, port=str(meter.port), EOF=b"\x7e"), [REQUEST]) for _ in range(40)), limit=2, key=id)
+                await anext(results)
+                await asyncio.sleep(0.2)
+                self.assertLessEqual(meter.requests, 1 + 2 + 2 * 2)
+                self.assertEqual(len([res async for res in results]), 39)
+            self.assertEqual(meter.requests, 40)
+
+        asyncio.run(main())
@@ -0,0 +1,110 @@
+import asyncio
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import BufferedNetwork, Network
+from src.DLMS_SPODES_communications.pool import ConnectionPool
+from src.DLMS_SPODES_communications.poller import exchange
+from .emulators import TCPMeter, make_frame
+
+
+REQUEST = make_frame(b"\x03", b"\x21", 0x93)
+
+
+class Conn:
+    def __init__(self, *, alive: bool = True) -> None:
+        self.alive = alive
+        self.closed = False
+
+    def is_alive(self) -> bool:
+        return self.alive and not self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestType(unittest.TestCase):
+    def test_hit_miss(self) -> None:
+        pool = ConnectionPool()
+        self.assertIsNone(pool.acquire(("127.0.0.1", "4059")))
+        pool.release(("127.0.0.1", "4059"), c := Conn())
+        self.assertIs(pool.acquire(("127.0.0.1", "4059")), c)
+        self.assertEqual((pool.stats.hits, pool.stats.misses), (1, 1))
+
+    def test_dead(self) -> None:
+        pool = ConnectionPool()
+        pool.release(1, c := Conn(alive=False))
+        self.assertIsNone(pool.acquire(1))
+        self.assertTrue(c.closed)
+        self.assertEqual(pool.stats.dead, 1)
+
+    def test_max_per_endpoint(self) -> None:
+        pool = ConnectionPool(max_per_endpoint=2)
+        conns = [Conn() for _ in range(3)]
+        for c in conns:
+            pool.release(1, c)
+        self.assertTrue(conns[0].closed)
+        self.assertEqual(len(pool), 2)
+        self.assertIs(pool.acquire(1), conns[2])
+
+    def test_idle_timeout(self) -> None:
+        pool = ConnectionPool(idle_timeout=0.01)
+        pool.release(1, c := Conn())
+        time.sleep(0.02)
+        self.assertEqual(pool.purge(), 1)
+        self.assertTrue(c.closed)
+        self.assertIsNone(pool.acquire(1))
+
+    def test_expire_on_release(self) -> None:
+        """idle connections of endpoint are closed by next release without purge"""
+        pool = ConnectionPool(idle_timeout=0.01)
+        pool.release(1, old := Conn())
+        time.sleep(0.02)
+        pool.release(1, new := Conn())
+        self.assertTrue(old.closed)
+        self.assertEqual((len(pool), pool.stats.expired), (1, 1))
+        self.assertIs(pool.acquire(1), new)
+
+    def test_reap(self) -> None:
+        async def main() -> None:
+            pool = ConnectionPool(idle_timeout=0.01)
+            pool.release(1, c := Conn())
+            reaper = asyncio.create_task(pool.reap())
+            await asyncio.sleep(0.05)
+            reaper.cancel()
+            self.assertTrue(c.closed)
+            self.assertEqual(len(pool), 0)
+
+        asyncio.run(main())
+
+    def test_unread(self) -> None:
+        """connection with late response is not reused"""
+        async def main() -> None:
+            pool = ConnectionPool()
+            async with TCPMeter() as meter:
+                media = Network(host=meter.host, port=str(meter.port), EOF=b"\x7e", pool=pool)
+                await media.open()
+                await media.send(REQUEST)
+                await asyncio.sleep(0.05)
+                await media.close()
+                self.assertIsNone(pool.acquire((meter.host, str(meter.port))))
+                self.assertEqual(pool.stats.dead, 1)
+
+        asyncio.run(main())
+
+    def test_network(self) -> None:
+        """connection is reused by sessions of Network and BufferedNetwork, with HDLC flag and without EOF"""
+        async def main(cls: type[Network], eof: bytes | None) -> None:
+            pool = ConnectionPool()
+            async with TCPMeter() as meter:
+                for _ in range(3):
+                    res = await exchange(cls(host=meter.host, port=str(meter.port), EOF=eof, pool=pool), [REQUEST] * 2)
+                    self.assertIsInstance(res.status, result.Ok)
+                self.assertEqual(meter.connections, 1)
+                self.assertEqual((pool.stats.hits, pool.stats.misses), (2, 1))
+                pool.clear()
+
+        for cls in (Network, BufferedNetwork):
+            for eof in (b"\x7e", None):
+                with self.subTest(cls=cls.__name__, EOF=eof):
+                    asyncio.run(main(cls, eof))
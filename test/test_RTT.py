@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.rtt import RTTEstimator, Estimators
+from .emulators import TCPMeter
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+class TestType(unittest.TestCase):
+    def test_estimator(self) -> None:
+        e = RTTEstimator(min_rto=0.1, max_rto=1.0)
+        self.assertEqual(e.timeout(5.0), 5.0)
+        e.observe(0.2)
+        self.assertAlmostEqual(e.rto, 0.6)
+        for _ in range(50):
+            e.observe(0.01)
+        self.assertEqual(e.timeout(5.0), 0.1)
+        e.backoff()
+        e.backoff()
+        self.assertAlmostEqual(e.rto, 0.4)
+        for _ in range(5):
+            e.backoff()
+        self.assertEqual(e.rto, 1.0)
+
+    def test_estimators(self) -> None:
+        est = Estimators()
+        self.assertIs(est.get("gw:1"), est.get("gw:1"))
+        self.assertIn("gw:1", est)
+
+    def test_network(self) -> None:
+        """timeout from RTT after first exchange"""
+        async def main() -> None:
+            async with TCPMeter(latency=0.01) as meter:
+                m = Network(host=meter.host, port=str(meter.port), EOF=b"\x7e", rtt=RTTEstimator(min_rto=0.05))
+                await m.open()
+                for _ in range(3):
+                    await m.send(REQUEST)
+                    await m.receive(bytearray())
+                await m.close()
+                self.assertEqual(m.rtt.samples, 3)  # type: ignore[union-attr]
+                self.assertLess(m.recv_timeout, m.to_recv)
+
+        asyncio.run(main())
@@ -0,0 +1,63 @@
+import asyncio
+import gc
+import tracemalloc
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications import wrapper
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.poller import poll
+from src.DLMS_SPODES_communications.registry import EndpointTable, Profile
+from src.DLMS_SPODES_communications.udp import UDP
+from .emulators import UDPMeter
+
+
+class TestType(unittest.TestCase):
+    def test_columns(self) -> None:
+        table = EndpointTable()
+        fast = Profile(to_recv=1.0)
+        i = table.add("tcp", "10.0.0.1", 4059, fast)
+        j = table.add("udp", "meter.local", 4059, Profile(to_recv=1.0))
+        self.assertEqual(table.describe(i), ("tcp", "10.0.0.1", 4059, fast))
+        self.assertEqual(table.host(j), "meter.local")
+        self.assertIs(table.describe(j)[3], fast, "shared profile")
+        with self.assertRaises(ValueError):
+            table.add("x25", "10.0.0.1", 1)
+
+    def test_lazy_media(self) -> None:
+        table = EndpointTable()
+        i = table.add("tcp", "10.0.0.1", 8888, Profile(to_recv=1.0, to_drain=0.5))
+        j = table.add("udp", "10.0.0.2", 4059, Profile(to_drain=0.5))
+        self.assertEqual(len(table.active), 0)
+        m = table[i]
+        self.assertIsInstance(m, Network)
+        self.assertEqual((m.host, m.port, m.to_recv, m.to_drain), ("10.0.0.1", "8888", 1.0, 0.5))  # type: ignore[attr-defined]
+        self.assertIs(table[i], m)
+        self.assertIsInstance(table[j], UDP)
+        del m
+        gc.collect()
+        self.assertEqual(list(table.active), [])
+
+    def test_memory(self) -> None:
+        """fleet size costs columns only"""
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        table = EndpointTable()
+        table.extend(("tcp", F"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 4059) for i in range(100_000))
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        self.assertLess(used, 100_000 * 40)
+        self.assertEqual(table.host(70_000), "10.1.17.112")
+
+    def test_poll(self) -> None:
+        async def main() -> None:
+            async with UDPMeter() as meter:
+                table = EndpointTable()
+                indexes = table.extend(("udp", meter.host, meter.port) for _ in range(100))
+                n = 0
+                async for res in poll(table.jobs(indexes, [wrapper.pack(0x10, 1, b"\xc0")]), limit=10, queue=10):
+                    self.assertIsInstance(res.status, result.Ok)
+                    n += 1
+                    self.assertLessEqual(len(table.active), 21, "backlog of poll and result")
+                self.assertEqual(n, 100)
+
+        asyncio.run(main())
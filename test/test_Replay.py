@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.poller import poll
+from src.DLMS_SPODES_communications.replay import RecordingMedia, ReplayLog, ReplayMedia
+from .emulators import TCPMeter
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+class TestType(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix=".rec")
+        os.close(fd)
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def record(self) -> list[bytearray]:
+        async def main() -> list[bytearray]:
+            responses = []
+            async with TCPMeter(latency=0.05, info_size=10) as meter:
+                m = RecordingMedia(Network(host=meter.host, port=str(meter.port), EOF=b"\x7e"), self.path)
+                self.assertEqual(m.to_recv, 5.0)
+                await m.open()
+                for _ in range(2):
+                    await m.send(REQUEST)
+                    await m.receive(buf := bytearray())
+                    responses.append(buf)
+                await m.close()
+                m.stop()
+            return responses
+
+        return asyncio.run(main())
+
+    def test_replay(self) -> None:
+        responses = self.record()
+        log = ReplayLog(self.path)
+        self.assertEqual(len(log.sessions), 1)
+
+        async def main() -> None:
+            m = ReplayMedia(log=log)
+            await m.open()
+            for response in responses:
+                await m.send(REQUEST)
+                start = time.monotonic()
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Ok)
+                self.assertGreater(time.monotonic() - start, 0.04)
+                self.assertEqual(buf, response)
+            self.assertIsInstance(await m.receive(bytearray()), result.Error)
+            await m.close()
+            for session in (1, -1):
+                m = ReplayMedia(log=log, session=session)
+                self.assertIsInstance(await m.open(), result.Error)
+                self.assertFalse(m.is_open())
+
+        asyncio.run(main())
+
+    def test_load(self) -> None:
+        responses = self.record()
+        log = ReplayLog(self.path)
+
+        async def main() -> None:
+            jobs = ((ReplayMedia(log=log, speed=float("inf")), [REQUEST] * 2) for _ in range(500))
+            n = 0
+            async for res in poll(jobs, limit=100, key=id):
+                self.assertIsInstance(res.status, result.Ok)
+                self.assertEqual(res.responses, responses)
+                n += 1
+            self.assertEqual(n, 500)
+
+        asyncio.run(main())
+        log.close()
@@ -1,6 +1,10 @@
 import asyncio
+import os
+import time
 import unittest
-from src.DLMS_SPODES_communications.serial_port import Serial, RS485, medias, register_RS485
+from src.DLMS_SPODES_communications.serial_port import Serial, RS485, medias, register_RS485, BusScheduler
+from StructResult import result
+from .emulators import PtyMeter, make_frame
 from .functools2 import open_close
 
 
@@ -48,8 +52,8 @@ class TestType(unittest.TestCase):
             print(F"{d1.is_open()=} {medias[d1.port].n_connected=}\n")
             await d1.close()
             await d2.open()
-            await d1._lock.acquire()
-            print(F"{d2.is_open()=} {medias[d2.port].n_connected=}\n")
+            async with medias[d2.port].lock:
+                print(F"{d2.is_open()=} {medias[d2.port].n_connected=}\n")
             await d1.open()
             print(F"{d1.is_open()=} {medias[d1.port].n_connected=}\n")
             await d2.close()
@@ -113,3 +117,164 @@ class TestType(unittest.TestCase):
         d2 = register_RS485(RS485(
             port="COM4"))
         asyncio.run(main())
+
+
+class TestBusScheduler(unittest.TestCase):
+    def test_priority_and_fairness(self) -> None:
+        async def main() -> list[bytes]:
+            s = BusScheduler()
+            order: list[bytes] = []
+
+            async def tx(device: bytes, priority: int) -> None:
+                await s.acquire(device, priority, timeout=1.0)
+                order.append(device)
+                await asyncio.sleep(0.01)
+                s.release(device, ok=True)
+
+            await s.acquire(b"\x05", timeout=1.0)  # hold bus while queue is filled
+            async with asyncio.TaskGroup() as tg:
+                for device, priority in ((b"\x03", 1), (b"\x03", 1), (b"\x04", 1), (b"\x02", 0)):
+                    tg.create_task(tx(device, priority))
+                await asyncio.sleep(0.01)
+                s.release(b"\x05", ok=True)
+            return order
+
+        self.assertEqual(asyncio.run(main()), [b"\x02", b"\x03", b"\x04", b"\x03"])
+
+    def test_suspend(self) -> None:
+        async def main() -> None:
+            s = BusScheduler(suspend_after=2)
+            for _ in range(2):
+                await s.acquire(b"\x03")
+                s.release(b"\x03", ok=False)
+            with self.assertRaises(RuntimeError):
+                await s.acquire(b"\x03")
+            await s.acquire(b"\x04")
+            s.release(b"\x04", ok=True)
+
+        asyncio.run(main())
+
+    def test_timeout(self) -> None:
+        async def main() -> None:
+            s = BusScheduler()
+            await s.acquire(b"\x03")
+            with self.assertRaises(RuntimeError):
+                await s.acquire(b"\x04", timeout=0.01)
+            s.release(b"\x03", ok=True)
+            await s.acquire(b"\x04", timeout=0.01)
+
+        asyncio.run(main())
+
+
+class _Writer:
+    def write(self, data: bytes) -> None:
+        pass
+
+    async def drain(self) -> None:
+        pass
+
+
+class TestDemux(unittest.TestCase):
+    def test_late_frame(self) -> None:
+        snrm3 = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+        ua3 = bytes.fromhex("7E A8 07 21 03 73 0F 01 7E")
+        ua5 = bytes.fromhex("7E A8 07 21 05 73 0F 01 7E")
+
+        async def main() -> None:
+            d = register_RS485(RS485(port="DEMUX", EOF=b"\x7e", to_recv=0.1))
+            d._reader = asyncio.StreamReader()
+            d._writer = _Writer()  # type: ignore[assignment]
+            await d.send(snrm3)
+            d._reader.feed_data(ua5 + ua3)  # late response of device 5 before own
+            self.assertEqual(await d.receive(buf := bytearray()), result.OK)
+            await d.end_transaction()
+            self.assertEqual(buf, ua3)
+            self.assertEqual(medias[d.port].dropped, 1)
+
+        asyncio.run(main())
+        del medias["DEMUX"]
+
+    def test_retry(self) -> None:
+        """late response to timed out request is not returned to retry of same device"""
+        snrm3 = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+        ua3 = make_frame(b"\x21", b"\x03", 0x73, b"\x01")
+        ua3_retry = make_frame(b"\x21", b"\x03", 0x73, b"\x02")
+
+        async def main() -> None:
+            d = register_RS485(RS485(port="RETRY", EOF=b"\x7e", to_recv=0.05))
+            d._reader = asyncio.StreamReader()
+            d._writer = _Writer()  # type: ignore[assignment]
+            await d.send(snrm3)
+            d._reader.feed_data(ua3[:4])
+            self.assertIsInstance(await d.receive(bytearray()), result.Error)
+            await d.end_transaction()
+            d._reader.feed_data(ua3[4:])  # late tail of first response
+            d._reader.feed_data(ua3)  # late duplicate
+            await d.send(snrm3)
+            d._reader.feed_data(ua3_retry)
+            self.assertEqual(await d.receive(buf := bytearray()), result.OK)
+            await d.end_transaction()
+            self.assertEqual(buf, ua3_retry)
+            self.assertEqual(medias[d.port].discarded, len(ua3) * 2 - 4)
+
+        asyncio.run(main())
+        del medias["RETRY"]
+
+    def test_transaction_timeout(self) -> None:
+        """expired deadline of transaction is failure of device in bus scheduler"""
+        snrm3 = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+        async def main() -> None:
+            d = register_RS485(RS485(port="DEADLINE", EOF=b"\x7e", to_recv=5.0))
+            d._reader = asyncio.StreamReader()
+            d._writer = _Writer()  # type: ignore[assignment]
+            for _ in range(3):
+                with self.assertRaises(TimeoutError):
+                    async with d.transaction(0.01):
+                        await d.send(snrm3)
+                        await d.receive(bytearray())
+            self.assertEqual(medias[d.port].scheduler.devices[b"\x03"].failures, 3)
+            self.assertFalse(d._in_transaction)
+
+        asyncio.run(main())
+        del medias["DEADLINE"]
+
+
+@unittest.skipUnless(os.name == "posix", "need pty")
+class TestGap(unittest.TestCase):
+    def test_hdlc(self) -> None:
+        """complete frame without waiting of gap, broken frame before to_recv"""
+        frame = make_frame(b"\x21", b"\x03", 0x73, bytes(100))
+
+        async def main() -> None:
+            with PtyMeter(segment_size=16, answer=lambda req: frame if req[5] == 0x93 else frame[:-10]) as meter:
+                m = Serial(port=meter.port, EOF=b"\x7e", gap_chars=3.5)
+                await m.open()
+                await m.send(bytes.fromhex("7E A0 07 03 21 93 0F 01 7E"))
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Ok)
+                self.assertEqual(buf, frame)
+                await m.send(bytes.fromhex("7E A0 07 03 21 53 03 85 7E"))
+                start = time.monotonic()
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Error)
+                self.assertLess(time.monotonic() - start, 1.0)
+                self.assertEqual(buf, frame[:-10])
+                await m.close()
+
+        asyncio.run(main())
+
+    def test_char_gap(self) -> None:
+        self.assertEqual(Serial(gap_chars=3.5).char_gap, 0.02)  # 3.6 ms at 9600 is less than latency of USB adapter
+        self.assertAlmostEqual(Serial(gap_chars=3.5, gap_min=0.001).char_gap, 0.0036458, places=6)
+        self.assertAlmostEqual(Serial(baudrate="300", gap_chars=3.5).char_gap, 0.1166667, places=6)
+
+    def test_without_eof(self) -> None:
+        async def main() -> None:
+            with PtyMeter(segment_size=7) as meter:
+                m = Serial(port=meter.port, gap_chars=3.5)
+                await m.open()
+                await m.send(bytes.fromhex("7E A0 07 03 21 93 0F 01 7E"))
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Ok)
+                self.assertEqual(len(buf), 9)
+                await m.close()
+
+        asyncio.run(main())
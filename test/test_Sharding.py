@@ -0,0 +1,72 @@
+import asyncio
+from collections.abc import AsyncIterator
+import multiprocessing
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.ble import BLEKPZ
+from src.DLMS_SPODES_communications.metrics import Metrics
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.sharding import describe, poll_sharded
+from .emulators import TCPMeter
+
+
+REQUEST = bytes.fromhex("7E A0 07 03 21 93 0F 01 7E")
+
+
+class TestType(unittest.TestCase):
+    def test_poll(self) -> None:
+        async def main() -> None:
+            async with TCPMeter(latency=0.001) as meter:
+                medias = [Network(host=meter.host, port=str(meter.port), EOF=b"\x7e") for _ in range(40)]
+                seen = []
+                async for res in poll_sharded(((m, [REQUEST] * 3) for m in medias), limit=8, key=id, workers=2, window=4, batch=4):
+                    self.assertIsInstance(res.status, result.Ok)
+                    self.assertEqual(len(res.responses), 3)
+                    seen.append(res.media)
+                self.assertEqual(sorted(map(id, seen)), sorted(map(id, medias)))
+                self.assertEqual(meter.requests, 120)
+
+        asyncio.run(main())
+
+    def test_break(self) -> None:
+        """stop workers after consumer leave"""
+        async def main() -> None:
+            async with TCPMeter(latency=0.05) as meter:
+                jobs = ((Network(host=meter.host, port=str(meter.port), EOF=b"\x7e"), [REQUEST]) for _ in range(1000))
+                results = poll_sharded(jobs, limit=4, workers=2)
+                async for _ in results:
+                    break
+                await results.aclose()
+            self.assertEqual(multiprocessing.active_children(), [])
+
+        asyncio.run(main())
+
+    def test_async_source(self) -> None:
+        """jobs from async source, budget is deadline of request in worker"""
+        async def main() -> None:
+            async with TCPMeter(latency=0.001) as meter:
+                medias = [Network(host=meter.host, port=str(meter.port), EOF=b"\x7e") for _ in range(20)]
+
+                async def jobs() -> AsyncIterator[tuple[Network, list[bytes]]]:
+                    for m in medias:
+                        await asyncio.sleep(0)
+                        yield m, [REQUEST] * 2
+
+                seen = [res async for res in poll_sharded(jobs(), limit=4, key=id, workers=2, window=2, budget=1.0)]
+                self.assertTrue(all(isinstance(res.status, result.Ok) for res in seen))
+                self.assertEqual(sorted(id(res.media) for res in seen), sorted(map(id, medias)))
+                self.assertEqual(meter.requests, 40)
+            async with TCPMeter(latency=0.2) as meter:
+                jobs = [(Network(host=meter.host, port=str(meter.port), EOF=b"\x7e"), [REQUEST])]
+                res = [res async for res in poll_sharded(jobs, workers=1, budget=0.05)]
+                self.assertIsInstance(res[0].status, result.Error)
+
+        asyncio.run(main())
+
+    def test_describe(self) -> None:
+        """settings of media are sent to worker, process bound fields are not"""
+        cls, kwargs = describe(BLEKPZ(addr="00:00:00:00:00:01", adapter="hci1", send_window=4, metrics=Metrics()))
+        self.assertIs(cls, BLEKPZ)
+        self.assertEqual((kwargs["adapter"], kwargs["send_window"]), ("hci1", 4))
+        self.assertFalse({"metrics", "cache", "_target"} & kwargs.keys())
+        self.assertEqual(BLEKPZ(**kwargs).adapter, "hci1")
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.policy import Backoff, EndpointHealth, Policy, State
+from src.DLMS_SPODES_communications.sync import SyncClient
+from .emulators import TCPMeter, make_frame
+
+
+REQUEST = make_frame(b"\x03", b"\x21", 0x93)
+
+
+class TestType(unittest.TestCase):
+    def test_threads(self) -> None:
+        """calls of many threads, connection of media is reused"""
+        with SyncClient() as client:
+            meter = TCPMeter(latency=0.001)
+            client.run(meter.start())
+            medias = [Network(host=meter.host, port=str(meter.port), EOF=b"\x7e") for _ in range(4)]
+            with ThreadPoolExecutor(16) as executor:
+                results = list(executor.map(lambda i: client.request(medias[i % 4], REQUEST), range(64)))
+            for res in results:
+                self.assertIsInstance(res, result.Simple)
+                self.assertEqual(res.value[:1], b"\x7e")  # type: ignore[union-attr]
+            self.assertEqual((meter.requests, meter.connections), (64, 4))
+            self.assertIsInstance(client.close(medias[0]), result.Simple)
+            client.shutdown()
+            self.assertFalse(any(m.is_open() for m in medias))
+
+    def test_batch(self) -> None:
+        with SyncClient() as client:
+            meter = TCPMeter()
+            client.run(meter.start())
+            medias = [Network(host=meter.host, port=str(meter.port), EOF=b"\x7e") for _ in range(10)]
+            futures = client.submit_requests(((m, REQUEST) for m in medias * 10), budget=5.0)
+            self.assertTrue(all(isinstance(f.result(5.0), result.Simple) for f in futures))
+            res = client.exchange(Network(host=meter.host, port=str(meter.port), EOF=b"\x7e"), [REQUEST] * 3)
+            self.assertEqual(len(res.responses), 3)
+            self.assertEqual(meter.connections, 11)
+            self.assertEqual(len(client._locks), 10, "locks of opened medias only")
+            for m in medias:
+                client.close(m)
+            self.assertEqual(client._locks, {})
+            client.run(meter.stop())
+
+    def test_error(self) -> None:
+        with SyncClient() as client:
+            res = client.request(Network(host="127.0.0.1", port="1", to_connect=1.0), REQUEST)
+            self.assertIsInstance(res, result.Error)
+
+    def test_recovery(self) -> None:
+        """outage opens circuit, request after pause closes it"""
+        with SyncClient() as client:
+            meter = TCPMeter()
+            client.run(meter.start())
+            client.run(meter.stop())
+            policy = Policy(failures_to_open=1, pause=Backoff(base=0.05, jitter=0.0), health=EndpointHealth())
+            media = Network(host=meter.host, port=str(meter.port), EOF=b"\x7e", to_connect=1.0, policy=policy)
+            self.assertIsInstance(client.request(media, REQUEST), result.Error)
+            self.assertIs(policy.breaker(media).state, State.OPEN)
+            client.run(meter.start())
+            time.sleep(0.1)
+            self.assertIsInstance(client.request(media, REQUEST), result.Simple)
+            self.assertIs(policy.breaker(media).state, State.CLOSED)
+            client.close(media)
+            self.assertIsInstance(client.request(media, REQUEST), result.Simple)
+            client.run(meter.stop())
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications import trace
+from src.DLMS_SPODES_communications.network import Network
+from src.DLMS_SPODES_communications.trace import Trace
+from .emulators import TCPMeter, make_frame
+
+
+REQUEST = make_frame(b"\x03", b"\x21", 0x93)
+
+
+class TestType(unittest.TestCase):
+    def test_ring(self) -> None:
+        t = Trace(size=4, snap=3)
+        for i in range(6):
+            t.sent(bytes((i,)) * (i + 1))
+        self.assertEqual(len(t), 4)
+        records = list(t)
+        self.assertEqual([r.length for r in records], [3, 4, 5, 6])
+        self.assertEqual(records[0].data, b"\x02\x02\x02")
+        self.assertEqual(records[-1].data, b"\x05\x05\x05")
+        self.assertTrue(all(r.kind == trace.SEND for r in records))
+        self.assertLessEqual(records[0].stamp, records[-1].stamp)
+
+    def test_dump(self) -> None:
+        t = Trace(size=8, snap=16)
+        t.sent(REQUEST)
+        t.received(memoryview(bytearray(40))[5:25])
+        t.timeout()
+        with tempfile.TemporaryDirectory() as d:
+            self.assertEqual(t.dump(path := os.path.join(d, "trace.bin")), 3)
+            epoch, records = trace.load(path)
+            self.assertEqual(epoch, t.epoch)
+            self.assertEqual(records, list(t))
+            t.dump(path := os.path.join(d, "trace.pcap"), pcap=True)
+            with open(path, "rb") as f:
+                data = f.read()
+        magic, *_, snaplen, linktype = trace.PCAP_HEADER.unpack_from(data)
+        self.assertEqual((magic, snaplen, linktype), (0xa1b2c3d4, 17, trace.LINKTYPE_USER0))
+        _, _, incl, orig = trace.PCAP_RECORD.unpack_from(data, trace.PCAP_HEADER.size)
+        self.assertEqual((incl, orig), (len(REQUEST) + 1, len(REQUEST) + 1))
+        self.assertEqual(data[trace.PCAP_HEADER.size + trace.PCAP_RECORD.size], trace.SEND)
+
+    def test_media(self) -> None:
+        async def main() -> None:
+            async with TCPMeter() as meter:
+                m = Network(host=meter.host, port=str(meter.port), EOF=b"\x7e", to_recv=0.05, trace=Trace(snap=0))
+                await m.open()
+                await m.send(REQUEST)
+                self.assertIsInstance(await m.receive(buf := bytearray()), result.Ok)
+                self.assertIsInstance(await m.receive(bytearray()), result.Error)
+                await m.close()
+            self.assertEqual([(r.kind, r.length, r.data) for r in m.trace], [  # type: ignore[union-attr]
+                (trace.SEND, len(REQUEST), b""),
+                (trace.RECV, len(buf), b""),
+                (trace.TIMEOUT, 0, b"")])
+
+        asyncio.run(main())
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications.network import Network, BufferedNetwork
+from src.DLMS_SPODES_communications.poller import poll
+from .emulators import make_frame
+
+
+FRAME = make_frame(b"\x21", b"\x03", 0x13, bytes(60))
+
+
+async def trickle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """answer every request with FRAME by parts"""
+    while await reader.read(0xffff):
+        for pos in range(0, len(FRAME), 10):
+            writer.write(FRAME[pos: pos + 10])
+            await writer.drain()
+            await asyncio.sleep(0.02)
+    writer.close()
+
+
+class TestType(unittest.TestCase):
+    def test_deadline(self) -> None:
+        """budget of transaction, not timeout of every call"""
+        async def main() -> None:
+            server = await asyncio.start_server(trickle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            for cls in (Network, BufferedNetwork):
+                m = cls(host="127.0.0.1", port=str(port), EOF=b"\x7e", to_recv=0.01)
+                await m.open()
+                async with m.transaction(1.0):
+                    await m.send(b"\x01")
+                    buf = bytearray()
+                    self.assertIsInstance(await m.receive(buf), result.Ok)
+                self.assertEqual(buf, FRAME, cls.__name__)
+                start = time.monotonic()
+                with self.assertRaises(TimeoutError):
+                    async with m.transaction(0.05):
+                        await m.send(b"\x01")
+                        await m.receive(bytearray())
+                self.assertLess(time.monotonic() - start, 0.1)
+                self.assertIsNone(m._deadline)
+                await m.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+    def test_receive_timeout(self) -> None:
+        """out of transaction to_recv limits all receive, not every chunk"""
+        async def main() -> None:
+            server = await asyncio.start_server(trickle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            m = Network(host="127.0.0.1", port=str(port), EOF=b"\x7e", to_recv=0.05)
+            await m.open()
+            await m.send(b"\x01")
+            self.assertIsInstance(await m.receive(bytearray()), result.Error)
+            await m.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+    def test_poll_budget(self) -> None:
+        async def main() -> None:
+            server = await asyncio.start_server(trickle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            jobs = [(Network(host="127.0.0.1", port=str(port), EOF=b"\x7e", to_recv=0.01), [b"\x01"]) for _ in range(2)]
+            statuses = [res.status async for res in poll(iter(jobs[:1]), budget=1.0)]
+            self.assertIsInstance(statuses[0], result.Ok)
+            statuses = [res.status async for res in poll(iter(jobs[1:]), budget=0.05)]
+            self.assertIsInstance(statuses[0], result.Error)
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
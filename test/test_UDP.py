@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+from StructResult import result
+from src.DLMS_SPODES_communications import wrapper
+from src.DLMS_SPODES_communications.poller import poll
+from src.DLMS_SPODES_communications.udp import UDP, UDPEndpoint
+from .emulators import UDPMeter
+
+
+REQUEST = wrapper.pack(wrapper.CLIENT_PUBLIC, wrapper.SERVER_MANAGEMENT, bytes.fromhex("c001c100080000010000ff0200"))
+
+
+class TestType(unittest.TestCase):
+    def test_wrapper(self) -> None:
+        self.assertEqual(wrapper.ports(REQUEST), (0x10, 0x01))
+        with self.assertRaises(ValueError):
+            wrapper.ports(REQUEST[:-1])
+
+    def test_demux(self) -> None:
+        """many logical meters with one socket, route by wPorts"""
+        async def main() -> None:
+            endpoint = UDPEndpoint(("127.0.0.1", 0))
+            async with UDPMeter(latency=0.001, jitter=0.01) as meter:
+                medias = [UDP(host=meter.host, port=meter.port, endpoint=endpoint) for _ in range(200)]
+                jobs = ((m, [wrapper.pack(i + 0x10, 1, bytes((i % 256,)))]) for i, m in enumerate(medias))
+                async for res in poll(jobs, limit=200, key=id):
+                    self.assertIsInstance(res.status, result.Ok)
+                    self.assertEqual(wrapper.ports(res.responses[0]), wrapper.ports(res.requests[0])[::-1])
+                self.assertEqual(endpoint.routes, {})
+            endpoint.close()
+
+        asyncio.run(main())
+
+    def test_retransmission(self) -> None:
+        async def main() -> None:
+            async with UDPMeter(lose=2) as meter:
+                m = UDP(host=meter.host, port=meter.port, to_recv=0.05, retries=1)
+                await m.open()
+                for _ in range(2):
+                    await m.send(REQUEST)
+                    self.assertIsInstance(await m.receive(bytearray()), result.Ok)
+                self.assertEqual(m.retransmissions, 1)
+                meter.lose = 1
+                await m.send(REQUEST)
+                self.assertIsInstance(await m.receive(bytearray()), result.Error)
+                await m.close()
+
+        asyncio.run(main())